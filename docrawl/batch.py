@@ -0,0 +1,196 @@
+import asyncio
+import queue
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+
+from docrawl.docrawl_client import AsyncDocrawlClient, DocrawlClient
+from docrawl.docrawl_logger import docrawl_logger
+from docrawl.errors import SpiderFunctionError
+
+
+@dataclass
+class BatchResult:
+    url: str
+    data: Optional[List[list]]  # Extracted data per XPath, None if the extraction failed
+    error: Optional[str] = None
+    client: Optional[str] = None  # redis_key_prefix of the client which processed the URL
+
+
+def create_clients(number_of_clients: int, driver: str = 'Firefox', in_browser: bool = False, proxy: dict = None,
+                   kv_redis=None, key_prefix: str = 'docrawl_batch', client_class=DocrawlClient) -> list:
+    """
+    Create clients with acquired browsers for batch extraction.
+        :param number_of_clients: int, number of browsers used in parallel
+        :param key_prefix: str, clients use prefixes {key_prefix}:0, {key_prefix}:1, ...
+        :param client_class: DocrawlClient, use async_create_clients for AsyncDocrawlClient
+    """
+    if issubclass(client_class, AsyncDocrawlClient):
+        raise TypeError('AsyncDocrawlClient acquires browsers asynchronously, use async_create_clients')
+
+    clients = []
+
+    for i in range(number_of_clients):
+        client = client_class(kv_redis=kv_redis, redis_key_prefix=f'{key_prefix}:{i}')
+        client.acquire_browser(driver, in_browser=in_browser, proxy=proxy)
+        clients.append(client)
+
+    return clients
+
+
+async def async_create_clients(number_of_clients: int, driver: str = 'Firefox', in_browser: bool = False,
+                               proxy: dict = None, kv_redis=None, key_prefix: str = 'docrawl_batch',
+                               client_class=AsyncDocrawlClient) -> list:
+    """Coroutine version of `create_clients` for AsyncDocrawlClient, browsers are acquired concurrently."""
+    clients = [client_class(kv_redis=kv_redis, redis_key_prefix=f'{key_prefix}:{i}') for i in range(number_of_clients)]
+
+    await asyncio.gather(*(client.acquire_browser(driver, in_browser=in_browser, proxy=proxy) for client in clients))
+
+    return clients
+
+
+def _get_extraction_inputs(client, url: str, xpaths: List[str]):
+    """Inputs of loading of the page and extraction, both are submitted at once and executed in order."""
+    load_input = {'url': client._prepare_url(url)}
+    extract_input = {'xpaths': list(xpaths), 'filename': None}
+
+    return load_input, extract_input
+
+
+def _get_batch_result(client, url: str, load_result: dict, extract_result: dict) -> BatchResult:
+    try:
+        client._check_function_result(load_result)
+        data = client._check_function_result(extract_result)
+    except SpiderFunctionError as e:
+        return BatchResult(url=url, data=None, error=str(e), client=client.redis_key_prefix)
+
+    return BatchResult(url=url, data=data, client=client.redis_key_prefix)
+
+
+def extract_url(client: DocrawlClient, url: str, xpaths: List[str], timeout: float = 60) -> BatchResult:
+    """Load the page and extract data of XPaths, errors are returned in the result instead of being raised."""
+    load_input, extract_input = _get_extraction_inputs(client, url, xpaths)
+    load_id = client.submit_function('load_website', load_input)
+    extract_id = client.submit_function('extract_multiple_xpaths', extract_input)
+
+    try:
+        results = dict(client.collect_functions([load_id, extract_id], timeout))
+    except TimeoutError:
+        return BatchResult(url=url, data=None, error=f'Timed out after {timeout} s', client=client.redis_key_prefix)
+
+    return _get_batch_result(client, url, results[load_id], results[extract_id])
+
+
+async def async_extract_url(client: AsyncDocrawlClient, url: str, xpaths: List[str],
+                            timeout: float = 60) -> BatchResult:
+    """Coroutine version of `extract_url`."""
+    load_input, extract_input = _get_extraction_inputs(client, url, xpaths)
+    load_id = await client.submit_function('load_website', load_input)
+    extract_id = await client.submit_function('extract_multiple_xpaths', extract_input)
+
+    results = {}
+    try:
+        async for command_id, result in client.collect_functions([load_id, extract_id], timeout):
+            results[command_id] = result
+    except TimeoutError:
+        return BatchResult(url=url, data=None, error=f'Timed out after {timeout} s', client=client.redis_key_prefix)
+
+    return _get_batch_result(client, url, results[load_id], results[extract_id])
+
+
+def extract_urls(clients: List[DocrawlClient], urls: Iterable[str], xpaths: List[str],
+                 concurrency: Optional[int] = None, timeout: float = 60) -> Iterator[BatchResult]:
+    """
+    Extract the same XPaths from many URLs using several browsers (clients) at once.
+        :param clients: list of DocrawlClient with running spiders, each client processes one URL at a time
+        :param urls: URLs to extract data from
+        :param xpaths: list of XPaths, see extract_multiple_xpath
+        :param concurrency: int, max number of pages processed at the same time, number of clients by default
+        :param timeout: max time in seconds to load and extract one page
+        :return: BatchResult for each URL in order in which they finish, failed URLs have error set
+    """
+    clients = clients[:concurrency] if concurrency else clients
+    if not clients:
+        raise ValueError('At least one client is required')
+
+    urls_queue = queue.Queue()
+    for url in urls:
+        urls_queue.put(url)
+
+    results_queue = queue.Queue()
+    stop_event = threading.Event()
+
+    def run_worker(client):
+        try:
+            while not stop_event.is_set():
+                try:
+                    url = urls_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                results_queue.put(extract_url(client, url, xpaths, timeout))
+        finally:
+            results_queue.put(None)  # Worker finished
+
+    workers = [threading.Thread(target=run_worker, args=(client,), daemon=True) for client in clients]
+    for worker in workers:
+        worker.start()
+
+    running_workers = len(workers)
+
+    try:
+        while running_workers:
+            result = results_queue.get()
+
+            if result is None:
+                running_workers -= 1
+                continue
+
+            if result.error:
+                docrawl_logger.error(f'Extraction from {result.url} failed: {result.error}')
+
+            yield result
+    finally:
+        # Consumer stopped iterating, pages being processed are finished, the rest is skipped
+        stop_event.set()
+
+
+async def async_extract_urls(clients: List[AsyncDocrawlClient], urls: Iterable[str], xpaths: List[str],
+                             concurrency: Optional[int] = None, timeout: float = 60) -> AsyncIterator[BatchResult]:
+    """asyncio version of `extract_urls` for AsyncDocrawlClient."""
+    clients = clients[:concurrency] if concurrency else clients
+    if not clients:
+        raise ValueError('At least one client is required')
+
+    urls_queue = asyncio.Queue()
+    for url in urls:
+        urls_queue.put_nowait(url)
+
+    results_queue = asyncio.Queue()
+
+    async def run_worker(client):
+        try:
+            while not urls_queue.empty():
+                url = urls_queue.get_nowait()
+                await results_queue.put(await async_extract_url(client, url, xpaths, timeout))
+        finally:
+            await results_queue.put(None)
+
+    workers = [asyncio.create_task(run_worker(client)) for client in clients]
+    running_workers = len(workers)
+
+    try:
+        while running_workers:
+            result = await results_queue.get()
+
+            if result is None:
+                running_workers -= 1
+                continue
+
+            if result.error:
+                docrawl_logger.error(f'Extraction from {result.url} failed: {result.error}')
+
+            yield result
+    finally:
+        for worker in workers:
+            worker.cancel()
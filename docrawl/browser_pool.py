@@ -0,0 +1,181 @@
+import collections
+import itertools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import psutil
+
+from docrawl.docrawl_logger import docrawl_logger
+
+
+@dataclass
+class PooledBrowser:
+    id: str
+    browser: object  # WebDriver instance
+    pid: int
+    key: tuple  # (driver type, headless, proxy), browsers are reusable only for the same key
+    uses: int = 0
+
+
+class BrowserPool:
+    """
+    Pool of launched browsers, shared by all spiders of the process.
+
+    Launching a browser (driver manager, selenium-wire proxy, browser start) takes seconds, so the pool keeps a
+    requested number of idle browsers ready (see `warm_up`) and launches replacements in background whenever
+    a browser is leased. Browsers are health-checked before they are leased and recycled after `max_uses` leases.
+    """
+
+    def __init__(self, launch_browser: Callable, max_uses: int = 50, max_workers: int = 2):
+        """
+        :param launch_browser: function (driver_type, headless, proxy_info) -> (browser, pid)
+        :param max_uses: number of leases after which the browser is closed and replaced with a new one
+        :param max_workers: number of browsers launched in background at the same time
+        """
+        self.launch_browser = launch_browser
+        self.max_uses = max_uses
+
+        self._idle_browsers = collections.defaultdict(collections.deque)
+        self._targets = {}  # Number of idle browsers kept ready per key
+        self._launching = collections.Counter()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='docrawl_browser_pool')
+        self._id_iter = itertools.count(1)
+
+    @staticmethod
+    def _get_key(driver_type: str, headless: bool, proxy_info: Optional[dict]) -> tuple:
+        proxy = json.dumps(proxy_info, sort_keys=True) if proxy_info else None
+
+        return driver_type, headless, proxy
+
+    def _launch(self, key: tuple) -> PooledBrowser:
+        driver_type, headless, proxy = key
+        browser, pid = self.launch_browser(driver_type, headless, json.loads(proxy) if proxy else None)
+
+        return PooledBrowser(id=f'browser{next(self._id_iter)}', browser=browser, pid=pid, key=key)
+
+    def _launch_idle(self, key: tuple):
+        try:
+            pooled_browser = self._launch(key)
+        except Exception as e:
+            docrawl_logger.error(f'Error while launching standby browser: {e}')
+            pooled_browser = None
+
+        with self._lock:
+            self._launching[key] -= 1
+            if pooled_browser is not None:
+                self._idle_browsers[key].append(pooled_browser)
+
+    def _replenish(self, key: tuple):
+        """Launch browsers in background until there are enough idle browsers for `key`."""
+        with self._lock:
+            missing = self._targets.get(key, 0) - len(self._idle_browsers[key]) - self._launching[key]
+            missing = max(missing, 0)
+            self._launching[key] += missing
+
+        for _ in range(missing):
+            self._executor.submit(self._launch_idle, key)
+
+    def warm_up(self, driver_type: str, headless: bool, proxy_info: Optional[dict] = None,
+                number_of_browsers: int = 1):
+        """Keep `number_of_browsers` idle browsers of given type launched in standby mode."""
+        key = self._get_key(driver_type, headless, proxy_info)
+
+        with self._lock:
+            self._targets[key] = number_of_browsers
+
+        self._replenish(key)
+
+    @staticmethod
+    def is_healthy(pooled_browser: PooledBrowser) -> bool:
+        """Check that browser process is alive and WebDriver still responds."""
+        try:
+            if not psutil.pid_exists(pooled_browser.pid):
+                return False
+
+            pooled_browser.browser.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(pooled_browser: PooledBrowser):
+        try:
+            pooled_browser.browser.quit()
+        except Exception as e:
+            docrawl_logger.error(f'Error while closing the browser: {e}')
+
+    @staticmethod
+    def _reset(pooled_browser: PooledBrowser) -> bool:
+        """Remove state of the previous lease, so that it doesn't leak to the next one."""
+        try:
+            browser = pooled_browser.browser
+            browser.delete_all_cookies()
+            browser.get('about:blank')
+
+            # selenium-wire request storage
+            if hasattr(browser, 'requests'):
+                del browser.requests
+
+            return True
+        except Exception as e:
+            docrawl_logger.warning(f'Browser {pooled_browser.id} could not be reset: {e}')
+            return False
+
+    def lease(self, driver_type: str, headless: bool, proxy_info: Optional[dict] = None) -> PooledBrowser:
+        """Return healthy idle browser of given type, launch a new one if there is none."""
+        key = self._get_key(driver_type, headless, proxy_info)
+
+        while True:
+            with self._lock:
+                idle_browsers = self._idle_browsers[key]
+                pooled_browser = idle_browsers.popleft() if idle_browsers else None
+
+            if pooled_browser is None:
+                docrawl_logger.warning('No standby browser available, launching a new one')
+                pooled_browser = self._launch(key)
+                break
+            elif self.is_healthy(pooled_browser):
+                break
+            else:
+                docrawl_logger.warning(f'Standby browser {pooled_browser.id} is not responding, closing it')
+                self._quit(pooled_browser)
+
+        pooled_browser.uses += 1
+        self._replenish(key)
+
+        return pooled_browser
+
+    def release(self, pooled_browser: PooledBrowser):
+        """Return leased browser to the pool, or close it if it was used too many times or is broken."""
+        key = pooled_browser.key
+
+        with self._lock:
+            max_idle_browsers = max(self._targets.get(key, 0), 1)
+            is_pool_full = len(self._idle_browsers[key]) >= max_idle_browsers
+
+        if is_pool_full or pooled_browser.uses >= self.max_uses or not self._reset(pooled_browser):
+            self._quit(pooled_browser)
+        else:
+            with self._lock:
+                self._idle_browsers[key].append(pooled_browser)
+
+        self._replenish(key)
+
+    def discard(self, pooled_browser: PooledBrowser):
+        """Close leased browser instead of returning it to the pool."""
+        self._quit(pooled_browser)
+        self._replenish(pooled_browser.key)
+
+    def close(self):
+        """Close all idle browsers and stop keeping standby browsers."""
+        with self._lock:
+            self._targets.clear()
+            idle_browsers = [x for browsers in self._idle_browsers.values() for x in browsers]
+            self._idle_browsers.clear()
+
+        for pooled_browser in idle_browsers:
+            self._quit(pooled_browser)
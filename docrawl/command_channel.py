@@ -0,0 +1,287 @@
+import asyncio
+import collections
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+from docrawl.utils import get_redis_client, is_redis_backed
+
+
+class CommandChannel(ABC):
+    """
+    Ordered command queue and result map between DocrawlClient and DocrawlSpider.
+
+    Client pushes commands (dicts with unique `id`, `name` and `input`) which are executed one by one in the same
+    order by the spider. Spider publishes result of each command under its ID, client can wait for any subset of
+    submitted commands. Both sides are woken up as soon as a command / result is available, there is no polling.
+    """
+
+    @abstractmethod
+    def push_command(self, command: dict):
+        """Append command to the end of the queue."""
+
+    @abstractmethod
+    def pop_command(self, timeout: float) -> Optional[dict]:
+        """
+        Remove and return the oldest command, block up to `timeout` seconds if the queue is empty.
+
+        :return: command or None on timeout
+        """
+
+    @abstractmethod
+    def put_result(self, command_id: str, result: dict):
+        """Publish result of a finished command."""
+
+    @abstractmethod
+    def wait_result(self, command_ids: Iterable[str], timeout: float) -> Optional[tuple]:
+        """
+        Block until result of any of `command_ids` is published or `timeout` (seconds) elapses.
+
+        :return: tuple (command_id, result), result is removed from the channel, None on timeout
+        """
+
+    @abstractmethod
+    def cancel_commands(self, command_ids: Iterable[str]):
+        """
+        Give up on commands nobody waits for anymore (e.g. after a timeout). Commands which were not executed yet are
+        skipped by the spider, results of the rest are discarded.
+        """
+
+    async def async_push_command(self, command: dict):
+        """Coroutine version of `push_command`."""
+        self.push_command(command)
+
+    async def async_cancel_commands(self, command_ids: Iterable[str]):
+        """Coroutine version of `cancel_commands`."""
+        self.cancel_commands(command_ids)
+
+    @abstractmethod
+    async def async_wait_result(self, command_ids: Iterable[str], timeout: float) -> Optional[tuple]:
+        """Coroutine version of `wait_result`, waits without blocking the event loop."""
+
+
+class LocalCommandChannel(CommandChannel):
+    """In-process channel, used together with KeepVariableDummyRedisServer."""
+
+    def __init__(self):
+        self._commands = collections.deque()
+        self._results = {}
+        self._cancelled_command_ids = set()
+        self._condition = threading.Condition()
+
+        # Futures of coroutines waiting in async_wait_result, woken up from spider's thread
+        self._async_waiters = set()
+
+    def push_command(self, command: dict):
+        with self._condition:
+            self._commands.append(command)
+            self._condition.notify_all()
+
+    def pop_command(self, timeout: float) -> Optional[dict]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._commands, max(timeout, 0))
+
+            while self._commands:
+                command = self._commands.popleft()
+
+                if command['id'] not in self._cancelled_command_ids:
+                    return command
+                self._cancelled_command_ids.discard(command['id'])
+
+            return None
+
+    def put_result(self, command_id: str, result: dict):
+        with self._condition:
+            if command_id in self._cancelled_command_ids:
+                self._cancelled_command_ids.discard(command_id)
+                return
+
+            self._results[command_id] = result
+            self._condition.notify_all()
+
+            for loop, future in self._async_waiters:
+                loop.call_soon_threadsafe(_resolve_future, future)
+
+    def cancel_commands(self, command_ids: Iterable[str]):
+        with self._condition:
+            for command_id in command_ids:
+                # Result which was already published is removed, the other commands are waited for
+                if self._results.pop(command_id, None) is None:
+                    self._cancelled_command_ids.add(command_id)
+
+    def _pop_result(self, command_ids: list) -> Optional[tuple]:
+        command_id = next((command_id for command_id in command_ids if command_id in self._results), None)
+
+        if command_id is None:
+            return None
+        return command_id, self._results.pop(command_id)
+
+    def wait_result(self, command_ids: Iterable[str], timeout: float) -> Optional[tuple]:
+        command_ids = list(command_ids)
+
+        with self._condition:
+            self._condition.wait_for(lambda: any(x in self._results for x in command_ids), max(timeout, 0))
+
+            return self._pop_result(command_ids)
+
+    async def async_wait_result(self, command_ids: Iterable[str], timeout: float) -> Optional[tuple]:
+        command_ids = list(command_ids)
+        loop = asyncio.get_running_loop()
+        timeout_end = loop.time() + timeout
+
+        while True:
+            with self._condition:
+                finished = self._pop_result(command_ids)
+                if finished is not None or loop.time() >= timeout_end:
+                    return finished
+
+                waiter = (loop, loop.create_future())
+                self._async_waiters.add(waiter)
+
+            try:
+                await asyncio.wait_for(waiter[1], timeout_end - loop.time())
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._condition:
+                    self._async_waiters.discard(waiter)
+
+
+class RedisCommandChannel(CommandChannel):
+    """
+    Channel backed by Redis lists, commands are queued with RPUSH / BLPOP, result of each command is pushed into
+    its own list, so that the client can block on several commands at once with a single BLPOP.
+    """
+
+    RESULT_EXPIRATION = 3600  # Seconds, results which nobody waits for anymore are removed by Redis
+
+    def __init__(self, redis_client, key_prefix: str = ''):
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+
+        self._kv_redis_key_commands = f'{self.key_prefix}:commands'
+        self._kv_redis_key_cancelled = f'{self.key_prefix}:cancelled_commands'
+        self._async_redis = None
+
+    @property
+    def async_redis(self):
+        """asyncio Redis client connected to the same server as `redis`, created on first use."""
+        if self._async_redis is None:
+            import redis.asyncio
+
+            connection_kwargs = self.redis.connection_pool.connection_kwargs
+            self._async_redis = redis.asyncio.Redis(connection_pool=redis.asyncio.ConnectionPool(**connection_kwargs))
+
+        return self._async_redis
+
+    def _get_result_key(self, command_id: str) -> str:
+        return f'{self.key_prefix}:results:{command_id}'
+
+    def push_command(self, command: dict):
+        self.redis.rpush(self._kv_redis_key_commands, json.dumps(command))
+
+    def _is_cancelled(self, command_id: str) -> bool:
+        """Check whether the command was cancelled, the cancellation is consumed."""
+        return bool(self.redis.srem(self._kv_redis_key_cancelled, command_id))
+
+    def pop_command(self, timeout: float) -> Optional[dict]:
+        timeout_end = time.monotonic() + timeout
+
+        while True:
+            remaining = timeout_end - time.monotonic()
+
+            # BLPOP with timeout 0 would block forever
+            if remaining <= 0:
+                command = self.redis.lpop(self._kv_redis_key_commands)
+            else:
+                popped = self.redis.blpop([self._kv_redis_key_commands], timeout=remaining)
+                command = popped[1] if popped else None
+
+            if command is None:
+                return None
+
+            command = json.loads(command)
+            if not self._is_cancelled(command['id']):
+                return command
+
+    def put_result(self, command_id: str, result: dict):
+        if self._is_cancelled(command_id):
+            return
+
+        key = self._get_result_key(command_id)
+
+        pipeline = self.redis.pipeline()
+        pipeline.rpush(key, json.dumps(result))
+        pipeline.expire(key, self.RESULT_EXPIRATION)
+        pipeline.execute()
+
+    def wait_result(self, command_ids: Iterable[str], timeout: float) -> Optional[tuple]:
+        keys = {self._get_result_key(command_id): command_id for command_id in command_ids}
+
+        if timeout <= 0:
+            popped = next(((key, value) for key in keys if (value := self.redis.lpop(key)) is not None), None)
+        else:
+            popped = self.redis.blpop(list(keys), timeout=timeout)
+
+        if popped is None:
+            return None
+
+        key, result = popped
+        return keys[key], json.loads(result)
+
+    def _get_cancel_pipeline(self, redis_client, command_ids: list):
+        pipeline = redis_client.pipeline()
+        pipeline.sadd(self._kv_redis_key_cancelled, *command_ids)
+        pipeline.expire(self._kv_redis_key_cancelled, self.RESULT_EXPIRATION)
+        # Results which were already published
+        pipeline.delete(*(self._get_result_key(command_id) for command_id in command_ids))
+
+        return pipeline
+
+    def cancel_commands(self, command_ids: Iterable[str]):
+        command_ids = list(command_ids)
+
+        if command_ids:
+            self._get_cancel_pipeline(self.redis, command_ids).execute()
+
+    async def async_push_command(self, command: dict):
+        await self.async_redis.rpush(self._kv_redis_key_commands, json.dumps(command))
+
+    async def async_cancel_commands(self, command_ids: Iterable[str]):
+        command_ids = list(command_ids)
+
+        if command_ids:
+            await self._get_cancel_pipeline(self.async_redis, command_ids).execute()
+
+    async def async_wait_result(self, command_ids: Iterable[str], timeout: float) -> Optional[tuple]:
+        keys = {self._get_result_key(command_id): command_id for command_id in command_ids}
+
+        if timeout <= 0:
+            for key in keys:
+                result = await self.async_redis.lpop(key)
+                if result is not None:
+                    return keys[key], json.loads(result)
+            return None
+
+        popped = await self.async_redis.blpop(list(keys), timeout=timeout)
+
+        if popped is None:
+            return None
+
+        key, result = popped
+        return keys[key], json.loads(result)
+
+
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def create_command_channel(kv_redis, key_prefix: str = '') -> CommandChannel:
+    """Command channel between the client and its spider, Redis lists are used if the storage is Redis."""
+    if not is_redis_backed(kv_redis):
+        return LocalCommandChannel()
+
+    return RedisCommandChannel(get_redis_client(kv_redis), key_prefix)
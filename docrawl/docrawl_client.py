@@ -1,15 +1,23 @@
+import base64
 import itertools
 import time
+import uuid
 from contextlib import suppress
 from dataclasses import dataclass
+from typing import Optional, Union
 
 import psutil
 from crochet import setup
 from scrapy.crawler import CrawlerRunner
 
-from docrawl.docrawl_core import DocrawlSpider
+from docrawl.command_channel import create_command_channel
+from docrawl.docrawl_core import DocrawlSpider, browser_pool
 from docrawl.docrawl_logger import docrawl_logger
 from docrawl.errors import PageDidNotLoadError, SpiderFunctionError
+from docrawl.meta_data_store import create_browser_meta_data_store
+from docrawl.screencast import create_frame_ring
+from docrawl.screenshot_store import create_screenshot_store
+from docrawl.screenshots import decompress_screenshot
 from keepvariable.keepvariable_core import KeepVariableDummyRedisServer
 
 
@@ -24,50 +32,93 @@ class DocrawlSettings:
 class DocrawlClient:
     id_iter = itertools.count()
 
-    def __init__(self, kv_redis=None, kv_redis_keys=None, number_of_spawn_browsers=0, redis_key_prefix=""):
-        """Number of spawn browsers = how many browser processes are ready in standby mode to not initialize + close the browser, currently support 0 and 1."""
+    def __init__(self, kv_redis=None, kv_redis_keys=None, number_of_spawn_browsers=0, redis_key_prefix="", supervisor=None):
+        """
+        Number of spawn browsers = how many browser processes are ready in standby mode (in the browser pool shared by all clients of the process) to not initialize + close the browser.
+        Supervisor = DocrawlSupervisor, if passed, the spider runs in one of supervisor's worker processes instead of this process.
+        """
         self._client_id = redis_key_prefix.split(':')[1] or next(self.id_iter)
 
         self.kv_redis = kv_redis or KeepVariableDummyRedisServer()
         self.kv_redis_keys = kv_redis_keys or {}
         self.redis_key_prefix = redis_key_prefix
+        self.supervisor = supervisor
 
         self._kv_redis_key_browser_metadata = self.kv_redis_keys.get('browser_meta_data', f'{self.redis_key_prefix}:browser_meta_data')
         self._kv_redis_key_scanned_elements = self.kv_redis_keys.get('elements', f'{self.redis_key_prefix}:elements')
+        self._kv_redis_key_scanned_elements_diff = self.kv_redis_keys.get('elements_diff', f'{self.redis_key_prefix}:elements_diff')
+        self._kv_redis_key_scan_progress = self.kv_redis_keys.get('scan_progress', f'{self.redis_key_prefix}:scan_progress')
         self._kv_redis_key_screenshot = self.kv_redis_keys.get('screenshot', f'{self.redis_key_prefix}:screenshot')
-        
+        self._kv_redis_key_headers = self.kv_redis_keys.get('headers', f'{self.redis_key_prefix}:headers')
+        self._kv_redis_key_cookies = self.kv_redis_keys.get('cookies', f'{self.redis_key_prefix}:cookies')
+        self._kv_redis_key_requests = self.kv_redis_keys.get('requests', f'{self.redis_key_prefix}:requests')
+
+        self.command_channel = create_command_channel(self.kv_redis, self.redis_key_prefix)
+        self.browser_meta_data_store = create_browser_meta_data_store(self.kv_redis, self._kv_redis_key_browser_metadata)
+        self.screenshot_store = create_screenshot_store(self.kv_redis)
+        self.screencast_frames = create_frame_ring(self.kv_redis, f'{self.redis_key_prefix}:screencast_frames')
+
         self.browser_headers = None
         self.browser_cookies = None
         self.browser_requests = None
+        # Headers, cookies and requests are kept in memory, spiders in supervisor's workers share them via kv_redis
+        self.share_browser_data = False
+
+        self.active_browser = None
+        self.is_spider_running = False
 
         docrawl_logger.info(f'Initialised DocrawlClient with ID {self._client_id}')
 
-        if number_of_spawn_browsers > 0: #TODO: increase number of spawned browsers, support just 1 standby browser at this moment
+        if number_of_spawn_browsers > 0:
+            if self.supervisor is not None:
+                self.supervisor.warm_up(self.redis_key_prefix, 'Firefox', headless=True,
+                                        number_of_browsers=number_of_spawn_browsers)
+            else:
+                browser_pool.warm_up('Firefox', headless=True, number_of_browsers=number_of_spawn_browsers)
             self.run_spider()
 
     def set_browser_meta_data(self, browser_meta_data: dict):
-        self.kv_redis.set(key=self._kv_redis_key_browser_metadata, value=browser_meta_data)
+        self.browser_meta_data_store.replace(browser_meta_data)
 
     def get_browser_meta_data(self):
-        return self.kv_redis.get(key=self._kv_redis_key_browser_metadata)
+        return self.browser_meta_data_store.get_all()
+
+    def update_browser_meta_data(self, section: str, **fields):
+        """Atomically set fields of one section (browser, function, request) of browser metadata."""
+        self.browser_meta_data_store.update_section(section, fields)
+
+    def get_browser_meta_data_section(self, section: str) -> dict:
+        return self.browser_meta_data_store.get_section(section)
     
     def set_browser_headers(self, headers: dict):
         self.browser_headers = headers
-        # self.kv_redis.set(key=self._kv_redis_key_browser_headers, value=headers)
+        if self.share_browser_data:
+            self.kv_redis.set(key=self._kv_redis_key_headers, value=headers)
     
     def get_browser_headers(self):
+        if self.supervisor is not None:
+            return self.kv_redis.get(key=self._kv_redis_key_headers)
         return self.browser_headers
     
     def set_browser_cookies(self, cookies: dict):
         self.browser_cookies = cookies
+        if self.share_browser_data:
+            self.kv_redis.set(key=self._kv_redis_key_cookies, value=cookies)
     
     def get_browser_cookies(self):
+        if self.supervisor is not None:
+            return self.kv_redis.get(key=self._kv_redis_key_cookies)
         return self.browser_cookies
     
     def set_browser_requests(self, requests: list):
         self.browser_requests = requests
+        if self.share_browser_data:
+            # Captured requests decode their content lazily, shared ones have to be serialized
+            self.kv_redis.set(key=self._kv_redis_key_requests, value=[dict(request) for request in requests])
     
     def get_browser_requests(self):
+        if self.supervisor is not None:
+            return self.kv_redis.get(key=self._kv_redis_key_requests)
         return self.browser_requests
 
     def set_browser_scanned_elements(self, elements: list):
@@ -76,17 +127,78 @@ class DocrawlClient:
     def get_browser_scanned_elements(self):
         return self.kv_redis.get(key=self._kv_redis_key_scanned_elements)
 
-    def set_browser_screenshot(self, screenshot: str):
-        self.kv_redis.set(key=self._kv_redis_key_screenshot, value=screenshot)
+    def set_browser_scanned_elements_diff(self, diff: Optional[dict]):
+        self.kv_redis.set(key=self._kv_redis_key_scanned_elements_diff, value=diff)
+
+    def get_browser_scanned_elements_diff(self) -> Optional[dict]:
+        """Diff (added, removed, changed elements) published by the last incremental scan."""
+        return self.kv_redis.get(key=self._kv_redis_key_scanned_elements_diff)
+
+    def set_browser_scan_progress(self, progress: dict):
+        self.kv_redis.set(key=self._kv_redis_key_scan_progress, value=progress)
+
+    def get_browser_scan_progress(self) -> Optional[dict]:
+        """
+        Progress of the running scan, elements found so far are available via get_browser_scanned_elements.
+            :return: dict (element_type, sections_done, sections_total, number_of_elements, done, cached)
+        """
+        return self.kv_redis.get(key=self._kv_redis_key_scan_progress)
+
+    def get_screenshot_tile_key(self, index: int) -> str:
+        return f'{self._kv_redis_key_screenshot}:tile:{index}'
+
+    def set_browser_screenshot(self, screenshot: Union[bytes, str], ttl: Optional[int] = None,
+                               key: Optional[str] = None):
+        """
+        Store screenshot as raw bytes.
+            :param screenshot: bytes or base64 encoded string
+            :param ttl: int, optional, seconds after which the screenshot is removed
+            :param key: str, optional, storage key, e.g. of a screenshot tile, the screenshot key by default
+        """
+        if isinstance(screenshot, str):
+            screenshot = base64.b64decode(screenshot)
+
+        self.screenshot_store.set(key or self._kv_redis_key_screenshot, screenshot, ttl)
 
-    def get_browser_screenshot(self) -> str:
-        return self.kv_redis.get(key=self._kv_redis_key_screenshot)
+    def get_browser_screenshot(self, output: str = 'str', decompress: bool = True,
+                               key: Optional[str] = None) -> Union[str, bytes, memoryview, None]:
+        """
+        Last screenshot (PNG, WebP or JPEG), None if there is none or it expired.
+            :param output: str, str - base64 encoded string, bytes, memoryview - view of the stored bytes (no copy)
+            :param decompress: bool, decompress zstd compressed screenshots (see take_screenshot)
+            :param key: str, optional, storage key, the screenshot key by default
+        """
+        if output not in ('str', 'bytes', 'memoryview'):
+            raise ValueError(f'Unknown output {output}, use str, bytes or memoryview')
+
+        screenshot = self.screenshot_store.get(key or self._kv_redis_key_screenshot)
+        if screenshot is None:
+            return None
+
+        if decompress:
+            screenshot = decompress_screenshot(screenshot)
+
+        if output == 'bytes':
+            return screenshot
+        elif output == 'memoryview':
+            return memoryview(screenshot)
+        else:
+            return base64.b64encode(screenshot).decode('ascii')
+
+    def get_browser_screenshot_tile(self, index: int, output: str = 'str',
+                                    decompress: bool = True) -> Union[str, bytes, memoryview, None]:
+        """Screenshot tile captured by take_screenshot_tile, see get_browser_screenshot."""
+        return self.get_browser_screenshot(output, decompress, key=self.get_screenshot_tile_key(index))
+
+    def get_browser_screencast_frames(self) -> list:
+        """Latest screencast frames (dicts with base64 data and timestamp), see start_screencast."""
+        return self.screencast_frames.get_frames()
 
     def is_browser_active(self):
         # NOTE: Not used anywhere, it only checks if the process exists in OS process list, not if
         # it's active
         # TODO: finish later
-        pid = self.get_browser_meta_data()['browser']['pid']
+        pid = self.get_browser_meta_data_section('browser')['pid']
         if pid is None:
             return False
         else:
@@ -101,90 +213,112 @@ class DocrawlClient:
 
         self.set_browser_meta_data(browser_meta_data)
 
-    def _wait_until_page_is_loaded(self, timeout=60):
-        # Load spider_requests and spider_functions
-        try:
-            is_page_loaded = self.get_browser_meta_data()['request']['loaded']
-        except Exception as e:
-            docrawl_logger.error(f'Error while loading is_page_loaded: {e}')
-            is_page_loaded = True
-
-        # First check if page is loaded
-        timeout_start = time.time()
-        while not is_page_loaded and time.time() < timeout_start + timeout:
-            try:
-                is_page_loaded = self.get_browser_meta_data()['request']['loaded']
-            except:
-                is_page_loaded = False
-            time.sleep(0.5)
-            docrawl_logger.info('Page is still loading, waiting 0.5 sec ...')
-
-        if is_page_loaded:
-            docrawl_logger.warning(f'Page loaded: {self.get_browser_meta_data()["request"]["url"]}')
-        else:
-            docrawl_logger.error('Page was not loaded')
-            raise PageDidNotLoadError()
+    def submit_function(self, function, function_input=None) -> str:
+        """
+        Queue spider function without waiting for it to finish. Functions are executed in order of submission.
+            :param function: string, name of spider function, e.g. load_website, scan_web_page
+            :param function_input: dict, input of the function
+            :return: string, command ID used to collect result of the function
+        """
+        command_id = uuid.uuid4().hex
+        command = {"id": command_id, "name": function, "input": function_input}
 
-    def _wait_until_function_is_done(self, timeout=60):
-        # Load spider_requests and spider_functions
-        try:
-            spider_function = self.get_browser_meta_data()['function']
-            is_function_done = spider_function['done']
-        except Exception as e:
-            docrawl_logger.error(f'Error while loading is_function_done: {e}')
-            is_function_done = True
-
-        # Then check if function is done
-        timeout_start = time.time()
-        while not is_function_done and time.time() < timeout_start + timeout:
-            spider_function = self.get_browser_meta_data()['function']
-            is_function_done = spider_function['done']
-            time.sleep(0.5)
-            docrawl_logger.info('Function is still running, waiting 0.5 sec ...')
-
-        if is_function_done:
-            if spider_function["error"] is None:
-                docrawl_logger.success('Spider function finished successfully')
-            else:
-                docrawl_logger.error(f'Spider function failed: {spider_function["error"]}')
-                raise SpiderFunctionError(spider_function['error'])
+        self.command_channel.push_command(command)
+
+        return command_id
+
+    def collect_functions(self, command_ids, timeout=60):
+        """
+        Yield (command ID, result) of submitted spider functions in order in which they finish.
+            :param command_ids: list of command IDs returned by submit_function
+            :param timeout: int, max time in seconds to wait for all functions, unfinished functions are cancelled
+            after it (not executed if they didn't start yet, their results are discarded)
+        """
+        pending_command_ids = list(command_ids)
+        timeout_end = time.time() + timeout
 
+        while pending_command_ids:
+            finished = self.command_channel.wait_result(pending_command_ids, timeout_end - time.time())
+
+            if finished is None:
+                # Following functions would wait behind them and their results would never be collected
+                self.command_channel.cancel_commands(pending_command_ids)
+                docrawl_logger.error('Function was not finished')
+                raise TimeoutError('Spider function timed out')
+
+            command_id, result = finished
+            pending_command_ids.remove(command_id)
+
+            yield command_id, result
+
+    def _wait_until_function_is_done(self, command_id, timeout=60):
+        _, spider_function = next(self.collect_functions([command_id], timeout))
+
+        return self._check_function_result(spider_function)
+
+    def _check_function_result(self, spider_function: dict):
+        """Return value returned by the spider function, raise SpiderFunctionError if it failed."""
+        if spider_function["error"] is None:
+            docrawl_logger.success('Spider function finished successfully')
+            return spider_function.get('result')
         else:
-            docrawl_logger.error('Function was not finished')
-            raise TimeoutError('Spider function timed out')
+            docrawl_logger.error(f'Spider function failed: {spider_function["error"]}')
+            raise SpiderFunctionError(spider_function['error'])
 
     def _execute_function(self, function, function_input=None, timeout=30):
         # docrawl_logger.info(f'Running function {function} with input: {function_input}')
 
         if True:#self.is_browser_active(): #The browser seemed inactive but it was actually active
-            browser_meta_data = self.get_browser_meta_data()
-            function = {"name": function, "input": function_input, "done": False, "error": None}
-            browser_meta_data['function'] = function
-            self.set_browser_meta_data(browser_meta_data)
+            command_id = self.submit_function(function, function_input)
 
-            # self._wait_until_page_is_loaded()
-            self._wait_until_function_is_done(timeout)
+            return self._wait_until_function_is_done(command_id, timeout)
         else:
             docrawl_logger.warning('Browser instance is not active / crashed, function '+str(function)+' could not be executed')
 
-    def acquire_browser(self, driver, in_browser=False, proxy=None):
-        # Need to update browser metadata mainly for proxy
-        self._initialize_browser_metadata(driver=driver, headless=not in_browser, proxy=proxy)
+    def _reset_browser_proxy(self):
+        self.update_browser_meta_data('browser', proxy=None)
 
-        self.active_browser = "browser1"
+    def _prepare_acquire_browser(self, driver, in_browser=False, proxy=None) -> Optional[dict]:
+        """Start the spider if it's not running, return input of acquire_browser function."""
+        if self.is_spider_running:
+            # Need to update browser metadata mainly for proxy
+            self._initialize_browser_metadata(driver=driver, headless=not in_browser, proxy=proxy)
+            return None
 
-        docrawl_logger.warning(f"Acquired browser {self.active_browser}")
+        self.run_spider(driver=driver, in_browser=in_browser, proxy=proxy)
 
-    def release_browser(self):
-        self.active_browser = None
+        # Spider leases the browser when it starts, the function only returns its ID
+        return {'keep_current': True}
 
+    def acquire_browser(self, driver, in_browser=False, proxy=None, timeout=120):
+        """
+        Lease a browser from the browser pool, standby browsers are acquired instantly.
+            :return: str, ID of the leased browser
+        """
+        inp = self._prepare_acquire_browser(driver, in_browser, proxy)
+        self.active_browser = self._execute_function('acquire_browser', inp, timeout)
+
+        docrawl_logger.info(f"Acquired browser {self.active_browser}")
+
+        return self.active_browser
+
+    def release_browser(self, timeout=20):
+        """Return the browser to the browser pool, so that it can be acquired by other clients."""
+        if self.is_spider_running:
+            self._execute_function('release_browser', None, timeout)
+
+        self.active_browser = None
 
     def run_spider(self, driver='Firefox', in_browser: bool = False, proxy: dict = None):
         self._initialize_browser_metadata(driver=driver, headless=not in_browser, proxy=proxy)
 
-        setup()
-        crawler = CrawlerRunner()
-        crawler.crawl(DocrawlSpider, docrawl_client=self)
+        if self.supervisor is not None:
+            self.supervisor.run_spider(self)
+        else:
+            setup()
+            crawler = CrawlerRunner()
+            crawler.crawl(DocrawlSpider, docrawl_client=self)
+        self.is_spider_running = True
 
     def restart_browser(self, driver='Firefox', in_browser=False, proxy=None, as_new=False):
         """
@@ -194,48 +328,211 @@ class DocrawlClient:
         """
         if as_new:
             self._initialize_browser_metadata(driver=driver, headless=not in_browser, proxy=proxy)
-        self._execute_function('restart_browser', None, timeout=120)
+        return self._execute_function('restart_browser', None, timeout=120)
 
-    def load_website(self, url, timeout=20):
+    def load_website(self, url, timeout=20, render_mode='browser', key_xpaths=None, blocking_profile=None):
+        """
+        Launches load_website from core.
+            :param url: str, URL of the page
+            :param render_mode: str, browser (default), static - page is downloaded without browser and JavaScript,
+            auto - static if all key_xpaths are present in the static HTML, browser otherwise (decided once per domain)
+            :param key_xpaths: list of XPaths, required by auto render mode
+            :param blocking_profile: dict, optional, resources blocked during this load only (resource_types,
+            blocked_domains), see set_resource_blocking
+            :return: str, render mode used to load the page (browser or static)
+
+        Pages loaded without browser can be scanned and extracted from, but not interacted with (clicks, scrolling,
+        screenshots), those functions raise SpiderFunctionError until a page is loaded in the browser.
+        """
+        inp = {
+            'url': self._prepare_url(url),
+            'render_mode': render_mode,
+            'key_xpaths': key_xpaths,
+            'blocking_profile': blocking_profile,
+        }
+
+        try:
+            used_render_mode = self._execute_function('load_website', inp, timeout)
+        except TimeoutError as e:
+            docrawl_logger.error('Page was not loaded')
+            raise PageDidNotLoadError() from e
+
+        docrawl_logger.warning(f'Page loaded: {inp["url"]} ({used_render_mode})')
+
+        return used_render_mode
+
+    def _prepare_url(self, url):
         if "http" not in url:
             url = "http://" + url
 
-        request = {"url": url, "loaded": False}
-        browser_meta_data = self.get_browser_meta_data()
-        browser_meta_data['request'] = request
-        self.set_browser_meta_data(browser_meta_data)
+        return url
+
+    def set_resource_blocking(self, enabled=True, resource_types=None, blocked_domains=None, timeout=20):
+        """
+        Launches set_resource_blocking from core. Blocked resources are not downloaded during all following page
+        loads (Chrome blocks them via CDP, other browsers via selenium-wire), which makes loads faster and saves
+        proxy bandwidth.
+            :param enabled: bool, False removes blocking
+            :param resource_types: list, optional, of image, font, media, stylesheet (image, font, media by default)
+            :param blocked_domains: list, optional, domains (incl. subdomains) of blocked requests, common trackers
+            by default
+            :return: bool, False if the browser doesn't support blocking
+        """
+        inp = {'enabled': enabled}
+        if resource_types is not None:
+            inp['resource_types'] = list(resource_types)
+        if blocked_domains is not None:
+            inp['blocked_domains'] = list(blocked_domains)
+
+        return self._execute_function('set_resource_blocking', inp, timeout)
+
+    def get_resource_blocking_stats(self, timeout=20):
+        """
+        Launches get_resource_blocking_stats from core.
+            :return: dict (requests_blocked, blocked_by_type, blocked_by_domain, estimated_bytes_saved,
+            requests_loaded, bytes_loaded, pages_loaded). Chrome's blocked requests are counted from its performance
+            log, other browsers' in selenium-wire. Counters of blocked requests are None if the browser couldn't
+            count them. estimated_bytes_saved is the number of requests blocked by type times the average size of
+            loaded resources of the type, None if the size of no blocked type was measured
+        """
+        return self._execute_function('get_resource_blocking_stats', None, timeout)
+
+    def set_network_capture_policy(self, url_patterns=None, content_types=('application/json',), max_exchanges=100,
+                                   clear_on_navigation=True, timeout=20):
+        """
+        Launches set_network_capture_policy from core. Requests matching the policy are collected after each page
+        load, see get_browser_requests.
+            :param url_patterns: list of regexes, optional, only requests with URL matching any of them are collected
+            :param content_types: list of content type prefixes of the response, None to collect all requests
+            :param max_exchanges: int, only the latest requests are kept
+            :param clear_on_navigation: bool, forget requests of previous pages, so each load goes through requests
+            of the loaded page only
+        """
+        inp = {
+            'url_patterns': list(url_patterns) if url_patterns else None,
+            'content_types': list(content_types) if content_types else None,
+            'max_exchanges': max_exchanges,
+            'clear_on_navigation': clear_on_navigation,
+        }
+
+        return self._execute_function('set_network_capture_policy', inp, timeout)
+
+    def take_screenshot(self, compression=None, max_dimension=None, quality=80, ttl=None, timeout=20):
+        """
+        Launches take_screenshot from core, full page screenshot is stored as bytes (see get_browser_screenshot).
+            :param compression: str, optional, zstd - lossless compression of the PNG, webp - re-encoded as WebP
+            (requires Pillow)
+            :param max_dimension: int, optional, screenshots with bigger width or height are downscaled (requires
+            Pillow)
+            :param quality: int, 1 - 100, quality of WebP
+            :param ttl: int, optional, seconds after which the screenshot is removed from the storage
+        """
+        inp = {
+            'compression': compression,
+            'max_dimension': max_dimension,
+            'quality': quality,
+            'ttl': ttl,
+        }
+
+        return self._execute_function('take_screenshot', inp, timeout)
+
+    def take_screenshot_tile(self, index=0, tile_height=2000, compression=None, max_dimension=None, quality=80,
+                             ttl=None, timeout=20):
+        """
+        Launches take_screenshot_tile from core. The page is captured in tiles of tile_height, so consumers can fetch
+        only the tiles they display (see get_browser_screenshot_tile). A tile is captured again only if the page
+        changed.
+            :param index: int, number of the tile from the top of the page
+            :param tile_height: int, height of tiles in CSS pixels (Chrome), other browsers use viewport height
+            :param compression: str, optional, zstd or webp, see take_screenshot
+            :param max_dimension: int, optional, see take_screenshot
+            :param quality: int, quality of WebP
+            :param ttl: int, optional, seconds after which the tile is removed from the storage
+            :return: dict, tile (index, y, width, height, page_height, number_of_tiles, dom_hash, cached)
+        """
+        inp = {
+            'index': index,
+            'tile_height': tile_height,
+            'compression': compression,
+            'max_dimension': max_dimension,
+            'quality': quality,
+            'ttl': ttl,
+        }
+
+        return self._execute_function('take_screenshot_tile', inp, timeout)
+
+    def start_screencast(self, image_format='jpeg', quality=70, max_width=1280, max_height=720, max_fps=5,
+                         max_frames=0, timeout=20):
+        """
+        Launches start_screencast from core (Chrome only). Frames are streamed by Chrome whenever the page is
+        repainted and published as the screenshot (see get_browser_screenshot), no screenshots are taken.
+            :param image_format: str, jpeg or png
+            :param quality: int, 0 - 100, quality of JPEG frames
+            :param max_width: int, frames are downscaled to fit max_width x max_height
+            :param max_height: int
+            :param max_fps: float, max number of frames per second
+            :param max_frames: int, number of latest frames kept (see get_browser_screencast_frames), 0 to keep only
+            the screenshot
+        """
+        inp = {
+            'image_format': image_format,
+            'quality': quality,
+            'max_width': max_width,
+            'max_height': max_height,
+            'max_fps': max_fps,
+            'max_frames': max_frames,
+        }
 
-        self._wait_until_page_is_loaded(timeout)
+        return self._execute_function('start_screencast', inp, timeout)
 
-    def take_screenshot(self, timeout=20):
-        self._execute_function('take_screenshot', None, timeout)
+    def stop_screencast(self, timeout=20):
+        """
+        Launches stop_screencast from core.
+            :return: int, number of streamed frames
+        """
+        return self._execute_function('stop_screencast', None, timeout)
 
-    def take_png_screenshot(self, filename, timeout=20):
+    def take_png_screenshot(self, filename, live_preview=False, image_format='jpeg', quality=70, max_width=1280,
+                            hash_method='bytes', timeout=20):
         """
         Launches take_screenshot from core.
             :param filename: string, output filename (where to save the screenshot).
+            :param live_preview: bool, take viewport screenshots, downscaled and compressed, which are saved and
+            published (see get_browser_screenshot) only when the page changes. Extension of the filename is replaced
+            by the extension of image_format. Compression requires Pillow, PNG is used without it.
+            :param image_format: str, live preview format, jpeg, webp or png
+            :param quality: int, 1 - 100, live preview quality of JPEG / WebP
+            :param max_width: int, live preview width, wider screenshots are downscaled
+            :param hash_method: str, bytes or perceptual (ignores small changes of the page), used to detect changes
         """
         inp = {
-            'filename': str(filename)  # Cast to str, e.g. when Path object is passed
+            'filename': str(filename),  # Cast to str, e.g. when Path object is passed
+            'live_preview': live_preview,
+            'image_format': image_format,
+            'quality': quality,
+            'max_width': max_width,
+            'hash_method': hash_method,
         }
 
-        self._execute_function('take_png_screenshot', inp, timeout)
+        return self._execute_function('take_png_screenshot', inp, timeout)
 
-    def extract_page_source(self, filename, timeout=20):
+    def extract_page_source(self, filename=None, timeout=20):
         """
         Launches extract_page_source from core.
-            :param filename: string, name of file that will be used for storing page source.
+            :param filename: string, optional, name of file that will be used for storing page source.
+            :return: string, page source
         """
         inp = {
             'filename': filename
         }
 
-        self._execute_function('extract_page_source', inp, timeout)
+        return self._execute_function('extract_page_source', inp, timeout)
 
     def scan_web_page(self, incl_tables=False, incl_bullets=False, incl_texts=False, incl_headlines=False,
                       incl_links=False,
                       incl_images=False, incl_buttons=False, by_xpath=None, context_xpath=None, cookies_xpath=None,
-                      output_folder='output/scraped_data', timeout=30):
+                      output_folder='output/scraped_data', driverless=False, incremental=False, use_cache=True,
+                      timeout=30):
         """
         Launches find_tables function from core.
             :param incl_tables: boolean, search for tables
@@ -247,6 +544,10 @@ class DocrawlClient:
             :param incl_buttons: boolean, search for buttons
             :param by_xpath: str, search elements by custom XPath
             :param output_folder: str, path to output folder.
+            :param driverless: boolean, scan page source with lxml only (faster, elements have no rect)
+            :param incremental: boolean, extract again only elements changed since the previous scan with the same
+            parameters (e.g. after click), diff of elements is available via get_browser_scanned_elements_diff
+            :param use_cache: boolean, return elements of the previous scan if the page and parameters didn't change
         """
         inp = {
             'incl_tables': incl_tables,
@@ -260,9 +561,19 @@ class DocrawlClient:
             'context_xpath': context_xpath,
             'cookies_xpath': cookies_xpath,
             'output_folder': output_folder,
+            'driverless': driverless,
+            'incremental': incremental,
+            'use_cache': use_cache,
         }
 
-        self._execute_function('scan_web_page', inp, timeout)
+        return self._execute_function('scan_web_page', inp, timeout)
+
+    def get_scan_cache_stats(self, timeout=20):
+        """
+        Launches get_scan_cache_stats from core.
+            :return: dict (hits, misses, size), counters of scans answered from the cache (see scan_web_page use_cache)
+        """
+        return self._execute_function('get_scan_cache_stats', None, timeout)
 
     def wait_until_element_is_located(self, xpath, timeout=20):
         """
@@ -273,25 +584,24 @@ class DocrawlClient:
             'xpath': xpath
         }
 
-        self._execute_function('wait_until_element_is_located', inp, timeout)
+        return self._execute_function('wait_until_element_is_located', inp, timeout)
 
-    def get_current_url(self, filename, timeout=20):
+    def get_current_url(self, filename=None, timeout=20):
         """
         Launches get_current_url function from core.
-            :param filename: string, name of file that will be used for storing the URL.
+            :param filename: string, optional, name of file that will be used for storing the URL.
+            :return: string, current URL
         """
         inp = {
             'filename': filename
         }
 
-        self._execute_function('get_current_url', inp, timeout)
+        return self._execute_function('get_current_url', inp, timeout)
 
     def close_browser(self, timeout=10):
         """Launch close_browser function from core."""
         self._execute_function('close_browser', None, timeout)
-        browser_metadata = self.get_browser_meta_data()
-        browser_metadata['browser']['proxy'] = None
-        self.set_browser_meta_data(browser_metadata)
+        self._reset_browser_proxy()
 
         # pid = self.get_browser_meta_data()['browser']['pid']
 
@@ -313,71 +623,205 @@ class DocrawlClient:
             'scroll_max': scroll_max
         }
 
-        self._execute_function('scroll_web_page', inp, timeout)
+        return self._execute_function('scroll_web_page', inp, timeout)
 
-    def download_images(self, image_xpath, filename, timeout=20):
+    def download_images(self, image_xpath, filename, max_workers=8, timeout=20):
         """
         Launches download_image function from core.
             :param image_xpath: string, url of image
             :param filename: string, output filename.
+            :param max_workers: int, max number of images downloaded at once
+            :return: list of dicts, status of each image (url, filename, status - downloaded / skipped / failed,
+            status_code, size, error)
         """
         inp = {
             'image_xpath': image_xpath,
             'filename': filename,
+            'max_workers': max_workers,
         }
 
-        self._execute_function('download_images', inp, timeout)
+        return self._execute_function('download_images', inp, timeout)
 
-    def extract_xpath(self, xpath, filename, write_in_file_mode="w+", timeout=20):
+    def extract_xpath(self, xpath, filename=None, write_in_file_mode="w+", timeout=20):
+        """
+        Launches extract_xpath function from core.
+            :param xpath: string, XPath of extracted elements
+            :param filename: string, optional, name of file that will be used for storing extracted data
+            :return: list of strings, extracted data, empty if nothing matched the XPath
+        """
         inp = {
             'xpath': xpath,
             'filename': filename,
             'write_in_file_mode': write_in_file_mode
         }
 
-        self._execute_function('extract_xpath', inp, timeout)
+        return self._execute_function('extract_xpath', inp, timeout)
 
-    def extract_multiple_xpath(self, xpaths, filename="extracted_data.xlsx", timeout=20):
+    def extract_multiple_xpath(self, xpaths, filename=None, output_format=None, append=False, timeout=20):
+        """
+        Launches extract_multiple_xpaths function from core.
+            :param xpaths: list of strings, XPaths of extracted elements
+            :param filename: string, optional, name of file that will be used for storing extracted data
+            :param output_format: string, optional, csv / jsonl / parquet / xlsx / txt, inferred from filename
+            :param append: boolean, append data to the file (e.g. data of many pages into one file)
+            :return: list of lists of strings, extracted data per XPath (empty list if nothing matched)
+        """
         inp = {
             'xpaths': xpaths,
-            'filename': filename
+            'filename': filename,
+            'output_format': output_format,
+            'append': append,
         }
 
-        self._execute_function('extract_multiple_xpaths', inp, timeout)
+        return self._execute_function('extract_multiple_xpaths', inp, timeout)
 
-    def extract_table_xpath(self, xpath_row, xpath_col, first_row_header, filename="extracted_data.xlsx", timeout=20):
+    def extract_table_xpath(self, xpath_row, xpath_col, first_row_header, filename="extracted_data.csv",
+                            output_format=None, append=False, timeout=20):
+        """
+        Launches extract_table_xpath function from core.
+            :param xpath_row: str or lxml.etree.XPath, XPath of table rows
+            :param xpath_col: str or lxml.etree.XPath, XPath of cells relative to row, e.g. /td
+            :param first_row_header: boolean, use first row as header if there are no <th> cells
+            :param filename: string, name of output file
+            :param output_format: string, optional, csv / jsonl / parquet / xlsx, inferred from filename
+            :param append: boolean, append rows to the file (e.g. rows of many pages into one file)
+
+        Note: compiled XPaths can be passed only with in-process storage (KeepVariableDummyRedisServer), inputs sent
+        through Redis must be JSON serializable.
+        """
         inp = {
             'xpath_row': xpath_row,
             'xpath_col': xpath_col,
             'first_row_header': first_row_header,
-            'filename': filename
+            'filename': filename,
+            'output_format': output_format,
+            'append': append,
         }
 
-        self._execute_function('extract_table_xpath', inp, timeout)
+        return self._execute_function('extract_table_xpath', inp, timeout)
 
     def click_xpath(self, xpath, timeout=20):
         inp = {
             'xpath': xpath
         }
 
-        self._execute_function('click_xpath', inp, timeout)
+        return self._execute_function('click_xpath', inp, timeout)
 
     def click_name(self, text, timeout=20):
         inp = {
             'text': text
         }
 
-        self._execute_function('click_name', inp, timeout)
+        return self._execute_function('click_name', inp, timeout)
+
+    def close_output_files(self, filename=None, timeout=20):
+        """
+        Close files appended to by extract functions, Parquet files are readable only after they are closed.
+            :param filename: string, optional, all files are closed if not passed
+        """
+        inp = {
+            'filename': filename
+        }
+
+        return self._execute_function('close_output_files', inp, timeout)
 
     def refresh_page_source(self, timeout=30):
-        self._execute_function('refresh_page_source', None, timeout)
+        return self._execute_function('refresh_page_source', None, timeout)
 
     def send_text(self, xpath, text, timeout=20):
         inp = {
             'xpath': xpath,
             'text': text
         }
-        self._execute_function('send_text', inp, timeout)
+        return self._execute_function('send_text', inp, timeout)
 
     def __exit__(self):
         self.close_browser()
+
+
+class AsyncDocrawlClient(DocrawlClient):
+    """
+    asyncio version of DocrawlClient. Methods executing spider functions (load_website, scan_web_page, extract_xpath,
+    click_xpath, ...) are coroutines, waiting for the spider does not block the event loop nor occupy a thread, so
+    that one event loop can drive many browsers at once.
+
+    Storage getters / setters and run_spider stay synchronous.
+    """
+
+    async def submit_function(self, function, function_input=None) -> str:
+        command_id = uuid.uuid4().hex
+        command = {"id": command_id, "name": function, "input": function_input}
+
+        await self.command_channel.async_push_command(command)
+
+        return command_id
+
+    async def collect_functions(self, command_ids, timeout=60):
+        """Asynchronously yield (command ID, result) of submitted spider functions in order in which they finish."""
+        pending_command_ids = list(command_ids)
+        timeout_end = time.time() + timeout
+
+        while pending_command_ids:
+            finished = await self.command_channel.async_wait_result(pending_command_ids, timeout_end - time.time())
+
+            if finished is None:
+                await self.command_channel.async_cancel_commands(pending_command_ids)
+                docrawl_logger.error('Function was not finished')
+                raise TimeoutError('Spider function timed out')
+
+            command_id, result = finished
+            pending_command_ids.remove(command_id)
+
+            yield command_id, result
+
+    async def _wait_until_function_is_done(self, command_id, timeout=60):
+        async for _, spider_function in self.collect_functions([command_id], timeout):
+            return self._check_function_result(spider_function)
+
+    async def _execute_function(self, function, function_input=None, timeout=30):
+        command_id = await self.submit_function(function, function_input)
+
+        return await self._wait_until_function_is_done(command_id, timeout)
+
+    async def acquire_browser(self, driver, in_browser=False, proxy=None, timeout=120):
+        inp = self._prepare_acquire_browser(driver, in_browser, proxy)
+        self.active_browser = await self._execute_function('acquire_browser', inp, timeout)
+
+        docrawl_logger.info(f"Acquired browser {self.active_browser}")
+
+        return self.active_browser
+
+    async def release_browser(self, timeout=20):
+        if self.is_spider_running:
+            await self._execute_function('release_browser', None, timeout)
+
+        self.active_browser = None
+
+    async def load_website(self, url, timeout=20, render_mode='browser', key_xpaths=None, blocking_profile=None):
+        inp = {
+            'url': self._prepare_url(url),
+            'render_mode': render_mode,
+            'key_xpaths': key_xpaths,
+            'blocking_profile': blocking_profile,
+        }
+
+        try:
+            used_render_mode = await self._execute_function('load_website', inp, timeout)
+        except TimeoutError as e:
+            docrawl_logger.error('Page was not loaded')
+            raise PageDidNotLoadError() from e
+
+        docrawl_logger.warning(f'Page loaded: {inp["url"]} ({used_render_mode})')
+
+        return used_render_mode
+
+    async def close_browser(self, timeout=10):
+        """Launch close_browser function from core."""
+        await self._execute_function('close_browser', None, timeout)
+        self._reset_browser_proxy()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_browser()
@@ -1,15 +1,21 @@
+import base64
 import datetime
+import itertools
 import os
-import re
+import shutil
+import threading
 import time
 import traceback
+from dataclasses import asdict
 
-import lxml.html
-import pandas as pd
 import psutil
-import requests
 import scrapy
+from crochet import run_in_reactor
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import TextResponse
 from scrapy.selector import Selector
+from scrapy.utils.defer import deferred_from_coro
 from selenium.common.exceptions import (
     ElementClickInterceptedException,
     NoSuchElementException,
@@ -20,17 +26,32 @@ from selenium.webdriver import ChromeOptions, FirefoxOptions, ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.proxy import Proxy, ProxyType
 from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.remote.webdriver import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from urllib3.exceptions import MaxRetryError
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.firefox import GeckoDriverManager
 
+from docrawl.browser_pool import BrowserPool
 from docrawl.errors import SpiderFunctionError
+from docrawl.image_downloader import ImageDownloader, ImageDownloadResult
+from docrawl.network_capture import SELENIUM_WIRE_STORAGE_OPTIONS, NetworkCapturePolicy, capture_network
 from docrawl.docrawl_logger import docrawl_logger
-from docrawl.elements import PREDEFINED_TAGS, Element, ElementType, classify_element_by_xpath
-from docrawl.utils import build_abs_url
+from docrawl.render_mode import RenderMode, has_key_xpaths, render_mode_cache
+from docrawl.resource_blocking import (
+    BlockingProfile, BlockingStats, apply_blocking_profile, enable_chrome_blocked_request_log,
+    record_chrome_blocked_requests, record_loaded_resources
+)
+from docrawl.scan_cache import ScanCache
+from docrawl.screencast import ChromeScreencast
+from docrawl.screenshot_tiles import (
+    DEFAULT_TILE_HEIGHT, ScreenshotTile, ScreenshotTileCache, capture_tile_png, get_page_state, get_tile_layout
+)
+from docrawl.screenshots import LivePreview, LivePreviewOptions, compress_screenshot
+from docrawl.scanning import BrowserPageScanner, HtmlPageScanner, ScanState, diff_elements, get_scan_params
+from docrawl.tables import extract_table_by_xpaths
+from docrawl.writers import OutputWriterRegistry
+from docrawl.utils import build_abs_url, get_redis_client, is_redis_backed
 
 # Due to the problems with selenium wire on linux systems
 try:
@@ -40,16 +61,29 @@ except:
     docrawl_logger.error('TRY: pip install blinker==1.7.0')
     from selenium import webdriver
 
-import threading
 
 class ScreenshotThread(threading.Thread):
-    def __init__(self, docrawl_spider, screenshot_filename, interval=0.5):
+    def __init__(self, docrawl_spider, screenshot_filename, interval=0.5, live_preview_options=None):
+        """
+        :param live_preview_options: LivePreviewOptions, optional, take compressed viewport screenshots (published
+        only when the page changes) instead of full page PNG screenshots
+        """
         threading.Thread.__init__(self)
         self.docrawl_spider = docrawl_spider
         self.screenshot_filename=screenshot_filename
         self.interval = interval
         self.stop_event = threading.Event()
         self.number=0
+        self.live_preview = None
+        self.set_live_preview_options(live_preview_options)
+
+    def set_live_preview_options(self, live_preview_options):
+        if live_preview_options is None:
+            self.live_preview = None
+        elif self.live_preview is None or self.live_preview.requested_options != live_preview_options:
+            self.live_preview = LivePreview(live_preview_options)
+        else:
+            self.live_preview.reset()  # The first screenshot of the new request is always published
 
     def run(self):
         while not self.stop_event.is_set():
@@ -58,6 +92,11 @@ class ScreenshotThread(threading.Thread):
 
     def take_screenshot(self):
         self.number+=1
+
+        if self.live_preview is not None:
+            self.take_live_preview()
+            return
+
         #screenshot_name = f"screenshot_{int(time.time())}.png"
         #self.browser.save_screenshot(screenshot_name)
         inp = {
@@ -68,10 +107,155 @@ class ScreenshotThread(threading.Thread):
         #screenshot = self.docrawl_spider.browser.get_full_page_screenshot_as_file(screenshot_name)
         docrawl_logger.info(f"Screenshot thread: Screenshot taken - {self.screenshot_filename}")
 
+    def take_live_preview(self):
+        try:
+            preview = self.live_preview.capture(self.docrawl_spider.browser)
+        except Exception as e:
+            docrawl_logger.error(f'Error while taking live preview screenshot: {e}')
+            return
+
+        if preview is None:
+            docrawl_logger.debug('Screenshot thread: Page did not change, screenshot skipped')
+            return
+
+        filename = self.live_preview.get_filename(str(self.screenshot_filename))
+        with open(filename, 'wb') as f:
+            f.write(preview)
+
+        self.docrawl_spider.docrawl_client.set_browser_screenshot(preview)
+        docrawl_logger.info(f"Screenshot thread: Live preview published - {filename}")
+
     def stop(self):
         self.stop_event.set()
 
 
+def prepare_proxy_string(proxy_info: dict):
+    if proxy_info is None or any([not proxy_info['ip'], not proxy_info['port']]):
+        return None
+    else:
+        proxy_ip = proxy_info['ip']
+        proxy_port = proxy_info['port']
+        proxy_username = proxy_info['username']
+        proxy_password = proxy_info['password']
+
+        if proxy_username and proxy_password:
+            proxy = f'http://{proxy_username}:{proxy_password}@{proxy_ip}:{proxy_port}'
+        else:
+            proxy = f'{proxy_ip}:{proxy_port}'
+
+        return proxy
+
+
+def set_proxy(options, proxy_info: dict) -> dict:
+    """
+    Sets proxy before launching browser instance.
+    :param options: browser options (FirefoxOptions, ChromeOptions)
+    :param proxy_info: proxy params (ip, port, username, password)
+    """
+
+    # If proxy was not set
+    if proxy_info is None or any([not proxy_info['ip'], not proxy_info['port']]):
+        return None
+    else:
+        proxy = prepare_proxy_string(proxy_info)
+
+        # Proxy with authentication
+        if 'http://' in proxy:
+            # selenium-wire proxy settings
+            sw_options = {
+                'proxy': {'http': proxy, 'https': proxy, 'no_proxy': 'localhost,127.0.0.1'}
+            }
+
+        # Proxy without authentication
+        else:
+            sw_options = None
+            firefox_proxies = Proxy()
+            firefox_proxies.ssl_proxy = proxy
+            firefox_proxies.http_proxy = proxy
+            firefox_proxies.proxy_type = ProxyType.MANUAL
+            options.proxy = firefox_proxies
+
+        return sw_options
+
+
+def determine_browser_pid(browser, driver_type: str):
+    if driver_type == 'Firefox':
+        browser_pid = browser.capabilities['moz:processID']
+    elif driver_type == 'Chrome':
+        browser_pid = browser.service.process.pid
+    return browser_pid
+
+
+def launch_browser(driver_type: str, headless: bool, proxy_info: dict = None):
+    """
+    Launch new browser instance.
+        :param driver_type: string, Firefox or Chrome
+        :param headless: bool, run browser without GUI
+        :param proxy_info: dict, proxy params (ip, port, username, password)
+        :return: tuple (browser, pid)
+    """
+    if driver_type == 'Firefox':
+        options = FirefoxOptions()
+        options.set_preference("marionette", True)
+
+        sw_options = {**SELENIUM_WIRE_STORAGE_OPTIONS, **(set_proxy(options, proxy_info) or {})}
+
+        if headless:
+            options.add_argument("--headless")
+            # For headless mode different width of window is needed
+            window_size_x = 1450
+
+        try:
+            service = Service(GeckoDriverManager().install())
+        except Exception as e:
+            service = None
+            docrawl_logger.warning(
+                "GeckoDriverManager update was not successful - launching latest Firefox version instead"
+                + str(e)
+            )
+
+        try:
+            browser = webdriver.Firefox(
+                options=options, service=service, seleniumwire_options=sw_options
+            )
+        except Exception as e:
+            docrawl_logger.error(f'Error while creating Firefox instance {e}')
+            browser = webdriver.Firefox(options=options)
+
+    elif driver_type == 'Chrome':
+        options = ChromeOptions()
+        enable_chrome_blocked_request_log(options)
+
+        sw_options = {**SELENIUM_WIRE_STORAGE_OPTIONS, **(set_proxy(options, proxy_info) or {})}
+
+        if headless:
+            options.add_argument("--headless")
+
+            # For headless mode different width of window is needed
+            window_size_x = 1450
+
+        try:
+            browser = webdriver.Chrome(
+                options=options, service=Service(ChromeDriverManager().install()),
+                seleniumwire_options=sw_options
+            )
+        except Exception as e:
+            docrawl_logger.error(f'Error while creating Chrome instance {e}')
+            browser = webdriver.Chrome(options=options)
+
+    window_size_x = 1820
+    browser.set_window_size(window_size_x, 980)
+
+    return browser, determine_browser_pid(browser, driver_type)
+
+
+# Browsers shared by all spiders of the process
+browser_pool = BrowserPool(launch_browser)
+
+# Scan results shared by all spiders of the process, spiders using KeepVariableRedisServer share them via Redis
+scan_cache = ScanCache()
+
+
 class DocrawlSpider(scrapy.spiders.CrawlSpider):
     name = "forloop"
 
@@ -92,73 +276,48 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         )
         self.kv_redis_key_elements = self.docrawl_client.kv_redis_keys.get('elements', 'elements')
 
+        self.pooled_browser = None
+        self.output_writers = OutputWriterRegistry()  # Files of extracted data which are being appended to
+        self.image_downloader = None  # Keeps connections and downloaded URLs between download_images calls
+        self.blocking_profile = None  # Resources blocked in the browser during page loads
+        self.blocking_stats = BlockingStats()
+        self.screencast = None
         self.browser = self._initialise_browser()
+        self.scan_state = None  # State of the previous scan, used by incremental scan
+        self.screenshot_tiles = ScreenshotTileCache()
+        self.network_capture_policy = NetworkCapturePolicy()
+
+        # Page loaded without browser (static render mode), None if the page is opened in the browser
+        self.static_page_source = None
+        self.static_page_url = None
+
+        kv_redis = self.docrawl_client.kv_redis
+        if is_redis_backed(kv_redis):
+            self.scan_cache = ScanCache(redis_client=get_redis_client(kv_redis))
+        else:
+            self.scan_cache = scan_cache
 
         self.screenshot_thread = None  # needs to be initialized to None before execution
+        self.command_thread = None
         self.start_requests()
 
     def _initialise_browser(self):
-        browser_meta_data = self.docrawl_client.get_browser_meta_data()
-        self.driver_type = browser_meta_data['browser']['driver']
-        self.headless = browser_meta_data['browser']['headless']
-        proxy_info = browser_meta_data['browser']['proxy']
+        """Lease browser matching browser metadata from the browser pool."""
+        browser_settings = self.docrawl_client.get_browser_meta_data_section('browser')
+        self.driver_type = browser_settings['driver']
+        self.headless = browser_settings['headless']
+        proxy_info = browser_settings['proxy']
 
-        if self.driver_type == 'Firefox':
-            self.options = FirefoxOptions()
-            self.options.set_preference("marionette", True)
+        self.pooled_browser = browser_pool.lease(self.driver_type, self.headless, proxy_info)
+        self.browser = self.pooled_browser.browser
 
-            sw_options = self._set_proxy(proxy_info)
+        if self.blocking_profile is not None:
+            self._apply_blocking_profile(self.blocking_profile)
 
-            if self.headless:
-                self.options.add_argument("--headless")
-                # For headless mode different width of window is needed
-                window_size_x = 1450
-
-            try:
-                service = Service(GeckoDriverManager().install())
-            except Exception as e:
-                service = None
-                docrawl_logger.warning(
-                    "GeckoDriverManager update was not successful - launching latest Firefox version instead"
-                    + str(e)
-                )
-
-            try:
-                self.browser = webdriver.Firefox(
-                    options=self.options, service=service, seleniumwire_options=sw_options
-                )
-            except Exception as e:
-                docrawl_logger.error(f'Error while creating Firefox instance {e}')
-                self.browser = webdriver.Firefox(options=self.options)
-
-        elif self.driver_type == 'Chrome':
-            self.options = ChromeOptions()
-
-            sw_options = self._set_proxy(proxy_info)
-
-            if self.headless:
-                self.options.add_argument("--headless")
-
-                # For headless mode different width of window is needed
-                window_size_x = 1450
-
-            try:
-                self.browser = webdriver.Chrome(
-                    options=self.options, service=Service(ChromeDriverManager().install()),
-                    seleniumwire_options=sw_options
-                )
-            except Exception as e:
-                docrawl_logger.error(f'Error while creating Chrome instance {e}')
-                self.browser = webdriver.Chrome(options=self.options)
-
-        window_size_x = 1820
-        self.browser.set_window_size(window_size_x, 980)
-
-        browser_meta_data['browser']['pid'] = self._determine_browser_pid()
-        if browser_meta_data.get('request'):
-            browser_meta_data['request']['loaded'] = False
-        self.docrawl_client.set_browser_meta_data(browser_meta_data)
-        docrawl_logger.info(f'Browser settings: {browser_meta_data}')
+        self.docrawl_client.update_browser_meta_data('browser', pid=self.pooled_browser.pid, id=self.pooled_browser.id)
+        if self.docrawl_client.get_browser_meta_data_section('request'):
+            self.docrawl_client.update_browser_meta_data('request', loaded=False)
+        docrawl_logger.info(f'Browser settings: {browser_settings}')
 
         return self.browser
 
@@ -168,12 +327,11 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
 
         :param browser: driver instance
         """
-        try:
-            self.browser.quit()
-        except ConnectionRefusedError as e:
-            docrawl_logger.error(f'Error while closing the browser: {e}')
-        except Exception as e:
-            docrawl_logger.error(f'Error while closing the browser: {e}')
+        self._stop_screencast()
+
+        if self.pooled_browser is not None:
+            browser_pool.discard(self.pooled_browser)
+            self.pooled_browser = None
 
         # # Remove proxy after closing browser instance
         # proxy = {'ip': '', 'port': '', 'username': '', 'password': ''}
@@ -188,16 +346,51 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
             self._close_browser(inp)
         else:
             docrawl_logger.error("Browser crashed")
+            self.pooled_browser = None
 
         self.browser = self._initialise_browser()
         docrawl_logger.warning("Browser restarted")
 
+    def _acquire_browser(self, inp=None):
+        """
+        Swap current browser for a pooled one matching (possibly changed) browser metadata.
+            :param inp: dict, optional (keep_current - keep the browser leased when the spider started)
+            :return: str, ID of the leased browser
+        """
+        if not (inp or {}).get('keep_current') or self.pooled_browser is None:
+            self._release_browser(inp)
+            self.browser = self._initialise_browser()
+
+        docrawl_logger.info(f"Acquired browser {self.pooled_browser.id}")
+
+        return self.pooled_browser.id
+
+    def _release_browser(self, inp=None):
+        """Return current browser to the browser pool."""
+        self._stop_screencast()
+
+        if self.pooled_browser is not None:
+            # Other spiders leasing the browser don't block anything by default
+            if self.blocking_profile is not None:
+                self._apply_blocking_profile(None)
+
+            browser_pool.release(self.pooled_browser)
+            self.pooled_browser = None
+            self.browser = None
+
     def __del__(self):
-        self.browser.quit()
+        if self.pooled_browser is not None:
+            browser_pool.discard(self.pooled_browser)
+
+        self.output_writers.close()
+        self._stop_screencast()
+
+        if self.image_downloader is not None:
+            self.image_downloader.close()
 
     def is_browser_active(self):
         try:
-            pid = self.docrawl_client.get_browser_meta_data()['browser']['pid']
+            pid = self.docrawl_client.get_browser_meta_data_section('browser')['pid']
             proc = psutil.Process(pid)
             is_process_active = proc.status() not in [
                 psutil.STATUS_ZOMBIE,
@@ -209,67 +402,64 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         except (KeyError, psutil.NoSuchProcess):
             return False
 
-    def _prepare_proxy_string(self, proxy_info: dict):
-        if proxy_info is None or any([not proxy_info['ip'], not proxy_info['port']]):
-            return None
-        else:
-            proxy_ip = proxy_info['ip']
-            proxy_port = proxy_info['port']
-            proxy_username = proxy_info['username']
-            proxy_password = proxy_info['password']
-
-            if proxy_username and proxy_password:
-                proxy = f'http://{proxy_username}:{proxy_password}@{proxy_ip}:{proxy_port}'
-            else:
-                proxy = f'{proxy_ip}:{proxy_port}'
-
-            return proxy
-
     def _update_proxy(self, proxy_info: dict):
         if proxy_info is None or any([not proxy_info['ip'], not proxy_info['port']]):
             return None
         else:
-            proxy = self._prepare_proxy_string(proxy_info)
+            proxy = prepare_proxy_string(proxy_info)
 
             self.browser.proxy = {"http": proxy, "https": proxy, "verify_ssl": False}
             docrawl_logger.warning("Proxy updated")
 
-    def _set_proxy(self, proxy_info: dict) -> dict:
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._on_spider_idle, signal=signals.spider_idle)
+
+        return spider
+
+    def _on_spider_idle(self, spider):
+        # Engine has to stay open while commands are executed, static pages are downloaded by it
+        if spider is self and self.command_thread is not None and self.command_thread.is_alive():
+            raise DontCloseSpider
+
+    @run_in_reactor
+    def _download_in_reactor(self, url):
+        request = scrapy.Request(url=url, dont_filter=True)
+        engine = self.crawler.engine
+
+        if hasattr(engine, 'download_async'):
+            return deferred_from_coro(engine.download_async(request))
+
+        return engine.download(request)
+
+    def _download_static_page(self, url, timeout=20):
         """
-        Sets proxy before launching browser instance.
-        :param proxy_info: proxy params (ip, port, username, password)
+        Download page by Scrapy's downloader (from the command thread), JavaScript is not executed.
+            :param url: str, URL of the page
+            :param timeout: max time in seconds to wait for the response
+            :return: TextResponse
         """
+        response = self._download_in_reactor(url).wait(timeout)
 
-        # If proxy was not set
-        if proxy_info is None or any([not proxy_info['ip'], not proxy_info['port']]):
-            return None
-        else:
-            proxy = self._prepare_proxy_string(proxy_info)
+        if not isinstance(response, TextResponse):
+            raise ValueError(f'Response from {url} is not a text page')
+        if response.status >= 400:
+            raise ValueError(f'Response from {url} has status {response.status}')
 
-            # Proxy with authentication
-            if 'http://' in proxy:
-                # selenium-wire proxy settings
-                sw_options = {
-                    'proxy': {'http': proxy, 'https': proxy, 'no_proxy': 'localhost,127.0.0.1'}
-                }
+        return response
 
-            # Proxy without authentication
-            else:
-                sw_options = None
-                firefox_proxies = Proxy()
-                firefox_proxies.ssl_proxy = proxy
-                firefox_proxies.http_proxy = proxy
-                firefox_proxies.proxy_type = ProxyType.MANUAL
-                self.options.proxy = firefox_proxies
-
-            return sw_options
-
-    def _determine_browser_pid(self):
-        if self.driver_type == 'Firefox':
-            browser_pid = self.browser.capabilities['moz:processID']
-        elif self.driver_type == 'Chrome':
-            browser_pid = self.browser.service.process.pid
-        return browser_pid
+    def _check_page_is_in_browser(self):
+        """Raise SpiderFunctionError if the page was loaded without browser, which still shows the previous page."""
+        if self.static_page_source is not None:
+            raise SpiderFunctionError(f'Page {self.static_page_url} was loaded without browser (static render mode), '
+                                      f'load it with render_mode browser to interact with it')
+
+    def _get_page_url(self):
+        return self.static_page_url if self.static_page_source is not None else self.browser.current_url
+
+    def _get_page_source(self):
+        return self.static_page_source if self.static_page_source is not None else self.browser.page_source
 
     def start_requests(self):
         URLS = ['https://www.forloop.ai']
@@ -282,7 +472,161 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
     def _init_function(self, inp):
         docrawl_logger.warning("_init_function is being executed")
 
+    def _load_website(self, inp):
+        """
+        Loads website in the browser or without it (static HTML downloaded by Scrapy, JavaScript is not executed).
+            :param inp: list, inputs from launcher (url, render_mode - optional, browser / static / auto, key_xpaths -
+            optional, auto mode loads the page without browser if all key XPaths are present in the static HTML)
+            :return: str, render mode used to load the page (browser or static)
+
+        Decision of the auto mode is cached per domain, so other pages of the domain skip the check.
+        """
+        url = inp['url']
+        render_mode = RenderMode(inp.get('render_mode') or RenderMode.BROWSER)
+        key_xpaths = inp.get('key_xpaths')
+
+        if render_mode == RenderMode.AUTO and not key_xpaths:
+            docrawl_logger.warning('Auto render mode requires key_xpaths, page is loaded in browser')
+            render_mode = RenderMode.BROWSER
+
+        cached_render_mode = render_mode_cache.get(url) if render_mode == RenderMode.AUTO else None
+
+        if render_mode == RenderMode.STATIC or (render_mode == RenderMode.AUTO
+                                                and cached_render_mode != RenderMode.BROWSER):
+            try:
+                response = self._download_static_page(url)
+            except Exception as e:
+                if render_mode == RenderMode.STATIC:
+                    raise
+                docrawl_logger.warning(f'Static download of {url} failed, page is loaded in browser: {e}')
+                response = None
+
+            if response is not None:
+                page = Selector(response)
+
+                if render_mode == RenderMode.STATIC or cached_render_mode == RenderMode.STATIC \
+                        or has_key_xpaths(page.root, key_xpaths):
+                    if render_mode == RenderMode.AUTO:
+                        render_mode_cache.set(url, RenderMode.STATIC)
+
+                    self._set_static_page(url, response, page)
+                    return str(RenderMode.STATIC)
+
+            if render_mode == RenderMode.AUTO:
+                render_mode_cache.set(url, RenderMode.BROWSER)
+
+        self._load_website_in_browser(url, inp.get('blocking_profile'))
+
+        return str(RenderMode.BROWSER)
+
+    def _set_static_page(self, url, response, page):
+        self.page = page
+        self.static_page_source = response.text
+        self.static_page_url = response.url
+        self.scan_state = None
+
+        headers = {key.decode('utf8'): b', '.join(values).decode('utf8') for key, values in response.headers.items()}
+        self.docrawl_client.set_browser_headers(headers)
+        self.docrawl_client.set_browser_requests([])
+
+        self.docrawl_client.update_browser_meta_data('request', url=url, loaded=True)
+
+    def _load_website_in_browser(self, url, blocking_profile=None):
+        """
+        :param blocking_profile: dict, optional, resources blocked during this load instead of the browser's profile
+        (see set_resource_blocking)
+        """
+        proxy = self.docrawl_client.get_browser_meta_data_section('browser')['proxy']
+
+        if hasattr(self.browser, "proxy"):
+            if proxy != self.browser.proxy:
+                docrawl_logger.warning('Proxy was updated in meanwhile')
+                self._update_proxy(proxy)
+
+        # Requests of previous pages would be searched through after each load
+        is_network_captured = hasattr(self.browser, 'requests')  # False if selenium-wire is not available
+        if is_network_captured and self.network_capture_policy.clear_on_navigation:
+            del self.browser.requests
+
+        load_blocking_profile = self.blocking_profile
+        if blocking_profile is not None:
+            load_blocking_profile = BlockingProfile(**blocking_profile)
+            self._apply_blocking_profile(load_blocking_profile)
+
+        try:
+            self.browser.get(url)
+        finally:
+            if blocking_profile is not None:
+                self._apply_blocking_profile(self.blocking_profile)
+
+        self.scan_state = None
+        self.screenshot_tiles.clear()
+        self.static_page_source = None
+        self.static_page_url = None
+
+        page_source = self.browser.page_source
+        if isinstance(page_source, bytes):
+            page_source = page_source.decode('utf8')
+
+        self.page = Selector(text=page_source)
+
+        # collect headers for current page and requests matching the capture policy (url, status code, headers
+        # from response, content from response)
+        headers, requests = None, []
+        if is_network_captured:
+            headers, requests = capture_network(self.browser.requests, url, self.network_capture_policy)
+        self.docrawl_client.set_browser_headers(headers)
+
+        # collect cookies for current page
+        cookies = [dict(cookie) for cookie in self.browser.get_cookies()]
+        self.docrawl_client.set_browser_cookies(cookies)
+
+        self.docrawl_client.set_browser_requests(requests)
+
+        try:
+            record_loaded_resources(self.browser, self.blocking_stats)
+        except WebDriverException as e:
+            docrawl_logger.warning(f'Loaded resources were not counted: {e}')
+
+        if isinstance(self.browser, webdriver.Chrome):
+            record_chrome_blocked_requests(self.browser, load_blocking_profile, self.blocking_stats)
+
+        self.docrawl_client.update_browser_meta_data('request', url=url, loaded=True)
+
+    def _apply_blocking_profile(self, blocking_profile):
+        return apply_blocking_profile(self.browser, blocking_profile, self.blocking_stats,
+                                      use_cdp=isinstance(self.browser, webdriver.Chrome))
+
+    def _set_resource_blocking(self, inp):
+        """
+        Sets resources blocked in the browser during all following page loads.
+            :param inp: list, inputs from launcher (enabled, resource_types - image / font / media / stylesheet,
+            blocked_domains)
+            :return: bool, False if the browser doesn't support blocking
+        """
+        inp = dict(inp)
+        self.blocking_profile = BlockingProfile(**inp) if inp.pop('enabled', True) else None
+
+        return self._apply_blocking_profile(self.blocking_profile)
+
+    def _get_resource_blocking_stats(self, inp):
+        """
+        Returns counters of blocked requests and of requests and bytes loaded by the pages since the spider started.
+        Requests blocked by Chrome are counted from its performance log, by other browsers in selenium-wire.
+        """
+        return self.blocking_stats.to_dict()
+
+    def _set_network_capture_policy(self, inp):
+        """
+        Sets which requests are published after each page load.
+            :param inp: list, inputs from launcher (url_patterns, content_types, max_exchanges, clear_on_navigation,
+            see NetworkCapturePolicy)
+        """
+        self.network_capture_policy = NetworkCapturePolicy(**inp)
+
     def _click_class(self, inp):
+        self._check_page_is_in_browser()
+
         class_input = inp.get("filename")
         index = inp.get("index", 0)
         tag = inp.get("tag", "div")
@@ -297,10 +641,16 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         Take screenshot of current page and save it.
 
         :param browser: Selenium driver, browser instance
+        :param inp: list, inputs from launcher (compression - optional, zstd / webp, max_dimension - optional,
+        bigger screenshots are downscaled, quality - quality of WebP, ttl - optional, expiration of the screenshot)
         """
+        self._check_page_is_in_browser()
+
+        inp = inp or {}
+
         if isinstance(self.browser, webdriver.Firefox):
             root_element = self.browser.find_element(By.XPATH, '/html')
-            string = self.browser.get_full_page_screenshot_as_base64()
+            png = self.browser.get_full_page_screenshot_as_png()
             self.browser.execute_script("return arguments[0].scrollIntoView(true);", root_element)
 
         elif isinstance(self.browser, webdriver.Chrome):
@@ -317,11 +667,91 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
                     },
             }
             # Dictionary with 1 key: data
-            string = self.browser.execute_cdp_cmd('Page.captureScreenshot', screenshot_config)['data']
+            png = base64.b64decode(self.browser.execute_cdp_cmd('Page.captureScreenshot', screenshot_config)['data'])
         else:
             raise NotImplementedError(f"Screenshot is not implemented for {self.browser} browser")
 
-        self.docrawl_client.set_browser_screenshot(string)
+        screenshot = compress_screenshot(png, inp.get('compression'), inp.get('max_dimension'), inp.get('quality', 80))
+        self.docrawl_client.set_browser_screenshot(screenshot, ttl=inp.get('ttl'))
+
+    def _take_screenshot_tile(self, inp):
+        """
+        Takes screenshot of one tile (horizontal stripe) of the page, so long pages are never rendered into one
+        bitmap. Tiles are captured on demand and captured again only if the DOM changed.
+            :param inp: list, inputs from launcher (index, tile_height - optional, browsers without CDP use viewport
+            height, compression, max_dimension, quality, ttl - see take_screenshot)
+            :return: dict, tile (index, y, width, height, page_height, number_of_tiles, dom_hash, cached)
+        """
+        self._check_page_is_in_browser()
+
+        index = inp.get('index', 0)
+        use_cdp = isinstance(self.browser, webdriver.Chrome)
+
+        page_state = get_page_state(self.browser)
+        tile_height = (inp.get('tile_height') or DEFAULT_TILE_HEIGHT) if use_cdp else page_state['viewportHeight']
+        options = (tile_height, inp.get('compression'), inp.get('max_dimension'), inp.get('quality', 80))
+        key = self.docrawl_client.get_screenshot_tile_key(index)
+
+        tile = self.screenshot_tiles.get(index, page_state['domHash'], options)
+        if tile is not None and self.docrawl_client.screenshot_store.exists(key):
+            return dict(asdict(tile), cached=True)
+
+        y, height, number_of_tiles = get_tile_layout(page_state['pageHeight'], index, tile_height)
+        width = page_state['pageWidth'] if use_cdp else page_state['viewportWidth']
+
+        png, y = capture_tile_png(self.browser, y, width, height, page_state, use_cdp)
+        screenshot = compress_screenshot(png, inp.get('compression'), inp.get('max_dimension'), inp.get('quality', 80))
+        self.docrawl_client.set_browser_screenshot(screenshot, ttl=inp.get('ttl'), key=key)
+
+        tile = ScreenshotTile(index=index, y=y, width=width, height=height, page_height=page_state['pageHeight'],
+                              number_of_tiles=number_of_tiles, dom_hash=page_state['domHash'])
+        self.screenshot_tiles.set(tile, options)
+
+        return asdict(tile)
+
+    def _start_screencast(self, inp):
+        """
+        Starts streaming of Chrome's screencast, each new frame is published as the screenshot.
+            :param inp: list, inputs from launcher (image_format - jpeg / png, quality, max_width, max_height, max_fps,
+            max_frames - optional, number of latest frames kept in the frame ring, no frames are kept if 0)
+        """
+        self._check_page_is_in_browser()
+
+        if not isinstance(self.browser, webdriver.Chrome):
+            raise NotImplementedError(f"Screencast is not implemented for {self.browser} browser")
+
+        self._stop_screencast()
+
+        max_frames = inp.get('max_frames', 0)
+        frame_ring = self.docrawl_client.screencast_frames
+        frame_ring.clear()
+
+        def publish_frame(data, metadata):
+            self.docrawl_client.set_browser_screenshot(data)
+
+            if max_frames:
+                frame_ring.push({'data': data, 'timestamp': metadata.get('timestamp', time.time())}, max_frames)
+
+        self.screencast = ChromeScreencast(
+            self.browser, publish_frame, image_format=inp.get('image_format', 'jpeg'), quality=inp.get('quality', 70),
+            max_width=inp.get('max_width', 1280), max_height=inp.get('max_height', 720),
+            max_fps=inp.get('max_fps', 5)
+        )
+        self.screencast.start()
+
+    def _stop_screencast(self, inp=None):
+        """
+        Stops streaming of Chrome's screencast.
+            :return: int, number of frames received since the screencast started
+        """
+        if self.screencast is None:
+            return 0
+
+        self.screencast.stop()
+        number_of_frames = self.screencast.number_of_frames
+        self.screencast = None
+
+        return number_of_frames
 
     def _take_png_screenshot(self, inp):
         """
@@ -351,7 +781,8 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
 
                 screenshot = self.browser.get_full_page_screenshot_as_file(filename)
                 try: #TEMPORARY HOT FIX
-                    screenshot = self.browser.get_full_page_screenshot_as_file("./tmp/screenshots/website.png")
+                    # Copy of the rendered screenshot, rendering the page again would double the cost
+                    shutil.copyfile(filename, "./tmp/screenshots/website.png")
                 except Exception as e:
                     print("Docrawl: TEMPORARY TRY EXCEPT")
                 try:
@@ -366,49 +797,49 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         """
         Extracts the source of currently scraped page.
             :param page: Selenium Selector, page to export source from
-            :param inp: list, inputs from launcher (incl_tables, incl_bullets, output_dir)
+            :param inp: list, inputs from launcher (filename - optional, page source is saved to file if passed)
+            :return: page source
         """
 
-        filename = inp['filename']
+        filename = inp.get('filename')
+        page_source = self._get_page_source()
+
+        if filename:
+            with open(filename, 'w+', encoding="utf-8") as f:
+                f.write(page_source)
 
-        with open(filename, 'w+', encoding="utf-8") as f:
-            f.write(self.browser.page_source)
+        return page_source
 
     def _scan_web_page(self, inp):
         """
         Finds different elements (tables, bullet lists) on page.
-            :param page: Selenium Selector, page to search elements in
-            :param inp: list, inputs from launcher (incl_tables, incl_bullets, output_dir)
-            :param browser: webdriver, browser instance
+            :param inp: list, inputs from launcher (incl_tables, incl_bullets, ..., by_xpath, context_xpath,
+            driverless - optional, scan page source with lxml only, incremental - optional, extract again only
+            elements changed since the previous scan and publish diff of elements, use_cache - optional, return
+            cached elements if the page didn't change since it was scanned with the same inputs)
+
+        All candidate elements are serialized in the browser by a single script (see BrowserPageScanner), so the
+        duration of the scan doesn't depend on the number of WebDriver round trips. Elements are published after
+        each section (element type) of the scan together with scan progress.
         """
 
         docrawl_logger.warning("Scan web page has started")
 
-        incl_tables = inp['incl_tables']
-        incl_bullets = inp['incl_bullets']
-        incl_texts = inp['incl_texts']
-        incl_headlines = inp['incl_headlines']
-        incl_links = inp['incl_links']
-        incl_images = inp['incl_images']
-        incl_buttons = inp['incl_buttons']
-        incl_inputs = inp.get('incl_input', True)
-        by_xpath = inp['by_xpath']
-        cookies_xpath = inp['cookies_xpath']  # dev param only
-        context_xpath = inp['context_xpath']
-        output_folder = inp['output_folder']
-
-        # First removed old data
-        self.docrawl_client.set_browser_scanned_elements(elements=[])
-
-        # Dictionary with elements (XPaths, data)
-        final_elements = {}
+        scan_state = self.scan_state
+        scan_params = get_scan_params(inp)
+        # Page loaded without browser can be scanned only from its HTML
+        driverless = inp.get('driverless') or self.static_page_source is not None
+        is_incremental = (inp.get('incremental') and not driverless and scan_state is not None
+                          and scan_state.params == scan_params)
 
-        # Page source for parser
-        innerHTML = self.browser.execute_script("return document.body.innerHTML")
-        tree = lxml.html.fromstring(innerHTML)
+        if not is_incremental:
+            # First removed old data
+            self.docrawl_client.set_browser_scanned_elements(elements=[])
+            self.docrawl_client.set_browser_scanned_elements_diff(None)
 
-        # Url pattern, used to get main page url from current url
-        url_pattern = re.compile('^(((https|http):\/\/|www\.)*[a-zA-Z0-9\.\/\?\:@\-_=#]{2,100}\.[a-zA-Z]{2,6}\/)')
+        progress = {'element_type': None, 'sections_done': 0, 'sections_total': None, 'number_of_elements': 0,
+                    'done': False, 'cached': False}
+        self.docrawl_client.set_browser_scan_progress(progress)
 
         time_start_f = datetime.datetime.now()
 
@@ -419,304 +850,69 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
 
             return f'{sec}:{microsec}'
 
-        def string_cleaner(string):
-            """
-            Removes whitespaces from string.
-                :param string: string, string to clean
-                :return - cleaned string
-            """
-
-            return ''.join(string.strip()).replace('\\', '')
-
-        def process_bullet(xpath):
-            """
-            Processes (cleans) bullet element, e.g. one <li> element per line
-                :param xpath: XPath of element
-            """
-
-            tag_2 = self.page.xpath(xpath)[0]
-            result = []
-            li_tags = tag_2.xpath('.//li')
-
-            # <li> inside <ol> don't contain numbers, but they could be added here
-            for li_tag in li_tags:
-                data = li_tag.xpath('.//text()').getall()
-                data = [string_cleaner(x) for x in data]  # Cleaning the text
-                data = list(filter(None, data))
-                element = ' '.join(data).replace(u'\xa0', u' ')
+        page_source, content_hash = None, None
+        use_cache = inp.get('use_cache', True) and not is_incremental
 
-                result.append(element + '\n')
+        if use_cache:
+            page_source = self._get_page_source()
+            content_hash = ScanCache.get_content_hash(page_source)
+            cached_elements = self.scan_cache.get(self._get_page_url(), scan_params, content_hash)
 
-            return result
+            if cached_elements is not None:
+                # Browser state of incremental scan belongs to an older scan
+                self.scan_state = None
 
-        def extract_element_data(element: WebElement, xpath: str, element_type: ElementType):
-            attributes = self.browser.execute_script(
-                'var items = {}; for (index = 0; index < arguments[0].attributes.length; ++index) { items[arguments[0].attributes[index].name] = arguments[0].attributes[index].value }; return items;',
-                element
-            )
-
-            if element_type == ElementType.LINK:
-                xpath_new = xpath + '//text()'
-                text = ''.join(self.page.xpath(xpath_new).extract()).strip()
-                attributes['href'] = build_abs_url(attributes['href'], self.browser.current_url)
-            elif element_type == ElementType.BUTTON:
-                xpath_new = xpath + '//text()'
-                text = ''.join(self.page.xpath(xpath_new).extract()).strip()
-            elif element_type == ElementType.IMAGE:
-                xpath_new = xpath + '//text()'
-                text = self.page.xpath(xpath_new).extract()
-
-                # if data:
-                #     # Handle images with relative path. E.g. images/logo.png
-                #     if not any([data.startswith(x) for x in ['http', 'www']]):
-                #         data = url_pattern.match(browser.current_url).group(1) + data.replace('./', '')
-                #
-                #     with open(path + '.pickle', 'wb') as pickle_file:
-                #         pickle.dump(data, pickle_file)
-            elif element_type == ElementType.BULLET:
-                text = process_bullet(xpath)
-                # xpath_new = xpath + '//li//text()'
-            elif element_type == ElementType.TABLE:
-                table_2 = self.page.xpath(xpath)[0]
-
-                result = []  # data
-                titles = []  # columns' names
-                tr_tags = table_2.xpath('.//tr')  # <tr> = table row
-                th_tags = table_2.xpath('.//th')  # <th> = table header (non-essential, so if any)
-
-                for th_tag in th_tags:
-                    titles.append(''.join(th_tag.xpath('.//text()').extract()).replace('\n', '').replace('\t', ''))
-
-                for tr_tag in tr_tags:
-                    td_tags = tr_tag.xpath('.//td')  # <td> = table data
-
-                    row = []
-                    '''
-                        # Sometimes between td tags there more than 1 tag with text, so that would
-                        # be proceeded as separate values despite of fact it should be in one cell.
-                        # That's why the further loop is needed. The result of it is a list of strings,
-                        # that should be in one cell later in dataframe.
-
-                        # Example: 
-
-                        <td>
-                            <a>Text 1</a>
-                            <a>Text 2</a>
-                        </td>
-
-                        # Without loop it would be two strings ("Text 1", "Text 2") and thus they 
-                        # will be in 2 differrent columns. With loop the result would be ["Text 1", "Text 2"] 
-                        # and after join method - "Text 1 Text 2" in just one cell (column).
-                   '''
-
-                    for td_tag in td_tags:
-                        data = td_tag.xpath('.//text()').getall()
-                        '''
-                            Some table cells include \n or unicode symbols,
-                            so that creates unneccesary "empty" columns and thus
-                            the number of columns doesn't meet the real one
-                        '''
-
-                        data = [string_cleaner(x) for x in data]  # Cleaning the text
-
-                        # data = list(filter(None, data))  # Deleting empty strings
-
-                        row.append('\n'.join(data))  # Making one string value from list
-
-                    result.append(row)
-
-                    if not titles:  # If table doesn't have <th> tags -> use first row as titles
-                        titles = row  # TODO: IF USER SELECTS THE TABLE, ASK HIM, WHETHER HE WANTS TO HAVE 1 ROW AS TITLES
-
-                try:
-                    # If number of columns' names (titles) is the same as number of columns
-                    df = pd.DataFrame(result, columns=titles)
-                except Exception:
-                    df = pd.DataFrame(result)
-
-                df = df.iloc[1:, :]  # Removing empty row at the beginning of dataframe
-
-                df.dropna(axis=0, how='all', inplace=True)
-
-                text = df.to_json()
-
-                # # If dataframe is not empty
-                # if not df.dropna().empty and len(df.columns) > 1 and len(df) > 1:
-                #     # Serialize DataFrame
-                #
-                #     with open(path + '.pickle', 'wb') as pickle_file:
-                #         pickle.dump(df, pickle_file)
-            elif element_type == ElementType.INPUT:
-                text = element.text
-            else:
-                xpath += '//text()'
-
-                # Try to extract text from element
-                try:
-                    text = ''.join(self.page.xpath(xpath).extract()).strip()
-                # Extract element otherwise
-                except:
-                    xpath = xpath.removesuffix('//text()')
-                    text = ''.join(self.page.xpath(xpath).extract()).strip()
-
-            # docrawl_logger.warning(attributes)
-            element_data = {
-                'tagName': element.tag_name,
-                'textContent': text,
-                'attributes': attributes
-            }
-
-            return element_data
-
-        global new_elements_all
-        new_elements_all = []
-
-        def find_elements(element_type: ElementType, custom_tags: list = None):
-            """
-            Finds elements on page using Selenium Selector and HTML Parser
-                :param element_type: type of element (table, bullet, text, headline, link, ...)
-                :param custom_tags: list of custom tags
-            """
-
-            global new_elements_all
-
-            tags = PREDEFINED_TAGS[element_type] if not custom_tags else custom_tags
-            elements = []
-            elements_tree = []
-
-            # If tag is not predefined -> there is no need to add prefix
-            prefix = '' if custom_tags else '//'
-
-            for tag in tags:
-                elements.extend(self.browser.find_elements(By.XPATH, f'{prefix}{tag}'))
-                if custom_tags:
-                    tag = tag.replace('/body/', '/div/')  # Otherwise, elements_tree will be empty
-                elements_tree.extend(tree.xpath(f'{prefix}{tag}'))
-
-            if elements:
-                added_xpaths = []  # For deduplication of elements
-                for i, element in enumerate(elements):
-                    if not is_element_sized(element):
-                        continue
-
-                    elem_name = f'{element_type}_{i}'
-
-                    # Skip tables with no rows
-                    if element_type == ElementType.TABLE and len(element.find_elements(By.XPATH, './/tr')) < 2:
-                        continue
-
-                    try:
-                        xpath = find_element_xpath(elements_tree, i)
-
-                        if xpath not in added_xpaths:
-                            element_data = extract_element_data(element=element, xpath=xpath, element_type=element_type)
-                            element_c = Element(name=elem_name, type=element_type, rect=element.rect, xpath=xpath,
-                                                data=element_data)
-                            if is_element_empty(element_c):
-                                continue
-                            new_elements_all.append(element_c.dict())
-                            added_xpaths.append(xpath)
-                        # serialize_and_append_data(f'{element_name}_{i}', element, xpath)
-
-                    except Exception as e:
-                        docrawl_logger.error(f'Error while extracting data for element {elem_name}: {e}')
-
-        def is_element_sized(element: WebElement) -> bool:
-            """Skip elements with no width or height."""
-            element_size = element.size
-            if element_size['width'] == 0 or element_size['height'] == 0:
-                return False
-            return True
-
-        def is_element_empty(element: Element) -> bool:
-            """Skip elements based on their type and 'emptiness' rules."""
-            if element.type in [ElementType.TEXT, ElementType.HEADLINE]:
-                # Skip text-based elements with no text or whitespaces only
-                return element.data['textContent'].strip() == ''
-            else:
-                # TODO: Add checks for other types of elements if necessary
-                pass
-            return False
-
-        def find_element_xpath(tree, i):
-            """
-            Finds the XPath of element using HTML parser.
-                :param tree: list of elements
-                :param i: element's number
-            """
-            xpath = tree[i].getroottree().getpath(tree[i])
-            xpath = xpath.split('/')
-            xpath[2] = 'body'  # For some reason getpath() generates <div> instead of <body>
-            xpath = '/'.join(xpath)
-
-            return xpath
+                self.docrawl_client.set_browser_scanned_elements(cached_elements)
+                progress.update(done=True, number_of_elements=len(cached_elements), cached=True)
+                self.docrawl_client.set_browser_scan_progress(progress)
+                docrawl_logger.info(f'Scan Web Page result loaded from cache ({self.scan_cache.get_stats()})')
+                return
 
         docrawl_logger.info("Find elements phase has started")
 
-        ##### INPUT SECTION #####
-        if incl_inputs:
-            find_elements(element_type=ElementType.INPUT)
-
-        ##### TABLES SECTION #####
-        if incl_tables:
-            find_elements(element_type=ElementType.TABLE)
-
-        ##### BULLET SECTION #####
-        if incl_bullets:
-            find_elements(element_type=ElementType.BULLET)
-
-        ##### TEXTS SECTION #####
-        if incl_texts:
-            find_elements(element_type=ElementType.TEXT)
-
-        ##### HEADLINES SECTION #####
-        if incl_headlines:
-            find_elements(element_type=ElementType.HEADLINE)
-
-        ##### LINKS SECTION #####
-        if incl_links:
-            find_elements(element_type=ElementType.LINK)
-
-        ##### IMAGES SECTION #####
-        if incl_images:
-            find_elements(element_type=ElementType.IMAGE)
+        if driverless:
+            scanner = HtmlPageScanner(page_source or self._get_page_source(), self._get_page_url())
+        else:
+            scanner = BrowserPageScanner(self.browser, self.page, scan_state if is_incremental else None)
 
-        ##### BUTTONS SECTION #####
-        if incl_buttons:
-            find_elements(element_type=ElementType.BUTTON)
+        elements = []
 
-        ##### CUSTOM XPATH SECTION #####
-        if by_xpath:
-            # Temporary workaround due to weird behaviour of lists in kpv
-            if ';' in by_xpath:
-                list_of_xpaths = by_xpath.split(';')[:-1]
-            else:
-                list_of_xpaths = [by_xpath]
+        for batch in scanner.iter_scan(inp):
+            elements.extend(batch.elements)
 
-            for i, elem in enumerate(list_of_xpaths):
-                # With text() at the end will not work
-                xpath = elem.removesuffix('/text()').rstrip('/')
+            # Incremental scan keeps previous elements until it's finished
+            if not is_incremental:
+                self.docrawl_client.set_browser_scanned_elements(elements)
 
-                custom_tags = [xpath]
-                element_type = classify_element_by_xpath(xpath)
+            progress.update(element_type=str(batch.element_type), sections_done=batch.sections_done,
+                            sections_total=batch.sections_total, number_of_elements=len(elements))
+            self.docrawl_client.set_browser_scan_progress(progress)
 
-                find_elements(element_type=element_type, custom_tags=custom_tags)
-
-        if context_xpath:
-            try:
-                find_elements(element_type=ElementType.CONTEXT, custom_tags=[context_xpath])
-            except Exception as e:
-                docrawl_logger.error(f'Error while retrieving context elements: {e}')
+        if isinstance(scanner, BrowserPageScanner):
+            self.page = scanner.page
+            self.scan_state = ScanState(params=scan_params, elements=elements, element_data=scanner.element_data)
+        else:
+            self.scan_state = None
 
-        if cookies_xpath:
-            find_elements(element_type=ElementType.COOKIES, custom_tags=[cookies_xpath])
+        if is_incremental:
+            diff = diff_elements(scan_state.elements, elements)
+            self.docrawl_client.set_browser_scanned_elements_diff(diff)
+            docrawl_logger.info(f'Incremental scan: {len(diff["added"])} added, {len(diff["changed"])} changed, '
+                                f'{len(diff["removed"])} removed elements')
 
-        ##### SAVING COORDINATES OF ELEMENTS #####
+        if use_cache:
+            self.scan_cache.set(self._get_page_url(), scan_params, content_hash, elements)
 
-        self.docrawl_client.set_browser_scanned_elements(new_elements_all)
+        self.docrawl_client.set_browser_scanned_elements(elements)
+        progress.update(done=True, number_of_elements=len(elements))
+        self.docrawl_client.set_browser_scan_progress(progress)
         docrawl_logger.info(
             f'Scan Web Page function duration {timedelta_format(datetime.datetime.now(), time_start_f)}')
 
+    def _get_scan_cache_stats(self, inp=None):
+        """Returns counters of the scan cache (hits, misses, size - number of entries kept in memory)."""
+        return self.scan_cache.get_stats()
+
     def _wait_until_element_is_located(self, inp):
         """
         Waits until certain element is located on page and then clicks on it.
@@ -726,6 +922,8 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         Note: click() method may be replaced with another
         """
 
+        self._check_page_is_in_browser()
+
         xpath = inp['xpath']
 
         try:
@@ -737,12 +935,16 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         """
         Returns the URL of current opened website
             :param page: :param browser: driver instance
-            :param inp: list, inputs from launcher (filename)
+            :param inp: list, inputs from launcher (filename - optional, URL is saved to file if passed)
         """
-        filename = inp['filename']
-        url = str(self.browser.current_url)
-        with open(filename, 'w+', encoding="utf-8") as f:
-            f.write(url)
+        filename = inp.get('filename')
+        url = str(self._get_page_url())
+
+        if filename:
+            with open(filename, 'w+', encoding="utf-8") as f:
+                f.write(url)
+
+        return url
 
     def _scroll_web_page(self, inp):
         """
@@ -751,6 +953,8 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
             :param inp: list, inputs from launcher (scroll_to, scroll_by, scroll_max)
         """
 
+        self._check_page_is_in_browser()
+
         scroll_to = inp['scroll_to']
         scroll_by = inp['scroll_by']
         scroll_max = inp['scroll_max']
@@ -779,63 +983,85 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         if script:
             self.browser.execute_script(script)
 
+    def _get_image_urls(self, image_xpath):
+        """Absolute URLs of images (data-src or src attribute), read by one script call in the browser."""
+        if self.static_page_source is not None:
+            images = self.page.xpath(image_xpath)
+            image_urls = [image.attrib.get('data-src') or image.attrib.get('src') for image in images]
+
+            return [build_abs_url(url, self.static_page_url) if url else None for url in image_urls]
+
+        images = self.browser.find_elements(By.XPATH, image_xpath)
+        if not images:
+            return []
+
+        # Sometimes the image url is stored within data-src tag -> TODO: add new argument to handler with tag?
+        return self.browser.execute_script(
+            "return arguments[0].map(image => {"
+            "  const src = image.getAttribute('data-src') || image.getAttribute('src');"
+            "  return src ? new URL(src, document.baseURI).href : null;"
+            "});", images)
+
     def _download_images(self, inp):
         """
-        Downloads images using XPath
-            :param browser: driver instance
-            :param inp: list, inputs from launcher (image xpath, filename)
+        Downloads images using XPath, images are downloaded concurrently with cookies of the browser.
+            :param inp: list, inputs from launcher (image xpath, filename, max_workers - optional, number of images
+            downloaded at once)
+            :return: list of dicts, status of each image (url, filename, status, status_code, size, error)
         """
 
         image_xpath = inp['image_xpath']
         filename = inp['filename']
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64; rv:50.0) Gecko/20100101 Firefox/50.0'
-        }
+        max_workers = inp.get('max_workers') or 8
 
         # If entered filename contains extension -> drop extension
-        if '.' in filename:
-            filename = filename.split('.')[0]
+        filename = os.path.splitext(filename)[0]
 
-        images = self.browser.find_elements(By.XPATH, image_xpath)
+        image_urls = self._get_image_urls(image_xpath)
 
-        if len(images) == 0:
-            pass
-        elif len(images) == 1:
-            image_url = images[0].get_attribute('data-src')
-
-            if not image_url:
-                image_url = images[0].get_attribute('src')
-
-            image_extension = image_url.split('.')[-1].split('?')[0]  # Drop ?xxx after image extension
-
-            r = requests.get(image_url, headers=headers)
-            with open(f'{filename}.{image_extension}', 'wb') as outfile:
-                outfile.write(r.content)
+        if len(image_urls) == 1:
+            images = [(image_urls[0], filename)]
         else:
             # Use provided filename as directory name. Images themselves will be filename_base_0, filename_base_1, filename_base_2 etc.
             images_directory = filename
-            if not os.path.exists(images_directory):
+            if image_urls and not os.path.exists(images_directory):
                 os.mkdir(images_directory)
 
-            filename_base = filename
+            filename_base = os.path.basename(filename)
+            images = [(url, os.path.join(images_directory, f'{filename_base}_{i}')) for i, url in enumerate(image_urls)]
 
-            for i, image in enumerate(images):
-                try:
-                    # Sometimes the image url is stored within data-src tag -> TODO: add new argument to handler with tag?
-                    image_url = image.get_attribute('data-src')
-                    if not image_url:
-                        image_url = image.get_attribute('src')
+        if self.image_downloader is None or self.image_downloader.max_workers != max_workers:
+            if self.image_downloader is not None:
+                self.image_downloader.close()
+            self.image_downloader = ImageDownloader(max_workers=max_workers)
 
-                    image_extension = image_url.split('.')[-1].split('?')[0]  # Drop ?xxx after image extension
-                    filename = f'{filename_base}_{i}.{image_extension}'
+        if self.static_page_source is not None:
+            headers = {'User-Agent': self.custom_settings['USER_AGENT'], 'Referer': self.static_page_url}
+            cookies = []
+        else:
+            headers = {'User-Agent': self.browser.execute_script('return navigator.userAgent'),
+                       'Referer': self.browser.current_url}
+            cookies = self.browser.get_cookies()
 
-                    r = requests.get(image_url, headers=headers)
-                    with open(f'{images_directory}/{filename}', 'wb') as outfile:
-                        outfile.write(r.content)
-                except:
-                    pass
+        self.image_downloader.update_session(headers=headers, cookies=cookies)
+
+        downloaded_images = iter(self.image_downloader.download_many([image for image in images if image[0]]))
+        results = [next(downloaded_images) if url else
+                   ImageDownloadResult(url=url, filename=None, status='failed', error='Image has no URL')
+                   for url, _ in images]
+
+        for result in results:
+            if result.status == 'failed':
+                docrawl_logger.error(f'Image {result.url} was not downloaded: {result.error}')
+
+        downloaded = sum(result.status == 'downloaded' for result in results)
+        docrawl_logger.info(f'{downloaded} of {len(results)} images downloaded')
+
+        return [asdict(result) for result in results]
 
     def _click_xpath(self, inp):
+        self._check_page_is_in_browser()
+
         xpath = inp['xpath']
 
         xpath = xpath.removesuffix('//text()').rstrip('/')
@@ -855,11 +1081,15 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
             docrawl_logger.error('Element not found')
 
     def _click_name(self, inp):
+        self._check_page_is_in_browser()
+
         text = inp['text']
 
         self.browser.find_element(By.LINK_TEXT(text)).click()
 
     def send_text(self, inp):
+        self._check_page_is_in_browser()
+
         xpath = inp['xpath']
         text = inp['text']
         try:
@@ -886,16 +1116,17 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
 
     def _extract_xpath(self, inp):
         """
+        filename ... optional, extracted data is saved to file if passed
         write_in_file_mode ... w+, a+
         """
         xpath = inp['xpath']
-        filename = inp['filename']  # "extracted_data.txt"
+        filename = inp.get('filename')  # "extracted_data.txt"
 
         tag = xpath.split('/')[-1]
         xpath = self._prepare_xpath_for_extraction(xpath)
         if tag == 'a':
             data = self.page.xpath(xpath).extract()
-            data = [build_abs_url(scraped_link, self.browser.current_url) for scraped_link in data]
+            data = [build_abs_url(scraped_link, self._get_page_url()) for scraped_link in data]
         else:
             data = self.page.xpath(xpath).extract()
 
@@ -904,121 +1135,92 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         except:
             write_in_file_mode = "w+"
 
-        if not data:
-            data = ['None']
+        rows = [row.strip() for row in data if row.strip()]
 
-        with open(filename, write_in_file_mode, encoding="utf-8") as f:
-            if isinstance(data, list):
-                for i, row in enumerate(data):
-                    row = row.strip()
+        if filename:
+            with open(filename, write_in_file_mode, encoding="utf-8") as f:
+                # Placeholder keeps a line for pages where nothing matched
+                for row in rows or ['None']:
+                    f.write(row + "\n")
 
-                    if row:
-                        f.write(row.strip() + "\n")
-            else:
-                f.write(data.strip())
+        return rows
 
     def _extract_multiple_xpaths(self, inp):
+        """
+        Extracts data of several XPaths.
+            :param inp: list, inputs from launcher (xpaths, filename - optional, data is saved to file if passed,
+            output_format - optional, csv / jsonl / parquet / xlsx / txt, inferred from filename by default,
+            append - optional, append data to the file)
+            :return: list of lists, extracted data per XPath
+        """
         result = []
         xpaths = inp['xpaths']
-        filename = inp['filename']  # "extracted_data.txt"
+        filename = inp.get('filename')  # "extracted_data.txt", optional, data is saved to file if passed
 
         for xpath in xpaths:
             xpath = self._prepare_xpath_for_extraction(xpath)
             tag = xpath.split('/')[-1]
             if tag == 'a':
                 data = self.page.xpath(xpath).extract()
-                data = [build_abs_url(scraped_link, self.browser.current_url) for scraped_link in data]
+                data = [build_abs_url(scraped_link, self._get_page_url()) for scraped_link in data]
             else:
                 data = self.page.xpath(xpath).extract()
 
-            if not data:
-                data = ['None']
-
             docrawl_logger.info(f'Data from extracted XPath: {data}')
             result.append(data)
 
-        short_filename = filename.split(".txt")[0]
-        df = pd.DataFrame(result)
-        df.to_excel(short_filename + ".xlsx")
+        if filename:
+            # One column per XPath, placeholder keeps a row for pages where nothing matched
+            rows = itertools.zip_longest(*[data or ['None'] for data in result])
+            self.output_writers.write(filename, list(xpaths), rows, inp.get('output_format'), inp.get('append', False))
 
-        with open(filename, "w+", encoding="utf-8") as f:
-            output_list = ["\n".join(result_element) for result_element in result]
-            output = "\n".join(output_list)
-            f.write(output)
+        return result
 
     def _extract_table_xpath(self, inp):
+        """
+        Extracts table from rows and columns selected by XPaths, columns are evaluated relative to each row.
+            :param inp: list, inputs from launcher (xpath_row, xpath_col - str or lxml.etree.XPath, filename,
+            first_row_header, output_format - optional, csv / jsonl / parquet / xlsx, inferred from filename by default,
+            append - optional, append rows to the file)
+        """
         row_xpath = inp['xpath_row']
         column_xpath = inp['xpath_col']
         filename = inp['filename']  # "extracted_data.txt"
         first_row_header = inp['first_row_header']
 
-        result = []
-        trs = self.page.xpath(row_xpath)
-        ths = self.page.xpath(row_xpath + '//th')
-        headers = []
-
-        # Try to find headers within <th> tags
-        for th_tag in ths:
-            headers.append(
-                ''.join(th_tag.xpath('.//text()').extract()).replace('\n', '').replace('\t', '')
-            )
-
-        if trs:
-            for j, tr in enumerate(trs):
-                xp = row_xpath + "[" + str(j + 1) + "]" + column_xpath
-
-                td_tags = self.page.xpath(xp)
-                row = []
-                for td in td_tags:
-                    data = td.xpath('.//text()').getall()
-                    '''r
-                        Some table cells include \n or unicode symbols,
-                        so that creates unneccesary "empty" columns and thus
-                        the number of columns doesn't meet the real one
-                    '''
+        if filename.endswith('.pickle'):
+            # Older clients passed .pickle filename
+            filename = filename.removesuffix('.pickle') + '.csv'
 
-                    data = [''.join(x.strip()).replace('\\', '') for x in data]  # Cleaning the text
+        # Header is used only if its length is the same as length of rows, empty rows are skipped
+        table = extract_table_by_xpaths(self.page.root, row_xpath, column_xpath, first_row_header)
 
-                    # data = list(filter(None, data))  # Deleting empty strings
+        self.output_writers.write(filename, table.columns, table.rows(), inp.get('output_format'),
+                                  inp.get('append', False))
 
-                    row.append('\n'.join(data).strip())  # Making one string value from list
+        self.docrawl_client.kv_redis.set(key='extracted_table', value=table.to_pandas())
 
-                # details = page.xpath(xp).extract() #j+1 because xpath indices start with 1 (not with 0)
-
-                # If first row should be headers and headers were not defined before
-                if first_row_header and not headers:
-                    headers = row
-                else:
-                    result.append(row)
-
-        short_filename = filename.split(".pickle")[0]
-
-        if headers:
-            # Could be the situation when len of headers is not the same as len of row
-            try:
-                df = pd.DataFrame(result, columns=headers)
-            except:
-                df = pd.DataFrame(result)
-        else:
-            df = pd.DataFrame(result)
-
-        # Remove empty rows
-        df.dropna(axis=0, how='all', inplace=True)
-        df.to_excel(short_filename + '.xlsx')
-
-        self.docrawl_client.kv_redis.set(key='extracted_table', value=df)
+    def _close_output_files(self, inp):
+        """
+        Close files of extracted data which were appended to (Parquet files are finished only when closed).
+            :param inp: list, inputs from launcher (filename - optional, all files are closed if not passed)
+        """
+        self.output_writers.close(inp.get('filename') if inp else None)
 
     def _refresh_page_source(self, inp):
-        self.page = Selector(text=self.browser.page_source)
+        self.page = Selector(text=self._get_page_source())
 
-    def initialize_screenshot_thread_if_not_existing(self, screenshot_filename = "website_loading_screenshot.png"):
+    def initialize_screenshot_thread_if_not_existing(self, screenshot_filename = "website_loading_screenshot.png",
+                                                     live_preview_options=None):
         
         if self.screenshot_thread is None:
-            self.screenshot_thread = ScreenshotThread(docrawl_spider = self, screenshot_filename = screenshot_filename)
+            self.screenshot_thread = ScreenshotThread(docrawl_spider = self, screenshot_filename = screenshot_filename,
+                                                      live_preview_options=live_preview_options)
             self.screenshot_thread.start()
-            self.screenshot_time=0
+            self.screenshot_time = time.time()
             docrawl_logger.info("Screenshot thread created with screenshot_filename: "+str(screenshot_filename))
         else:
+            self.screenshot_thread.set_live_preview_options(live_preview_options)
             self.screenshot_thread.screenshot_filename = screenshot_filename #make sure the filename is correct if there is second attempt to initialize screenshot thread with different instructions (can happen e.g. load website and then take_screenshot immediately after that)
             docrawl_logger.info("Screenshot screenshot_filename was updated: "+str(screenshot_filename))
             
@@ -1026,98 +1228,79 @@ class DocrawlSpider(scrapy.spiders.CrawlSpider):
         """ screenshot refreshing timespan is in seconds"""
         
         if self.screenshot_thread is not None:
-            docrawl_logger.info("Screenshot thread update"+str(self.screenshot_time))
-            
-            self.screenshot_time+=1
-            if self.screenshot_time > screenshot_refreshing_timespan:
+            screenshot_thread_duration = time.time() - self.screenshot_time
+            docrawl_logger.info("Screenshot thread update"+str(screenshot_thread_duration))
+
+            if screenshot_thread_duration > screenshot_refreshing_timespan:
                 
-                print("Screenshot thread stopping",self.screenshot_time)
+                print("Screenshot thread stopping",screenshot_thread_duration)
                 self.screenshot_thread.stop()
                 self.screenshot_thread.join()
                 self.screenshot_thread = None
 
+    def _run_command(self, command: dict):
+        """Execute spider function, returned value (JSON-serializable) is passed to the client as the result."""
+        function_str = command['name']
+        inp = command['input']
+
+        if f'_{function_str}' == "_take_png_screenshot":
+            self._check_page_is_in_browser()
+
+            # skip standard execution and run in a different thread
+            live_preview_options = None
+            if inp.get('live_preview'):
+                live_preview_options = LivePreviewOptions(
+                    image_format=inp.get('image_format', 'jpeg'), quality=inp.get('quality', 70),
+                    max_width=inp.get('max_width', 1280), hash_method=inp.get('hash_method', 'bytes')
+                )
+
+            self.initialize_screenshot_thread_if_not_existing(inp["filename"], live_preview_options)
+        else:  # Standard behaviour
+            docrawl_logger.warning("Running docrawl function:" + f'_{function_str}')
+            return getattr(self, f'_{function_str}')(inp=inp)
+
     def parse(self, response):
+        # Commands are executed in own thread, blocking the reactor would stop all other spiders of the process
+        self.command_thread = threading.Thread(target=self._run_command_loop, name=f'docrawl_spider_{id(self)}',
+                                               daemon=True)
+        self.command_thread.start()
+
+    def _run_command_loop(self):
+        command_channel = self.docrawl_client.command_channel
+
         while True:
             self.increment_time_of_screenshot_thread()
 
-            browser_meta_data = self.docrawl_client.get_browser_meta_data()
-            spider_request = browser_meta_data['request']
-            spider_function = browser_meta_data['function']
-            proxy = browser_meta_data['browser']['proxy']
-            url = spider_request['url']
+            # Sleep until client posts a command, wake up at least every second to refresh screenshot thread
+            command = command_channel.pop_command(timeout=1)
+            if command is None:
+                continue
+
+            # Expose currently executed command in browser metadata
+            self.docrawl_client.update_browser_meta_data(
+                'function', id=command['id'], name=command['name'], input=command['input'], done=False, error=None
+            )
+            result = None
+            error = None
 
             try:
-                if url and not spider_request['loaded']:
-                    if hasattr(self.browser, "proxy"):
-                        if proxy != self.browser.proxy:
-                            docrawl_logger.warning('Proxy was updated in meanwhile')
-                            self._update_proxy(proxy)
-
-                    self.browser.get(url)
-                    
-                    page_source = self.browser.page_source
-                    if isinstance(page_source, bytes):
-                        page_source = page_source.decode('utf8')
-                    
-                    self.page = Selector(text=page_source)
-                    
-                    # collect headers for current page
-                    headers = next((dict(req.headers) for req in self.browser.requests if req.response and req.url == url), None)
-                    self.docrawl_client.set_browser_headers(headers)
-                    
-                    # collect cookies for current page
-                    cookies = [dict(cookie) for cookie in self.browser.get_cookies()]
-                    self.docrawl_client.set_browser_cookies(cookies)
-                    
-                    # collects requests, which contain: url, status code, headers from response, content from response 
-                    requests = []
-                    for _req in self.browser.requests:
-                        _type = _req.headers.get('content-type')
-                        if _req.response and  _type == 'application/json':
-                            requests.append({
-                                'url': _req.url,
-                                'status_code': _req.response.status_code,
-                                'headers': dict(_req.response.headers),
-                                'content': str(_req.response.body),
-                            })
-                    self.docrawl_client.set_browser_requests(requests)
-
-                    spider_request['loaded'] = True
-                    browser_meta_data['request'] = spider_request
-                    self.docrawl_client.set_browser_meta_data(browser_meta_data)
-                    time.sleep(1) #make sure the screenshot is made after website is loaded
-                elif not spider_function['done']:
-                    function_str = spider_function['name']
-                    inp = spider_function['input']
-
-                    if f'_{function_str}' == "_take_png_screenshot":
-                        # skip standard execution and run in a different thread
-                        self.initialize_screenshot_thread_if_not_existing(inp["filename"])
-                    else:  # Standard behaviour
-                        docrawl_logger.warning("Running docrawl function:" + f'_{function_str}')
-                        getattr(self, f'_{function_str}')(inp=inp)
-
-                    spider_function['done'] = True
-                    spider_function['error'] = None
-                    browser_meta_data['function'] = spider_function
-                    self.docrawl_client.set_browser_meta_data(browser_meta_data)
-                    
-                time.sleep(1) #keep time increment in all cases, otherwise screenshots do not load correctly if the website renders dynamic elements (e.g. forloop blog)
-
-            except (WebDriverException, MaxRetryError) as e:
-                docrawl_logger.error('Browser not responding')
-                docrawl_logger.error(traceback.format_exc())
-                self._restart_browser()
+                try:
+                    result = self._run_command(command)
+                except (WebDriverException, MaxRetryError):
+                    docrawl_logger.error('Browser not responding')
+                    docrawl_logger.error(traceback.format_exc())
+                    self._restart_browser()
+
+                    # Retry the command once in the restarted browser
+                    result = self._run_command(command)
 
             except Exception as e:
                 docrawl_logger.error(f'Error while executing docrawl loop: {e}')
                 docrawl_logger.error(traceback.format_exc())
-
-                browser_meta_data = self.docrawl_client.get_browser_meta_data()
-                spider_function['done'] = True
-                spider_function['error'] = str(e)
-                browser_meta_data['function'] = spider_function
-                self.docrawl_client.set_browser_meta_data(browser_meta_data)
+                error = str(e)
 
             except KeyboardInterrupt:
                 break
+
+            self.docrawl_client.update_browser_meta_data('function', done=True, error=error)
+            command_channel.put_result(command['id'], {"name": command['name'], "error": error, "result": result})
@@ -0,0 +1,144 @@
+import json
+import multiprocessing
+import os
+import zlib
+
+from crochet import setup
+from keepvariable.keepvariable_core import KeepVariableRedisServer
+from scrapy.crawler import CrawlerRunner
+
+from docrawl.docrawl_client import DocrawlClient
+from docrawl.docrawl_core import DocrawlSpider, browser_pool
+from docrawl.docrawl_logger import docrawl_logger
+from docrawl.utils import is_redis_backed
+
+
+def run_worker(redis_connection: dict, messages_key: str):
+    """
+    Entrypoint of a worker process. Worker owns its own Twisted reactor, browser pool and spiders and runs
+    spiders requested by the supervisor. Spiders communicate with their clients through Redis as usual.
+        :param redis_connection: dict, connection params of KeepVariableRedisServer
+        :param messages_key: str, Redis list with messages for this worker
+    """
+    kv_redis = KeepVariableRedisServer(**redis_connection)
+
+    setup()
+    crawler = CrawlerRunner()
+
+    docrawl_logger.info(f'Docrawl worker {os.getpid()} started')
+
+    while True:
+        _, message = kv_redis.redis.blpop([messages_key])
+        message = json.loads(message)
+
+        try:
+            if message['type'] == 'run_spider':
+                docrawl_client = DocrawlClient(
+                    kv_redis=kv_redis, kv_redis_keys=message['kv_redis_keys'],
+                    redis_key_prefix=message['redis_key_prefix']
+                )
+                docrawl_client.share_browser_data = True
+                crawler.crawl(DocrawlSpider, docrawl_client=docrawl_client)
+            elif message['type'] == 'warm_up':
+                browser_pool.warm_up(
+                    message['driver'], message['headless'], message['proxy'], message['number_of_browsers']
+                )
+            elif message['type'] == 'stop':
+                break
+        except Exception as e:
+            docrawl_logger.error(f'Error while processing worker message {message}: {e}')
+
+    browser_pool.close()
+    docrawl_logger.info(f'Docrawl worker {os.getpid()} stopped')
+
+
+class DocrawlSupervisor:
+    """
+    Spreads DocrawlSpider instances across a pool of worker processes, so that HTML parsing and scanning of different
+    browsers doesn't share one GIL. Clients created with `supervisor=...` are routed to workers by their
+    `redis_key_prefix`, all other client methods work without change.
+
+    Requires KeepVariableRedisServer as the storage, as clients and spiders communicate across processes.
+    """
+
+    def __init__(self, kv_redis, number_of_workers: int = None, key_prefix: str = 'docrawl_supervisor'):
+        if not is_redis_backed(kv_redis):
+            raise ValueError('DocrawlSupervisor requires KeepVariableRedisServer, other storages are process-local')
+
+        self.kv_redis = kv_redis
+        self.number_of_workers = number_of_workers or os.cpu_count()
+        self.key_prefix = key_prefix
+
+        self.workers = []
+
+    def _get_messages_key(self, worker_index: int) -> str:
+        return f'{self.key_prefix}:worker{worker_index}:messages'
+
+    def _get_redis_connection(self) -> dict:
+        connection_kwargs = self.kv_redis.redis.connection_pool.connection_kwargs
+
+        return {
+            'host': connection_kwargs.get('host', 'localhost'),
+            'port': connection_kwargs.get('port', 6379),
+            'db': connection_kwargs.get('db', 0),
+            'username': connection_kwargs.get('username') or 'default',
+            'password': connection_kwargs.get('password'),
+        }
+
+    def start(self):
+        # Fresh interpreter per worker, forking would copy the reactor thread and browsers of the parent
+        context = multiprocessing.get_context('spawn')
+        redis_connection = self._get_redis_connection()
+
+        for worker_index in range(self.number_of_workers):
+            messages_key = self._get_messages_key(worker_index)
+            self.kv_redis.redis.delete(messages_key)  # Messages left by previous supervisor
+
+            worker = context.Process(target=run_worker, args=(redis_connection, messages_key), daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        docrawl_logger.info(f'Docrawl supervisor started {self.number_of_workers} workers')
+
+    def stop(self, timeout: float = 30):
+        for worker_index in range(len(self.workers)):
+            self._send_message(worker_index, {'type': 'stop'})
+
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+        self.workers = []
+
+    def get_worker_index(self, redis_key_prefix: str) -> int:
+        """Stable assignment of client to worker, all spiders of one client prefix live in the same worker."""
+        return zlib.crc32(redis_key_prefix.encode('utf-8')) % self.number_of_workers
+
+    def _send_message(self, worker_index: int, message: dict):
+        self.kv_redis.redis.rpush(self._get_messages_key(worker_index), json.dumps(message))
+
+    def run_spider(self, docrawl_client: DocrawlClient):
+        """Start spider of the client in its worker, browser metadata must be already initialized."""
+        worker_index = self.get_worker_index(docrawl_client.redis_key_prefix)
+        message = {
+            'type': 'run_spider',
+            'redis_key_prefix': docrawl_client.redis_key_prefix,
+            'kv_redis_keys': docrawl_client.kv_redis_keys,
+        }
+
+        self._send_message(worker_index, message)
+        docrawl_logger.info(f'Spider {docrawl_client.redis_key_prefix} routed to worker {worker_index}')
+
+    def warm_up(self, redis_key_prefix: str, driver: str, headless: bool, proxy: dict = None,
+                number_of_browsers: int = 1):
+        """Keep standby browsers in the worker of the client with given prefix."""
+        message = {
+            'type': 'warm_up',
+            'driver': driver,
+            'headless': headless,
+            'proxy': proxy,
+            'number_of_browsers': number_of_browsers,
+        }
+
+        self._send_message(self.get_worker_index(redis_key_prefix), message)
@@ -1,7 +1,10 @@
+import functools
 import re
 from enum import Enum
 from dataclasses import dataclass, asdict
-from typing import Dict
+from typing import Dict, Iterable, Iterator, Tuple
+
+from lxml import etree
 
 
 class ElementType(str, Enum):
@@ -83,3 +86,61 @@ PREDEFINED_TAGS = {
     ElementType.INPUT: INPUT_TAGS
 }
 
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_xpath(xpath: str) -> etree.XPath:
+    """Compile XPath once, repeated scans with the same custom XPath reuse the compiled query."""
+    return etree.XPath(xpath)
+
+
+class ElementXPathRegistry:
+    """
+    Predefined tags compiled into lxml XPath queries once per process.
+
+    Tags of each element type are joined into one union query (evaluated in a single pass in document order). Nodes
+    found by a union of several types are labelled by matching them against `self::tag` tests of each type.
+    """
+
+    def __init__(self, predefined_tags: Dict[ElementType, list] = None):
+        predefined_tags = predefined_tags if predefined_tags is not None else PREDEFINED_TAGS
+
+        self.queries = {}
+        self._matchers = {}
+
+        for element_type, tags in predefined_tags.items():
+            tags = [' '.join(tag.split()) for tag in tags]  # Multi-line predicates of LINK_TAGS
+
+            self.queries[element_type] = ' | '.join(f'//{tag}' for tag in tags)
+            self._matchers[element_type] = etree.XPath(f"boolean({' | '.join(f'self::{tag}' for tag in tags)})")
+
+    def get_query(self, element_type: ElementType) -> str:
+        """Union query of all predefined tags of the element type."""
+        return self.queries[element_type]
+
+    def get_xpath(self, element_type: ElementType) -> etree.XPath:
+        return compile_xpath(self.queries[element_type])
+
+    def is_element_type(self, node, element_type: ElementType) -> bool:
+        return self._matchers[element_type](node)
+
+    def find(self, tree, element_types: Iterable[ElementType]) -> Iterator[Tuple[ElementType, object]]:
+        """
+        Find elements of all given types with one union query.
+            :param tree: lxml element / tree to search in
+            :param element_types: enabled element types
+            :return: tuples (element type, node) in document order, node matching several types is yielded per type
+        """
+        element_types = list(element_types)
+        if not element_types:
+            return
+
+        xpath = compile_xpath(' | '.join(self.queries[element_type] for element_type in element_types))
+
+        for node in xpath(tree):
+            for element_type in element_types:
+                if self.is_element_type(node, element_type):
+                    yield element_type, node
+
+
+element_xpath_registry = ElementXPathRegistry()
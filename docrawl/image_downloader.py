@@ -0,0 +1,153 @@
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_IMAGE_EXTENSION = 'jpg'
+
+
+@dataclass
+class ImageDownloadResult:
+    url: str
+    filename: Optional[str]  # Downloaded file, file downloaded before if the image was skipped
+    status: str  # downloaded, skipped (URL was already downloaded) or failed
+    status_code: Optional[int] = None
+    size: int = 0  # Bytes written to the file
+    error: Optional[str] = None
+
+
+def get_image_extension(url: str, content_type: Optional[str] = None) -> str:
+    """Extension of the image from the URL path, from the Content-Type if the path has none."""
+    extension = os.path.splitext(urlparse(url).path)[1].lstrip('.')
+
+    if not extension and content_type:
+        extension = (mimetypes.guess_extension(content_type.split(';')[0].strip()) or '').lstrip('.')
+
+    return extension or DEFAULT_IMAGE_EXTENSION
+
+
+class ImageDownloader:
+    """
+    Downloads images concurrently, connections are reused by one requests.Session (one connection pool per host).
+
+    Bodies are streamed to disk in chunks, so big images are not held in memory. URLs downloaded before by the same
+    downloader are skipped as long as their files exist.
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: float = 30, chunk_size: int = 64 * 1024,
+                 session: Optional[requests.Session] = None):
+        """
+        :param max_workers: max number of images downloaded at once
+        :param timeout: connect / read timeout of one image in seconds
+        :param chunk_size: bytes written to the file at once
+        :param session: requests.Session, new session is created by default
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._downloaded = {}  # URL -> filename
+        self._lock = threading.Lock()
+
+    def update_session(self, headers: Optional[dict] = None, cookies: Optional[List[dict]] = None):
+        """
+        Use headers and cookies of the browser for following downloads.
+            :param headers: dict, e.g. User-Agent and Referer
+            :param cookies: list of cookies in Selenium format (name, value, domain, path, ...)
+        """
+        if headers:
+            self.session.headers.update(headers)
+
+        for cookie in cookies or []:
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                                     path=cookie.get('path', '/'))
+
+    def _get_downloaded_filename(self, url: str) -> Optional[str]:
+        with self._lock:
+            filename = self._downloaded.get(url)
+
+        return filename if filename is not None and os.path.isfile(filename) else None
+
+    def download(self, url: str, filename_base: str) -> ImageDownloadResult:
+        """
+        Download one image, errors are returned in the result instead of being raised.
+            :param url: str, URL of the image
+            :param filename_base: str, name of the file without extension, extension is taken from the URL or
+            Content-Type
+        """
+        downloaded_filename = self._get_downloaded_filename(url)
+        if downloaded_filename is not None:
+            return ImageDownloadResult(url=url, filename=downloaded_filename, status='skipped')
+
+        status_code = None
+        temporary_filename = None
+
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                status_code = response.status_code
+                response.raise_for_status()
+
+                filename = f'{filename_base}.{get_image_extension(url, response.headers.get("Content-Type"))}'
+                temporary_filename = f'{filename}.part'
+                size = 0
+
+                with open(temporary_filename, 'wb') as outfile:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        outfile.write(chunk)
+                        size += len(chunk)
+
+            # Incomplete files are never left under the final name
+            os.replace(temporary_filename, filename)
+        except (requests.RequestException, OSError) as e:
+            if temporary_filename is not None and os.path.exists(temporary_filename):
+                os.remove(temporary_filename)
+
+            return ImageDownloadResult(url=url, filename=None, status='failed', status_code=status_code,
+                                       error=str(e))
+
+        with self._lock:
+            self._downloaded[url] = filename
+
+        return ImageDownloadResult(url=url, filename=filename, status='downloaded', status_code=status_code,
+                                   size=size)
+
+    def download_many(self, images: Iterable[Tuple[str, str]]) -> List[ImageDownloadResult]:
+        """
+        Download images concurrently, each URL is downloaded once.
+            :param images: (URL, filename without extension) of each image
+            :return: results in the same order as images
+        """
+        images = list(images)
+        first_index = {}  # URL -> index of its first occurrence
+
+        for i, (url, _) in enumerate(images):
+            first_index.setdefault(url, i)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {i: executor.submit(self.download, url, filename_base)
+                       for i, (url, filename_base) in enumerate(images) if first_index[url] == i}
+            results = {i: future.result() for i, future in futures.items()}
+
+        for i, (url, _) in enumerate(images):
+            if i not in results:
+                # Duplicate URL within the images, it has the same file as its first occurrence
+                first_result = results[first_index[url]]
+                status = 'failed' if first_result.status == 'failed' else 'skipped'
+                results[i] = ImageDownloadResult(url=url, filename=first_result.filename, status=status,
+                                                 status_code=first_result.status_code, error=first_result.error)
+
+        return [results[i] for i in range(len(images))]
+
+    def close(self):
+        self.session.close()
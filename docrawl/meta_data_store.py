@@ -0,0 +1,114 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from docrawl.utils import get_redis_client, is_redis_backed
+
+# Sections of browser metadata, each of them is stored and updated separately
+BROWSER_META_DATA_SECTIONS = ('browser', 'function', 'request')
+
+
+class BrowserMetaDataStore(ABC):
+    """
+    Storage of browser metadata split into sections (browser, function, request). Fields of a section are updated
+    atomically one by one, so that client and spider can write different fields at the same time without
+    overwriting each other's changes and without moving the whole metadata for every change.
+    """
+
+    @abstractmethod
+    def get_section(self, section: str) -> dict:
+        """Return all fields of the section, empty dict if the section doesn't exist."""
+
+    @abstractmethod
+    def update_section(self, section: str, fields: dict):
+        """Set given fields of the section, other fields are kept."""
+
+    @abstractmethod
+    def replace(self, browser_meta_data: dict):
+        """Replace all sections at once."""
+
+    def get_all(self) -> Optional[dict]:
+        """Return metadata with all sections, None if metadata doesn't exist."""
+        browser_meta_data = {section: self.get_section(section) for section in BROWSER_META_DATA_SECTIONS}
+
+        if not any(browser_meta_data.values()):
+            return None
+        return browser_meta_data
+
+
+class LocalBrowserMetaDataStore(BrowserMetaDataStore):
+    """In-process storage, used together with KeepVariableDummyRedisServer."""
+
+    def __init__(self):
+        self._sections = {}
+        self._lock = threading.Lock()
+
+    def get_section(self, section: str) -> dict:
+        with self._lock:
+            return dict(self._sections.get(section, {}))
+
+    def update_section(self, section: str, fields: dict):
+        with self._lock:
+            self._sections.setdefault(section, {}).update(fields)
+
+    def replace(self, browser_meta_data: dict):
+        with self._lock:
+            self._sections = {section: dict(fields) for section, fields in browser_meta_data.items()}
+
+
+class RedisBrowserMetaDataStore(BrowserMetaDataStore):
+    """Each section is a Redis hash, field values are JSON-encoded."""
+
+    def __init__(self, redis_client, key: str):
+        self.redis = redis_client
+        self.key = key
+
+    def _get_section_key(self, section: str) -> str:
+        return f'{self.key}:{section}'
+
+    def get_section(self, section: str) -> dict:
+        fields = self.redis.hgetall(self._get_section_key(section))
+
+        return {field: json.loads(value) for field, value in fields.items()}
+
+    def update_section(self, section: str, fields: dict):
+        if fields:
+            mapping = {field: json.dumps(value) for field, value in fields.items()}
+            self.redis.hset(self._get_section_key(section), mapping=mapping)
+
+    def replace(self, browser_meta_data: dict):
+        pipeline = self.redis.pipeline(transaction=True)
+
+        for section in BROWSER_META_DATA_SECTIONS:
+            pipeline.delete(self._get_section_key(section))
+
+        for section, fields in browser_meta_data.items():
+            if fields:
+                mapping = {field: json.dumps(value) for field, value in fields.items()}
+                pipeline.hset(self._get_section_key(section), mapping=mapping)
+
+        pipeline.execute()
+
+    def get_all(self) -> Optional[dict]:
+        pipeline = self.redis.pipeline(transaction=False)
+
+        for section in BROWSER_META_DATA_SECTIONS:
+            pipeline.hgetall(self._get_section_key(section))
+
+        browser_meta_data = {
+            section: {field: json.loads(value) for field, value in fields.items()}
+            for section, fields in zip(BROWSER_META_DATA_SECTIONS, pipeline.execute())
+        }
+
+        if not any(browser_meta_data.values()):
+            return None
+        return browser_meta_data
+
+
+def create_browser_meta_data_store(kv_redis, key: str) -> BrowserMetaDataStore:
+    """Browser metadata store, sections are stored in Redis hashes under `key` if the storage is Redis."""
+    if not is_redis_backed(kv_redis):
+        return LocalBrowserMetaDataStore()
+
+    return RedisBrowserMetaDataStore(get_redis_client(kv_redis), key)
@@ -0,0 +1,116 @@
+import collections
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+# selenium-wire keeps captured requests in memory (not pickled to disk), the oldest are dropped above the max size
+SELENIUM_WIRE_STORAGE_OPTIONS = {
+    'request_storage': 'memory',
+    'request_storage_max_size': 1000,
+}
+
+
+@dataclass
+class NetworkCapturePolicy:
+    """Which requests of the page are published (see DocrawlClient.get_browser_requests)."""
+    url_patterns: Optional[List[str]] = None  # Regexes, requests with URL matching any of them, all by default
+    content_types: Optional[List[str]] = field(default_factory=lambda: ['application/json'])  # Prefixes, None - all
+    max_exchanges: int = 100  # Only the latest requests are kept
+    clear_on_navigation: bool = True  # Remove requests of the previous page from selenium-wire storage
+
+    def matches(self, url: str, content_type: Optional[str]) -> bool:
+        if self.url_patterns and not any(re.search(pattern, url) for pattern in self.url_patterns):
+            return False
+
+        if self.content_types:
+            content_type = (content_type or '').lower()
+            return any(content_type.startswith(prefix.lower()) for prefix in self.content_types)
+
+        return True
+
+
+class CapturedExchange(Mapping):
+    """
+    Request with response captured by selenium-wire, behaves as a dict with url, status_code, headers (of the
+    response) and content.
+
+    Body is decoded (Content-Encoding, e.g. gzip) and converted to text only when the content is accessed.
+    """
+
+    KEYS = ('url', 'status_code', 'headers', 'content')
+
+    def __init__(self, url: str, status_code: int, headers: dict, body: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self._body = body
+        self._content = None
+
+    @classmethod
+    def from_request(cls, request) -> 'CapturedExchange':
+        """:param request: selenium-wire request with response"""
+        response = request.response
+
+        return cls(url=request.url, status_code=response.status_code, headers=dict(response.headers),
+                   body=response.body)
+
+    @property
+    def body(self) -> bytes:
+        encoding = next((value for key, value in self.headers.items() if key.lower() == 'content-encoding'), None)
+        if not encoding or encoding == 'identity':
+            return self._body
+
+        try:
+            from seleniumwire.utils import decode
+            return decode(self._body, encoding)
+        except (ImportError, ValueError):
+            return self._body
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = self.body.decode('utf-8', errors='replace')
+
+        return self._content
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f'CapturedExchange(url={self.url!r}, status_code={self.status_code})'
+
+
+def capture_network(requests: Iterable, page_url: str,
+                    policy: NetworkCapturePolicy) -> Tuple[Optional[dict], List[CapturedExchange]]:
+    """
+    Go through captured requests once.
+        :param requests: selenium-wire requests, from the oldest
+        :param page_url: str, URL of the loaded page
+        :param policy: NetworkCapturePolicy
+        :return: tuple (request headers of the page, latest requests matching the policy)
+    """
+    page_headers = None
+    exchanges = collections.deque(maxlen=policy.max_exchanges)
+
+    for request in requests:
+        response = request.response
+        if response is None:
+            continue
+
+        if page_headers is None and request.url == page_url:
+            page_headers = dict(request.headers)
+
+        if policy.matches(request.url, response.headers.get('content-type')):
+            exchanges.append(CapturedExchange.from_request(request))
+
+    return page_headers, list(exchanges)
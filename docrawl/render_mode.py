@@ -0,0 +1,57 @@
+import threading
+from enum import Enum
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+from docrawl.elements import compile_xpath
+
+
+class RenderMode(str, Enum):
+    def __str__(self):
+        return str(self.value)
+
+    BROWSER = 'browser'  # Page is loaded in the browser (JavaScript is executed)
+    STATIC = 'static'  # Page is downloaded by Scrapy's downloader, without browser and JavaScript
+    AUTO = 'auto'  # Static if the key XPaths are present in HTML without JavaScript, browser otherwise
+
+
+def get_domain(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def has_key_xpaths(root, key_xpaths: Iterable[str]) -> bool:
+    """
+    Check whether all key XPaths match some node of the page.
+        :param root: lxml element / tree of the page
+        :param key_xpaths: XPaths of data the page must contain to be usable without JavaScript
+    """
+    key_xpaths = list(key_xpaths or [])
+
+    return bool(key_xpaths) and all(compile_xpath(xpath)(root) for xpath in key_xpaths)
+
+
+class RenderModeCache:
+    """
+    Render mode (static / browser) decided by the auto mode for each domain, so the static download isn't repeated
+    for domains which need JavaScript.
+    """
+
+    def __init__(self):
+        self._modes = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[RenderMode]:
+        with self._lock:
+            return self._modes.get(get_domain(url))
+
+    def set(self, url: str, render_mode: RenderMode):
+        with self._lock:
+            self._modes[get_domain(url)] = RenderMode(render_mode)
+
+    def clear(self):
+        with self._lock:
+            self._modes.clear()
+
+
+# Decisions shared by all spiders of the process
+render_mode_cache = RenderModeCache()
@@ -0,0 +1,270 @@
+import collections
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+
+from docrawl.docrawl_logger import docrawl_logger
+
+# Resource type -> file extensions
+RESOURCE_TYPE_EXTENSIONS = {
+    'image': ['jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'media': ['mp4', 'webm', 'ogg', 'ogv', 'mp3', 'wav', 'm4a', 'mov', 'avi'],
+    'stylesheet': ['css'],
+}
+
+# Resource type -> prefixes of Accept header, used when the URL has no known extension
+RESOURCE_TYPE_ACCEPT = {
+    'image': ['image/'],
+    'font': ['font/', 'application/font'],
+    'media': ['video/', 'audio/'],
+    'stylesheet': ['text/css'],
+}
+
+DEFAULT_BLOCKED_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'adservice.google.com', 'connect.facebook.net', 'hotjar.com', 'scorecardresearch.com', 'quantserve.com',
+]
+
+# CDP resource types (Network.ResourceType) -> resource types
+CDP_RESOURCE_TYPES = {'Image': 'image', 'Font': 'font', 'Media': 'media', 'Stylesheet': 'stylesheet'}
+
+# Chrome logs Network events into the performance log, requests blocked by Network.setBlockedURLs are counted from it
+CHROME_LOGGING_PREFS = {'performance': 'ALL'}
+CHROME_PERF_LOGGING_PREFS = {'enableNetwork': True, 'enablePage': False}
+
+# URL, transferred bytes and body size of resources loaded by the page (Resource Timing API)
+LOADED_RESOURCES_SCRIPT = """
+const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+return entries.map(entry => [entry.name, entry.transferSize || 0, entry.encodedBodySize || 0]);
+"""
+
+
+def _is_domain_blocked(host: str, domains: List[str]) -> Optional[str]:
+    return next((domain for domain in domains if host == domain or host.endswith('.' + domain)), None)
+
+
+@dataclass
+class BlockingProfile:
+    """Requests which are not needed for extraction and are blocked during page loads."""
+    resource_types: List[str] = field(default_factory=lambda: ['image', 'font', 'media'])
+    blocked_domains: List[str] = field(default_factory=lambda: list(DEFAULT_BLOCKED_DOMAINS))
+
+    def __post_init__(self):
+        unknown_types = set(self.resource_types) - set(RESOURCE_TYPE_EXTENSIONS)
+        if unknown_types:
+            raise ValueError(f'Unknown resource types {sorted(unknown_types)}, use {sorted(RESOURCE_TYPE_EXTENSIONS)}')
+
+        self.blocked_domains = [domain.lower().lstrip('.') for domain in self.blocked_domains]
+
+    def get_resource_type(self, url: str, accept: Optional[str] = None) -> Optional[str]:
+        """Blocked resource type of the request, None if its type is not blocked."""
+        extension = os.path.splitext(urlparse(url).path)[1].lstrip('.').lower()
+        accept = (accept or '').lower()
+
+        for resource_type in self.resource_types:
+            if extension in RESOURCE_TYPE_EXTENSIONS[resource_type]:
+                return resource_type
+
+            if any(accept.startswith(prefix) for prefix in RESOURCE_TYPE_ACCEPT[resource_type]):
+                return resource_type
+
+        return None
+
+    def get_block_reason(self, url: str, accept: Optional[str] = None) -> Optional[tuple]:
+        """
+        :return: tuple ('type', resource type) or ('domain', blocked domain), None if the request is allowed
+        """
+        domain = _is_domain_blocked((urlparse(url).hostname or '').lower(), self.blocked_domains)
+        if domain is not None:
+            return 'domain', domain
+
+        resource_type = self.get_resource_type(url, accept)
+        if resource_type is not None:
+            return 'type', resource_type
+
+        return None
+
+    def get_url_patterns(self) -> List[str]:
+        """Wildcard patterns for CDP Network.setBlockedURLs."""
+        patterns = []
+
+        for resource_type in self.resource_types:
+            for extension in RESOURCE_TYPE_EXTENSIONS[resource_type]:
+                patterns += [f'*.{extension}', f'*.{extension}?*']
+
+        for domain in self.blocked_domains:
+            patterns += [f'*://{domain}/*', f'*://*.{domain}/*']
+
+        return patterns
+
+
+# Profile blocking all resource types, used to find resource type of loaded resources
+_ALL_RESOURCE_TYPES_PROFILE = BlockingProfile(resource_types=list(RESOURCE_TYPE_EXTENSIONS), blocked_domains=[])
+
+
+class BlockingStats:
+    """
+    Counters of blocked requests and of requests / bytes loaded by the pages, updated from proxy threads.
+
+    Size of blocked requests is unknown, saved bytes are estimated from the average body size of loaded resources of
+    the same type (on pages where the type wasn't blocked).
+    """
+
+    def __init__(self):
+        self.requests_blocked = 0
+        self.blocked_by_type = collections.Counter()
+        self.blocked_by_domain = collections.Counter()
+        self.requests_loaded = 0
+        self.bytes_loaded = 0
+        self.pages_loaded = 0
+        self.is_blocking_counted = True  # False if some blocked requests couldn't be counted
+        self._loaded_by_type = collections.Counter()  # Resource type -> number of loaded resources with known size
+        self._loaded_bytes_by_type = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record_blocked(self, reason: tuple):
+        kind, value = reason
+
+        with self._lock:
+            self.requests_blocked += 1
+            if kind == 'type':
+                self.blocked_by_type[value] += 1
+            else:
+                self.blocked_by_domain[value] += 1
+
+    def record_not_counted(self):
+        """Blocking was active in a browser which can't report blocked requests."""
+        with self._lock:
+            self.is_blocking_counted = False
+
+    def record_page(self, resources: List[list]):
+        """:param resources: list of [url, transferred bytes, body size] of resources loaded by the page"""
+        with self._lock:
+            self.pages_loaded += 1
+            self.requests_loaded += len(resources)
+            self.bytes_loaded += sum(transferred_bytes for _, transferred_bytes, _ in resources)
+
+            for url, _, body_size in resources:
+                resource_type = _ALL_RESOURCE_TYPES_PROFILE.get_resource_type(url)
+
+                # Cross-origin resources without Timing-Allow-Origin have unknown size (0)
+                if resource_type is not None and body_size:
+                    self._loaded_by_type[resource_type] += 1
+                    self._loaded_bytes_by_type[resource_type] += body_size
+
+    def _estimate_bytes_saved(self) -> Optional[int]:
+        """
+        Blocked requests by type times average body size of loaded resources of the type. Requests blocked by domain
+        are not included, None if no blocked type has a measured size.
+        """
+        measured_types = [x for x in self.blocked_by_type if self._loaded_by_type[x]]
+        if self.blocked_by_type and not measured_types:
+            return None
+
+        return round(sum(self.blocked_by_type[x] * self._loaded_bytes_by_type[x] / self._loaded_by_type[x]
+                         for x in measured_types))
+
+    def to_dict(self) -> dict:
+        """Counters of blocked requests are None if some of them couldn't be counted."""
+        with self._lock:
+            is_counted = self.is_blocking_counted
+
+            return {
+                'requests_blocked': self.requests_blocked if is_counted else None,
+                'blocked_by_type': dict(self.blocked_by_type) if is_counted else None,
+                'blocked_by_domain': dict(self.blocked_by_domain) if is_counted else None,
+                'estimated_bytes_saved': self._estimate_bytes_saved() if is_counted else None,
+                'requests_loaded': self.requests_loaded,
+                'bytes_loaded': self.bytes_loaded,
+                'pages_loaded': self.pages_loaded,
+            }
+
+
+def create_request_interceptor(profile: BlockingProfile, stats: BlockingStats):
+    """selenium-wire request interceptor aborting blocked requests before they leave the proxy."""
+
+    def interceptor(request):
+        reason = profile.get_block_reason(request.url, request.headers.get('Accept'))
+
+        if reason is not None:
+            stats.record_blocked(reason)
+            request.abort()
+
+    return interceptor
+
+
+def apply_blocking_profile(browser, profile: Optional[BlockingProfile], stats: BlockingStats, use_cdp: bool) -> bool:
+    """
+    Block requests of the profile in the browser, None removes blocking.
+
+    Chrome blocks the requests itself (CDP Network.setBlockedURLs), they are counted by
+    record_chrome_blocked_requests. Other browsers need selenium-wire, requests are aborted and counted by its request
+    interceptor.
+        :return: bool, False if blocking is not supported by the browser
+    """
+    if use_cdp:
+        browser.execute_cdp_cmd('Network.enable', {})
+        browser.execute_cdp_cmd('Network.setBlockedURLs', {'urls': profile.get_url_patterns() if profile else []})
+        return True
+
+    if not hasattr(browser, 'request_interceptor'):
+        if profile is not None:
+            docrawl_logger.warning('Blocking of resources requires selenium-wire or Chrome, nothing is blocked')
+        return False
+
+    if profile is not None:
+        browser.request_interceptor = create_request_interceptor(profile, stats)
+    elif getattr(browser, 'request_interceptor', None) is not None:
+        del browser.request_interceptor
+
+    return True
+
+
+def enable_chrome_blocked_request_log(options):
+    """Set ChromeOptions, so that requests blocked by Chrome can be counted (see record_chrome_blocked_requests)."""
+    options.set_capability('goog:loggingPrefs', CHROME_LOGGING_PREFS)
+    options.add_experimental_option('perfLoggingPrefs', CHROME_PERF_LOGGING_PREFS)
+
+
+def record_chrome_blocked_requests(browser, profile: Optional[BlockingProfile], stats: BlockingStats):
+    """
+    Count requests blocked by Chrome from Network.loadingFailed events of the performance log, the log is emptied.
+        :param profile: BlockingProfile active during the page load, used to find why requests were blocked
+    """
+    try:
+        entries = browser.get_log('performance')
+    except WebDriverException:
+        # Browser was launched without the performance log
+        if profile is not None:
+            stats.record_not_counted()
+        return
+
+    request_urls = {}  # Request ID -> URL
+
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        params = message.get('params', {})
+
+        if message['method'] == 'Network.requestWillBeSent':
+            request_urls[params['requestId']] = params['request']['url']
+
+        # Requests blocked by Network.setBlockedURLs have reason inspector
+        elif message['method'] == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+            url = request_urls.get(params['requestId'], '')
+            reason = profile.get_block_reason(url) if profile is not None else None
+
+            if reason is None:
+                resource_type = CDP_RESOURCE_TYPES.get(params.get('type'))
+                reason = ('type', resource_type) if resource_type else ('domain', urlparse(url).hostname or '')
+
+            stats.record_blocked(reason)
+
+
+def record_loaded_resources(browser, stats: BlockingStats):
+    stats.record_page(browser.execute_script(LOADED_RESOURCES_SCRIPT))
@@ -0,0 +1,119 @@
+import collections
+import hashlib
+import json
+import threading
+from typing import List, Optional
+
+
+class ScanCache:
+    """
+    Bounded LRU cache of scan results.
+
+    Entries are keyed by page URL and scan parameters and store hash of the page source, so a cached result is
+    returned only if the page didn't change since it was scanned. Optionally backed by Redis, so that the results
+    are shared by all spiders (and worker processes) using the same Redis server.
+    """
+
+    def __init__(self, max_size: int = 128, redis_client=None, key_prefix: str = 'docrawl:scan_cache',
+                 expiration: int = 3600):
+        """
+        :param max_size: max number of entries kept in memory
+        :param redis_client: redis-py client, entries are also stored in Redis if passed
+        :param key_prefix: prefix of Redis keys
+        :param expiration: seconds after which entries are removed from Redis
+        """
+        self.max_size = max_size
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.expiration = expiration
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_content_hash(page_source: str) -> str:
+        return hashlib.sha256(page_source.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _get_key(url: str, params: dict) -> str:
+        params = json.dumps(params, sort_keys=True, default=str)
+
+        return hashlib.sha256(f'{url}\n{params}'.encode('utf-8')).hexdigest()
+
+    def _get_redis_key(self, key: str) -> str:
+        return f'{self.key_prefix}:{key}'
+
+    def _get_entry(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.redis is not None:
+            entry = self.redis.get(self._get_redis_key(key))
+            if entry is not None:
+                entry = json.loads(entry)
+                self._set_local_entry(key, entry)
+                return entry
+
+        return None
+
+    def _set_local_entry(self, key: str, entry: dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _delete_entry(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self.redis is not None:
+            self.redis.delete(self._get_redis_key(key))
+
+    def get(self, url: str, params: dict, content_hash: str) -> Optional[List[dict]]:
+        """
+        Return cached elements of the page, None if the page wasn't scanned with the same parameters or changed.
+            :param url: str, URL of the page
+            :param params: dict, scan parameters
+            :param content_hash: str, hash of the current page source (see get_content_hash)
+        """
+        key = self._get_key(url, params)
+        entry = self._get_entry(key)
+
+        if entry is not None and entry['content_hash'] != content_hash:
+            # Page changed, the entry won't be valid anymore
+            self._delete_entry(key)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry['elements']
+
+    def set(self, url: str, params: dict, content_hash: str, elements: List[dict]):
+        key = self._get_key(url, params)
+        entry = {'content_hash': content_hash, 'elements': elements}
+
+        self._set_local_entry(key, entry)
+
+        if self.redis is not None:
+            self.redis.set(self._get_redis_key(key), json.dumps(entry), ex=self.expiration)
+
+    def clear(self):
+        """Remove all entries from memory, entries in Redis expire on their own."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
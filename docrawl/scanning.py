@@ -0,0 +1,556 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import lxml.html
+from lxml import etree
+from scrapy.selector import Selector
+
+from docrawl.docrawl_logger import docrawl_logger
+from docrawl.elements import Element, ElementType, classify_element_by_xpath, compile_xpath, element_xpath_registry
+from docrawl.tables import extract_table
+from docrawl.utils import build_abs_url
+
+# Evaluates all XPath queries of the scan in the browser and serializes every matched element in one round trip.
+# XPath of the element is built in the same format as lxml's getpath(), e.g. /html/body/div[2]/p
+#
+# After a full scan, MutationObserver records roots of changed subtrees. Incremental scan (arguments[1] = true)
+# re-reads data only of nodes inside / containing changed subtrees (dirty nodes), other nodes reuse their cached
+# payload. Incremental scan returns null if the observer doesn't exist anymore (e.g. the page was reloaded).
+DOM_SNAPSHOT_SCRIPT = """
+const queries = arguments[0];
+const incremental = arguments[1];
+const xpathCache = new Map();
+
+let state = window.__docrawlScanState;
+if (incremental && !state) {
+    return null;
+}
+if (!incremental) {
+    if (state) {
+        state.observer.disconnect();
+    }
+    state = {ids: new WeakMap(), payloads: new WeakMap(), nextId: 1, dirtyRoots: new Set(), observer: null};
+    window.__docrawlScanState = state;
+}
+
+function recordMutations(mutations) {
+    for (const mutation of mutations) {
+        const target = mutation.type === 'characterData' ? mutation.target.parentElement : mutation.target;
+        if (target) {
+            state.dirtyRoots.add(target);
+        }
+    }
+}
+
+if (state.observer) {
+    recordMutations(state.observer.takeRecords());
+}
+const dirtyRoots = Array.from(state.dirtyRoots);
+state.dirtyRoots.clear();
+
+function isDirty(node) {
+    return dirtyRoots.some(root => root === node || root.contains(node) || node.contains(root));
+}
+
+function getXPath(node) {
+    if (!node || node.nodeType !== Node.ELEMENT_NODE) {
+        return '';
+    }
+    if (xpathCache.has(node)) {
+        return xpathCache.get(node);
+    }
+
+    let index = 0;
+    let count = 0;
+    const siblings = node.parentNode ? node.parentNode.children : [];
+    for (const sibling of siblings) {
+        if (sibling.tagName === node.tagName) {
+            count++;
+            if (sibling === node) {
+                index = count;
+            }
+        }
+    }
+
+    const tag = node.tagName.toLowerCase();
+    const xpath = getXPath(node.parentNode) + '/' + (count > 1 ? tag + '[' + index + ']' : tag);
+    xpathCache.set(node, xpath);
+
+    return xpath;
+}
+
+function snapshotPayload(node) {
+    const rect = node.getBoundingClientRect();
+    const style = window.getComputedStyle(node);
+    const attributes = {};
+    for (const attribute of node.attributes) {
+        attributes[attribute.name] = attribute.value;
+    }
+
+    return {
+        tag: node.tagName.toLowerCase(),
+        isVisible: rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none',
+        attributes: attributes,
+        text: node.textContent,
+        rowCount: node.tagName.toLowerCase() === 'table' ? node.querySelectorAll('tr').length : null,
+    };
+}
+
+function snapshotNode(node) {
+    let id = state.ids.get(node);
+    if (id === undefined) {
+        id = state.nextId++;
+        state.ids.set(node, id);
+    }
+
+    let payload = incremental && !isDirty(node) ? state.payloads.get(node) : undefined;
+    const dirty = payload === undefined;
+    if (dirty) {
+        payload = snapshotPayload(node);
+        state.payloads.set(node, payload);
+    }
+
+    const rect = node.getBoundingClientRect();
+
+    return Object.assign({
+        id: id,
+        dirty: dirty,
+        xpath: getXPath(node),
+        rect: {x: rect.left + window.scrollX, y: rect.top + window.scrollY, width: rect.width, height: rect.height},
+    }, payload);
+}
+
+const results = queries.map(function (query) {
+    const nodes = [];
+    try {
+        const result = document.evaluate(query, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < result.snapshotLength; i++) {
+            const node = result.snapshotItem(i);
+            if (node.nodeType === Node.ELEMENT_NODE) {
+                nodes.push(snapshotNode(node));
+            }
+        }
+    } catch (e) {
+        return {nodes: [], error: String(e)};
+    }
+    return {nodes: nodes, error: null};
+});
+
+if (!state.observer) {
+    state.observer = new MutationObserver(recordMutations);
+    state.observer.observe(
+        document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true}
+    );
+}
+
+return {results: results, mutated: dirtyRoots.length > 0};
+"""
+
+
+@dataclass
+class ScanSection:
+    element_type: ElementType
+    query: str
+    is_predefined: bool = False  # Query is the union of PREDEFINED_TAGS of the element type
+    ignore_errors: bool = False
+
+
+@dataclass
+class ScanBatch:
+    """Elements found in one section of the scan."""
+    element_type: ElementType
+    elements: List[dict]
+    sections_done: int
+    sections_total: int
+
+
+@dataclass
+class ScanState:
+    """Result of the previous browser scan, used by the incremental scan."""
+    params: dict  # Scan inputs, incremental scan is possible only with the same inputs
+    elements: List[dict]
+    element_data: Dict[tuple, dict]  # (element type, node ID) -> extracted element data
+
+
+def get_scan_params(inp: dict) -> dict:
+    """Inputs of scan_web_page which affect found elements."""
+    return {key: value for key, value in inp.items() if key not in ('incremental', 'use_cache', 'output_folder')}
+
+
+def diff_elements(previous_elements: List[dict], elements: List[dict]) -> dict:
+    """
+    Compare two lists of scanned elements, elements are identified by type and XPath.
+        :return: dict with added and changed (data or position) elements and removed elements from previous list
+    """
+    previous_by_key = {(x['type'], x['xpath']): x for x in previous_elements}
+    keys = {(x['type'], x['xpath']) for x in elements}
+
+    diff = {'added': [], 'removed': [], 'changed': []}
+
+    for element in elements:
+        previous_element = previous_by_key.get((element['type'], element['xpath']))
+
+        if previous_element is None:
+            diff['added'].append(element)
+        elif previous_element['data'] != element['data'] or previous_element['rect'] != element['rect']:
+            diff['changed'].append(element)
+
+    diff['removed'] = [x for key, x in previous_by_key.items() if key not in keys]
+
+    return diff
+
+
+def string_cleaner(string):
+    """
+    Removes whitespaces from string.
+        :param string: string, string to clean
+        :return - cleaned string
+    """
+
+    return ''.join(string.strip()).replace('\\', '')
+
+
+def get_scan_sections(inp: dict) -> List[ScanSection]:
+    """
+    Translates inputs of scan_web_page into searched element types and their XPath queries (in order of scanning).
+        :param inp: list, inputs from launcher (incl_tables, incl_bullets, ..., by_xpath, context_xpath, cookies_xpath)
+    """
+    sections = []
+
+    incl_flags = [
+        (inp.get('incl_input', True), ElementType.INPUT),
+        (inp['incl_tables'], ElementType.TABLE),
+        (inp['incl_bullets'], ElementType.BULLET),
+        (inp['incl_texts'], ElementType.TEXT),
+        (inp['incl_headlines'], ElementType.HEADLINE),
+        (inp['incl_links'], ElementType.LINK),
+        (inp['incl_images'], ElementType.IMAGE),
+        (inp['incl_buttons'], ElementType.BUTTON),
+    ]
+
+    for is_included, element_type in incl_flags:
+        if is_included:
+            query = element_xpath_registry.get_query(element_type)
+            sections.append(ScanSection(element_type, query, is_predefined=True))
+
+    by_xpath = inp['by_xpath']
+    if by_xpath:
+        # Temporary workaround due to weird behaviour of lists in kpv
+        if ';' in by_xpath:
+            list_of_xpaths = by_xpath.split(';')[:-1]
+        else:
+            list_of_xpaths = [by_xpath]
+
+        for elem in list_of_xpaths:
+            # With text() at the end will not work
+            xpath = elem.removesuffix('/text()').rstrip('/')
+            sections.append(ScanSection(classify_element_by_xpath(xpath), xpath))
+
+    if inp['context_xpath']:
+        sections.append(ScanSection(ElementType.CONTEXT, inp['context_xpath'], ignore_errors=True))
+
+    if inp['cookies_xpath']:  # dev param only
+        sections.append(ScanSection(ElementType.COOKIES, inp['cookies_xpath']))
+
+    return sections
+
+
+class WebPageScanner(ABC):
+    """
+    Finds different elements (tables, bullets, texts, links, ...) on a web page.
+
+    Candidate elements of all searched sections are serialized at once by `snapshot_sections`, data of tables and
+    bullet lists are then parsed from `page`.
+    """
+
+    def __init__(self, page: Selector, current_url: Optional[str]):
+        """
+        :param page: Scrapy Selector of the scanned page
+        :param current_url: URL of the page, used to build absolute links (links are kept as they are if None)
+        """
+        self.page = page
+        self.current_url = current_url
+
+    @abstractmethod
+    def snapshot_nodes(self, queries: List[str]) -> List[dict]:
+        """
+        Evaluate XPath queries on the page.
+
+        :return: list with dict {nodes, error} for each query, nodes are dicts with tag, xpath, rect, isVisible,
+        attributes, text and rowCount (number of rows, tables only)
+        """
+
+    def snapshot_sections(self, sections: List[ScanSection]) -> List[dict]:
+        """Evaluate queries of all sections, returns dict {nodes, error} for each section."""
+        return self.snapshot_nodes([section.query for section in sections])
+
+    def iter_scan(self, inp: dict) -> Iterator[ScanBatch]:
+        """Scan the page, yields found elements of each section as soon as the section is processed."""
+        sections = get_scan_sections(inp)
+        snapshots = self.snapshot_sections(sections)
+
+        for i, (section, snapshot) in enumerate(zip(sections, snapshots)):
+            try:
+                elements = list(self.process_section(section, snapshot))
+            except Exception as e:
+                if not section.ignore_errors:
+                    raise
+                docrawl_logger.error(f'Error while retrieving {section.element_type} elements: {e}')
+                elements = []
+
+            yield ScanBatch(element_type=section.element_type, elements=elements, sections_done=i + 1,
+                            sections_total=len(sections))
+
+    def scan(self, inp: dict) -> List[dict]:
+        """Scan the page, returns found elements as dicts (see Element)."""
+        return [element for batch in self.iter_scan(inp) for element in batch.elements]
+
+    def process_section(self, section: ScanSection, snapshot: dict) -> Iterator[dict]:
+        if snapshot['error']:
+            raise ValueError(f'Invalid XPath: {snapshot["error"]}')
+
+        return self.process_nodes(section.element_type, snapshot['nodes'])
+
+    def process_nodes(self, element_type: ElementType, nodes: List[dict]) -> Iterator[dict]:
+        """Build elements from snapshots of nodes found for one element type."""
+        added_xpaths = set()  # For deduplication of elements
+
+        for i, node in enumerate(nodes):
+            if not self.is_node_sized(node):
+                continue
+
+            elem_name = f'{element_type}_{i}'
+
+            # Skip tables with no rows
+            if element_type == ElementType.TABLE and node['rowCount'] < 2:
+                continue
+
+            try:
+                xpath = node['xpath']
+
+                if xpath not in added_xpaths:
+                    element_data = self.extract_node_data(node=node, xpath=xpath, element_type=element_type)
+                    element_c = Element(name=elem_name, type=element_type, rect=node['rect'], xpath=xpath,
+                                        data=element_data)
+                    if self.is_element_empty(element_c):
+                        continue
+                    added_xpaths.add(xpath)
+
+                    yield element_c.dict()
+
+            except Exception as e:
+                docrawl_logger.error(f'Error while extracting data for element {elem_name}: {e}')
+
+    @staticmethod
+    def is_node_sized(node: dict) -> bool:
+        """Skip elements with no width or height, elements without layout information (rect is None) are kept."""
+        rect = node['rect']
+        if rect is None:
+            return True
+        if rect['width'] == 0 or rect['height'] == 0:
+            return False
+        return True
+
+    @staticmethod
+    def is_element_empty(element: Element) -> bool:
+        """Skip elements based on their type and 'emptiness' rules."""
+        if element.type in [ElementType.TEXT, ElementType.HEADLINE]:
+            # Skip text-based elements with no text or whitespaces only
+            return element.data['textContent'].strip() == ''
+        else:
+            # TODO: Add checks for other types of elements if necessary
+            pass
+        return False
+
+    def process_bullet(self, xpath):
+        """
+        Processes (cleans) bullet element, e.g. one <li> element per line
+            :param xpath: XPath of element
+        """
+
+        tag_2 = self.page.xpath(xpath)[0]
+        result = []
+        li_tags = tag_2.xpath('.//li')
+
+        # <li> inside <ol> don't contain numbers, but they could be added here
+        for li_tag in li_tags:
+            data = li_tag.xpath('.//text()').getall()
+            data = [string_cleaner(x) for x in data]  # Cleaning the text
+            data = list(filter(None, data))
+            element = ' '.join(data).replace(u'\xa0', u' ')
+
+            result.append(element + '\n')
+
+        return result
+
+    def process_table(self, xpath):
+        """
+        Extracts table into JSON ({column: {row: value}}), first row is used as header if there is no <th> row.
+            :param xpath: XPath of element
+        """
+        table = self.page.xpath(xpath)[0].root
+
+        return extract_table(table).to_json()
+
+    def extract_node_data(self, node: dict, xpath: str, element_type: ElementType) -> dict:
+        """Return data of element, can be overridden to reuse data from the previous scan."""
+        return self.extract_element_data(node=node, xpath=xpath, element_type=element_type)
+
+    def extract_element_data(self, node: dict, xpath: str, element_type: ElementType):
+        attributes = dict(node['attributes'])
+
+        if element_type == ElementType.LINK:
+            text = node['text'].strip()
+            if self.current_url:
+                attributes['href'] = build_abs_url(attributes['href'], self.current_url)
+        elif element_type == ElementType.BUTTON:
+            text = node['text'].strip()
+        elif element_type == ElementType.IMAGE:
+            xpath_new = xpath + '//text()'
+            text = self.page.xpath(xpath_new).extract()
+        elif element_type == ElementType.BULLET:
+            text = self.process_bullet(xpath)
+        elif element_type == ElementType.TABLE:
+            text = self.process_table(xpath)
+        elif element_type == ElementType.INPUT:
+            text = node['text']
+        else:
+            text = node['text'].strip()
+
+        element_data = {
+            'tagName': node['tag'],
+            'textContent': text,
+            'attributes': attributes
+        }
+
+        return element_data
+
+
+class BrowserPageScanner(WebPageScanner):
+    """
+    Scans page opened in browser, all candidate elements are serialized with a single injected script.
+
+    If `scan_state` of the previous scan is given, the scan is incremental: only elements changed since the previous
+    scan are extracted again, data of other elements are reused.
+    """
+
+    def __init__(self, browser, page: Selector, scan_state: Optional[ScanState] = None):
+        super().__init__(page=page, current_url=browser.current_url)
+        self.browser = browser
+        self.scan_state = scan_state
+
+        self.element_data = {}  # (element type, node ID) -> element data, for the next incremental scan
+
+    def snapshot_nodes(self, queries: List[str]) -> List[dict]:
+        snapshot = None
+
+        if self.scan_state is not None:
+            snapshot = self.browser.execute_script(DOM_SNAPSHOT_SCRIPT, queries, True)
+
+            if snapshot is None:
+                docrawl_logger.info('Page was reloaded since the previous scan, scanning the whole page')
+                self.scan_state = None
+            elif snapshot['mutated']:
+                # Tables and bullet lists are parsed from page source
+                self.page = Selector(text=self.browser.page_source)
+
+        if snapshot is None:
+            snapshot = self.browser.execute_script(DOM_SNAPSHOT_SCRIPT, queries, False)
+
+        return snapshot['results']
+
+    def extract_node_data(self, node: dict, xpath: str, element_type: ElementType) -> dict:
+        key = (element_type, node['id'])
+        element_data = None
+
+        if self.scan_state is not None and not node['dirty']:
+            element_data = self.scan_state.element_data.get(key)
+
+        if element_data is None:
+            element_data = super().extract_node_data(node=node, xpath=xpath, element_type=element_type)
+
+        self.element_data[key] = element_data
+
+        return element_data
+
+
+class HtmlPageScanner(WebPageScanner):
+    """
+    Scans HTML source with lxml only, no browser is needed (e.g. archived pages or `browser.page_source`).
+
+    There is no layout information, so elements have no rect and are not filtered by size.
+    """
+
+    def __init__(self, html: str, current_url: Optional[str] = None):
+        self.tree = lxml.html.document_fromstring(html)
+        super().__init__(page=Selector(root=self.tree, type='html'), current_url=current_url)
+
+    def snapshot_node(self, node) -> dict:
+        return {
+            'tag': node.tag,
+            'xpath': self.tree.getroottree().getpath(node),
+            'rect': None,
+            'isVisible': None,
+            'attributes': dict(node.attrib),
+            'text': node.text_content(),
+            'rowCount': len(node.xpath('.//tr')) if node.tag == 'table' else None,
+        }
+
+    def snapshot_nodes(self, queries: List[str]) -> List[dict]:
+        snapshots = []
+
+        for query in queries:
+            try:
+                nodes = compile_xpath(query)(self.tree)
+            except etree.XPathError as e:
+                snapshots.append({'nodes': [], 'error': str(e)})
+                continue
+
+            # Only elements, XPath can also return text, attributes or comments
+            nodes = [node for node in nodes if isinstance(node, lxml.html.HtmlElement)]
+            snapshots.append({'nodes': [self.snapshot_node(node) for node in nodes], 'error': None})
+
+        return snapshots
+
+    def snapshot_sections(self, sections: List[ScanSection]) -> List[dict]:
+        """Predefined sections are found together by one union query, custom XPaths are evaluated one by one."""
+        predefined_types = [section.element_type for section in sections if section.is_predefined]
+        predefined_nodes = {element_type: [] for element_type in predefined_types}
+
+        for element_type, node in element_xpath_registry.find(self.tree, predefined_types):
+            predefined_nodes[element_type].append(self.snapshot_node(node))
+
+        custom_sections = [section for section in sections if not section.is_predefined]
+        custom_snapshots = iter(self.snapshot_nodes([section.query for section in custom_sections]))
+
+        return [
+            {'nodes': predefined_nodes[section.element_type], 'error': None}
+            if section.is_predefined else next(custom_snapshots)
+            for section in sections
+        ]
+
+
+def scan_html(html: str, inp: dict, current_url: Optional[str] = None) -> List[dict]:
+    """
+    Scan HTML source without browser.
+        :param html: str, HTML source of the page
+        :param inp: dict, same inputs as scan_web_page (incl_tables, incl_bullets, ..., by_xpath, context_xpath)
+        :param current_url: str, URL of the page, used to build absolute links
+        :return: list of found elements as dicts
+    """
+    return HtmlPageScanner(html, current_url).scan(inp)
+
+
+def scan_html_file(filename: str, inp: dict, current_url: Optional[str] = None, encoding: str = 'utf-8') -> List[dict]:
+    """
+    Scan HTML file without browser, e.g. page saved by extract_page_source. Can be used in a process pool.
+        :param filename: str, path to HTML file
+        :param inp: dict, same inputs as scan_web_page
+        :param current_url: str, URL of the page, used to build absolute links
+        :param encoding: str, encoding of the file
+    """
+    with open(filename, encoding=encoding) as f:
+        html = f.read()
+
+    return scan_html(html, inp, current_url)
@@ -0,0 +1,173 @@
+import collections
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+from docrawl.docrawl_logger import docrawl_logger
+from docrawl.utils import get_redis_client, is_redis_backed
+
+
+class FrameRing(ABC):
+    """Bounded list of the latest screencast frames (dicts with base64 `data` and `timestamp`), oldest are dropped."""
+
+    @abstractmethod
+    def push(self, frame: dict, max_frames: int):
+        """Append frame, keep only `max_frames` latest frames."""
+
+    @abstractmethod
+    def get_frames(self) -> List[dict]:
+        """Frames from the oldest to the latest."""
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+class LocalFrameRing(FrameRing):
+    """In-process ring, used together with KeepVariableDummyRedisServer."""
+
+    def __init__(self):
+        self._frames = collections.deque()
+        self._lock = threading.Lock()
+
+    def push(self, frame: dict, max_frames: int):
+        with self._lock:
+            self._frames.append(frame)
+
+            while len(self._frames) > max_frames:
+                self._frames.popleft()
+
+    def get_frames(self) -> List[dict]:
+        with self._lock:
+            return list(self._frames)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+class RedisFrameRing(FrameRing):
+    """Ring stored in Redis list, trimmed by LTRIM after each push."""
+
+    def __init__(self, redis_client, key: str):
+        self.redis = redis_client
+        self.key = key
+
+    def push(self, frame: dict, max_frames: int):
+        pipeline = self.redis.pipeline()
+        pipeline.rpush(self.key, json.dumps(frame))
+        pipeline.ltrim(self.key, -max_frames, -1)
+        pipeline.execute()
+
+    def get_frames(self) -> List[dict]:
+        return [json.loads(frame) for frame in self.redis.lrange(self.key, 0, -1)]
+
+    def clear(self):
+        self.redis.delete(self.key)
+
+
+def create_frame_ring(kv_redis, key: str) -> FrameRing:
+    """Ring of screencast frames, frames are stored in Redis list under `key` if the storage is Redis."""
+    if not is_redis_backed(kv_redis):
+        return LocalFrameRing()
+
+    return RedisFrameRing(get_redis_client(kv_redis), key)
+
+
+class ChromeScreencast(threading.Thread):
+    """
+    Streams frames of Chrome's Page.startScreencast over a CDP connection (selenium's bidi_connection, trio).
+
+    Chrome produces a frame only when the compositor draws a new one, so nothing is sent while the page doesn't
+    change. The next frame is produced only after the previous one is acknowledged, acknowledging is delayed to
+    keep the frame rate under `max_fps`.
+    """
+
+    def __init__(self, browser, on_frame: Callable[[str, dict], None], image_format: str = 'jpeg',
+                 quality: int = 70, max_width: Optional[int] = 1280, max_height: Optional[int] = 720,
+                 max_fps: float = 5):
+        """
+        :param browser: Chrome driver instance
+        :param on_frame: called with base64 encoded frame and frame metadata (CDP ScreencastFrameMetadata as dict)
+        :param image_format: str, jpeg or png
+        :param quality: int, 0 - 100, quality of JPEG frames
+        :param max_width: int, max width of frames, frames are downscaled by Chrome
+        :param max_height: int, max height of frames
+        :param max_fps: float, max number of frames per second
+        """
+        super().__init__(daemon=True)
+
+        if image_format not in ('jpeg', 'png'):
+            raise ValueError(f'Unknown screencast format {image_format}, use jpeg or png')
+
+        self.browser = browser
+        self.on_frame = on_frame
+        self.image_format = image_format
+        self.quality = quality
+        self.max_width = max_width
+        self.max_height = max_height
+        self.max_fps = max_fps
+
+        self.number_of_frames = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            import trio
+        except ImportError:
+            self.error = 'trio is required for screencast: pip install trio'
+            docrawl_logger.error(self.error)
+            return
+
+        try:
+            trio.run(self._stream)
+        except Exception as e:
+            self.error = str(e)
+            docrawl_logger.error(f'Screencast stopped: {e}')
+
+    async def _stream(self):
+        import trio
+
+        async with self.browser.bidi_connection() as connection:
+            session, devtools = connection.session, connection.devtools
+
+            await session.execute(devtools.page.enable())
+            frames = session.listen(devtools.page.ScreencastFrame)
+            await session.execute(devtools.page.start_screencast(
+                format_=self.image_format, quality=self.quality, max_width=self.max_width,
+                max_height=self.max_height
+            ))
+            docrawl_logger.info('Screencast started')
+
+            frame_interval = 1 / self.max_fps if self.max_fps else 0
+            next_frame_time = 0
+
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(self._wait_for_stop, nursery.cancel_scope)
+
+                async for frame in frames:
+                    self.number_of_frames += 1
+                    self.on_frame(frame.data, frame.metadata.to_json())
+
+                    # Chrome sends the next frame after the acknowledgement, delaying it limits the frame rate
+                    await trio.sleep(max(next_frame_time - time.monotonic(), 0))
+                    next_frame_time = time.monotonic() + frame_interval
+                    await session.execute(devtools.page.screencast_frame_ack(frame.session_id))
+
+            await session.execute(devtools.page.stop_screencast())
+            docrawl_logger.info(f'Screencast stopped after {self.number_of_frames} frames')
+
+    async def _wait_for_stop(self, cancel_scope):
+        import trio
+
+        while not self._stop_event.is_set():
+            await trio.sleep(0.1)
+
+        cancel_scope.cancel()
+
+    def stop(self, timeout: float = 5):
+        self._stop_event.set()
+        self.join(timeout)
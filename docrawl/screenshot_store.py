@@ -0,0 +1,107 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from docrawl.utils import get_redis_client, is_redis_backed
+
+
+class ScreenshotStore(ABC):
+    """
+    Binary storage of screenshots. Screenshots are stored as raw bytes, without base64 encoding and JSON
+    serialization of kv_redis, optionally with expiration.
+    """
+
+    @abstractmethod
+    def set(self, key: str, data: bytes, ttl: Optional[int] = None):
+        """
+        Store screenshot.
+            :param key: str, storage key
+            :param data: bytes, encoded screenshot
+            :param ttl: int, optional, seconds after which the screenshot is removed
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Stored screenshot, None if it doesn't exist or expired."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Check that screenshot is stored and didn't expire, without loading it."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+
+class LocalScreenshotStore(ScreenshotStore):
+    """In-process storage, used together with KeepVariableDummyRedisServer."""
+
+    def __init__(self):
+        self._screenshots = {}  # key -> (data, expiration time or None)
+        self._lock = threading.Lock()
+
+    def set(self, key: str, data: bytes, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            self._screenshots[key] = (bytes(data), expires_at)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data, expires_at = self._screenshots.get(key, (None, None))
+
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._screenshots[key]
+                return None
+
+            return data
+
+    def exists(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def delete(self, key: str):
+        with self._lock:
+            self._screenshots.pop(key, None)
+
+
+class RedisScreenshotStore(ScreenshotStore):
+    """Storage in Redis strings, TTL is handled by Redis expiration."""
+
+    def __init__(self, redis_client):
+        """:param redis_client: redis-py client, a client returning bytes is created if it decodes responses"""
+        self.redis = self._get_binary_client(redis_client)
+
+    @staticmethod
+    def _get_binary_client(redis_client):
+        connection_pool = redis_client.connection_pool
+
+        if not connection_pool.connection_kwargs.get('decode_responses'):
+            return redis_client
+
+        import redis
+
+        connection_kwargs = dict(connection_pool.connection_kwargs, decode_responses=False)
+
+        return redis.Redis(connection_pool=redis.ConnectionPool(connection_class=connection_pool.connection_class,
+                                                                **connection_kwargs))
+
+    def set(self, key: str, data: bytes, ttl: Optional[int] = None):
+        self.redis.set(key, bytes(data), ex=ttl or None)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.redis.get(key)
+
+    def exists(self, key: str) -> bool:
+        return bool(self.redis.exists(key))
+
+    def delete(self, key: str):
+        self.redis.delete(key)
+
+
+def create_screenshot_store(kv_redis) -> ScreenshotStore:
+    """Binary screenshot store, screenshots are stored in Redis strings if the storage is Redis."""
+    if not is_redis_backed(kv_redis):
+        return LocalScreenshotStore()
+
+    return RedisScreenshotStore(get_redis_client(kv_redis))
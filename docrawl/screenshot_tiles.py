@@ -0,0 +1,121 @@
+import base64
+import math
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+DEFAULT_TILE_HEIGHT = 2000  # CSS pixels
+
+# Size of the page, scroll position and DOM version. DOM version is changed by a MutationObserver (installed on
+# the first call in each document), so checking whether the page changed doesn't serialize the whole DOM.
+PAGE_STATE_SCRIPT = """
+let state = window.__docrawlTileState;
+if (!state) {
+    state = window.__docrawlTileState = {id: Math.random().toString(36).slice(2), version: 0};
+    new MutationObserver(() => { state.version += 1; }).observe(
+        document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true}
+    );
+}
+const root = document.documentElement;
+const body = document.body || root;
+return {
+    domHash: state.id + ':' + state.version,
+    pageWidth: Math.max(root.scrollWidth, body.scrollWidth),
+    pageHeight: Math.max(root.scrollHeight, body.scrollHeight),
+    viewportWidth: window.innerWidth,
+    viewportHeight: window.innerHeight,
+    scrollX: window.scrollX,
+    scrollY: window.scrollY,
+};
+"""
+
+
+@dataclass
+class ScreenshotTile:
+    index: int
+    y: int  # Offset of the tile from the top of the page (CSS pixels)
+    width: int
+    height: int
+    page_height: int
+    number_of_tiles: int
+    dom_hash: str
+    cached: bool = False  # Tile was not captured again, the stored one is still valid
+
+
+def get_tile_layout(page_height: int, index: int, tile_height: int) -> Tuple[int, int, int]:
+    """
+    Position of the tile in the page.
+        :return: tuple (y, height, number_of_tiles), the last tile is shorter if the page height is not a multiple
+        of the tile height
+    """
+    if tile_height <= 0:
+        raise ValueError('Tile height must be positive')
+
+    number_of_tiles = max(math.ceil(page_height / tile_height), 1)
+
+    if not 0 <= index < number_of_tiles:
+        raise IndexError(f'Tile {index} is out of the page, the page has {number_of_tiles} tiles')
+
+    y = index * tile_height
+
+    return y, max(min(tile_height, page_height - y), 1), number_of_tiles
+
+
+def get_page_state(browser) -> dict:
+    return browser.execute_script(PAGE_STATE_SCRIPT)
+
+
+def capture_tile_png(browser, y: int, width: int, height: int, page_state: dict,
+                     use_cdp: bool) -> Tuple[bytes, int]:
+    """
+    Capture PNG of one region of the page.
+
+    With CDP (Chrome), only the region is rendered (Page.captureScreenshot with clip). Other browsers are scrolled to
+    the region and the viewport is captured (the region should have the viewport height), the scroll position is
+    restored afterwards. The last region of the page can't be scrolled to the top of the viewport, so it overlaps
+    with the previous one.
+        :return: tuple (PNG, offset of the captured region)
+    """
+    if use_cdp:
+        screenshot_config = {
+            'captureBeyondViewport': True,
+            'fromSurface': True,
+            'clip': {'x': 0, 'y': y, 'width': width, 'height': height, 'scale': 1},
+        }
+
+        return base64.b64decode(browser.execute_cdp_cmd('Page.captureScreenshot', screenshot_config)['data']), y
+
+    scroll_y = browser.execute_script('window.scrollTo(0, arguments[0]); return window.scrollY;', y)
+    try:
+        return browser.get_screenshot_as_png(), round(scroll_y)
+    finally:
+        browser.execute_script('window.scrollTo(arguments[0], arguments[1]);', page_state['scrollX'],
+                               page_state['scrollY'])
+
+
+class ScreenshotTileCache:
+    """
+    Tiles captured in the current page. A tile is valid while the DOM didn't change and it was captured with the
+    same options (tile height, which determines its offset, compression, ...).
+    """
+
+    def __init__(self):
+        self._tiles = {}  # index -> (tile, options)
+        self._lock = threading.Lock()
+
+    def get(self, index: int, dom_hash: str, options: tuple) -> Optional[ScreenshotTile]:
+        with self._lock:
+            tile, tile_options = self._tiles.get(index, (None, None))
+
+        if tile is None or (tile.dom_hash, tile_options) != (dom_hash, options):
+            return None
+
+        return tile
+
+    def set(self, tile: ScreenshotTile, options: tuple):
+        with self._lock:
+            self._tiles[tile.index] = (tile, options)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
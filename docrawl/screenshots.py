@@ -0,0 +1,208 @@
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from docrawl.docrawl_logger import docrawl_logger
+
+# Image format -> (Pillow format, file extension)
+PREVIEW_FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'jpg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+    'png': ('PNG', 'png'),
+}
+
+
+def _import_pillow():
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise ImportError('Pillow is required for compressed screenshots: pip install Pillow') from e
+
+    return Image
+
+
+def _import_zstd():
+    """zstd module with compress / decompress functions (compression.zstd, backports.zstd or zstandard)."""
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            from backports import zstd
+        except ImportError:
+            try:
+                import zstandard as zstd
+            except ImportError as e:
+                raise ImportError('zstandard is required for zstd compressed screenshots: pip install zstandard') from e
+
+    return zstd
+
+
+def is_pillow_available() -> bool:
+    try:
+        _import_pillow()
+    except ImportError:
+        return False
+
+    return True
+
+
+def get_screenshot_hash(png: bytes, hash_method: str = 'bytes') -> str:
+    """
+    Hash of the screenshot, used to detect that the page didn't change since the previous screenshot.
+        :param png: bytes, PNG screenshot
+        :param hash_method: str, bytes - hash of the image data, perceptual - difference hash of downscaled
+        grayscale image (ignores small changes, e.g. antialiasing), requires Pillow
+    """
+    if hash_method == 'bytes':
+        return hashlib.blake2b(png, digest_size=16).hexdigest()
+
+    if hash_method == 'perceptual':
+        Image = _import_pillow()
+
+        # dHash - each bit tells whether a pixel is brighter than its right neighbour
+        image = Image.open(io.BytesIO(png)).convert('L').resize((9, 8))
+        pixels = list(image.getdata())
+        bits = ''.join('1' if pixels[row * 9 + column] > pixels[row * 9 + column + 1] else '0'
+                       for row in range(8) for column in range(8))
+
+        return f'{int(bits, 2):016x}'
+
+    raise ValueError(f'Unknown hash method {hash_method}, use bytes or perceptual')
+
+
+def encode_screenshot(png: bytes, image_format: str = 'jpeg', quality: int = 70,
+                      max_width: Optional[int] = None) -> bytes:
+    """
+    Downscale and encode PNG screenshot, requires Pillow unless PNG is returned as it is.
+        :param png: bytes, PNG screenshot
+        :param image_format: str, jpeg, webp or png
+        :param quality: int, 1 - 100, quality of JPEG / WebP
+        :param max_width: int, optional, wider screenshots are downscaled to this width
+    """
+    if image_format not in PREVIEW_FORMATS:
+        raise ValueError(f'Unknown image format {image_format}, use one of {sorted(PREVIEW_FORMATS)}')
+
+    pillow_format = PREVIEW_FORMATS[image_format][0]
+
+    if pillow_format == 'PNG' and not max_width:
+        return png
+
+    Image = _import_pillow()
+    image = Image.open(io.BytesIO(png))
+
+    if max_width and image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)))
+
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    output = io.BytesIO()
+    image.save(output, format=pillow_format, quality=quality)
+
+    return output.getvalue()
+
+
+# Screenshot compressions, see compress_screenshot
+SCREENSHOT_COMPRESSIONS = (None, 'zstd', 'webp')
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def compress_screenshot(png: bytes, compression: Optional[str] = None, max_dimension: Optional[int] = None,
+                        quality: int = 80, zstd_level: int = 3) -> bytes:
+    """
+    Prepare PNG screenshot for storage.
+        :param png: bytes, PNG screenshot
+        :param compression: str, optional, zstd - lossless compression of the PNG bytes, webp - re-encoded as WebP
+        (much smaller than PNG, requires Pillow)
+        :param max_dimension: int, optional, screenshots with bigger width or height are downscaled (requires Pillow)
+        :param quality: int, 1 - 100, quality of WebP
+        :param zstd_level: int, zstd compression level
+    """
+    if compression not in SCREENSHOT_COMPRESSIONS:
+        raise ValueError(f'Unknown screenshot compression {compression}, use one of {SCREENSHOT_COMPRESSIONS}')
+
+    image = png
+
+    if max_dimension or compression == 'webp':
+        Image = _import_pillow()
+        pillow_image = Image.open(io.BytesIO(png))
+        width, height = pillow_image.size
+
+        if max_dimension and max(width, height) > max_dimension:
+            scale = max_dimension / max(width, height)
+            pillow_image = pillow_image.resize((max(round(width * scale), 1), max(round(height * scale), 1)))
+
+        output = io.BytesIO()
+        if compression == 'webp':
+            pillow_image.save(output, format='WEBP', quality=quality)
+        else:
+            pillow_image.save(output, format='PNG')
+        image = output.getvalue()
+
+    if compression == 'zstd':
+        image = _import_zstd().compress(image, zstd_level)
+
+    return image
+
+
+def decompress_screenshot(data: bytes) -> bytes:
+    """Reverse zstd compression of compress_screenshot, other screenshots are returned as they are."""
+    if bytes(data[:4]) == ZSTD_MAGIC:
+        return _import_zstd().decompress(data)
+
+    return data
+
+
+@dataclass
+class LivePreviewOptions:
+    image_format: str = 'jpeg'  # jpeg, webp or png
+    quality: int = 70
+    max_width: Optional[int] = 1280
+    hash_method: str = 'bytes'  # bytes or perceptual
+
+
+class LivePreview:
+    """
+    Viewport screenshots for live preview of the browser. Screenshots equal to the previous one are skipped, the
+    rest is downscaled and compressed (JPEG / WebP).
+
+    Without Pillow, screenshots are published as PNG and compared by bytes.
+    """
+
+    def __init__(self, options: Optional[LivePreviewOptions] = None):
+        self.requested_options = options or LivePreviewOptions()
+        self.options = self.requested_options  # Options in use, differ from the requested ones without Pillow
+        self.last_hash = None
+
+        if not is_pillow_available() and (self.options.image_format != 'png' or self.options.max_width
+                                          or self.options.hash_method != 'bytes'):
+            docrawl_logger.warning('Pillow is not installed, live preview uses uncompressed PNG screenshots')
+            self.options = LivePreviewOptions(image_format='png', max_width=None, hash_method='bytes')
+
+    @property
+    def extension(self) -> str:
+        return PREVIEW_FORMATS[self.options.image_format][1]
+
+    def get_filename(self, filename: str) -> str:
+        """Filename with extension of the preview format."""
+        return f'{os.path.splitext(filename)[0]}.{self.extension}'
+
+    def capture(self, browser) -> Optional[bytes]:
+        """Take viewport screenshot, return encoded preview or None if the page looks the same as before."""
+        png = browser.get_screenshot_as_png()
+        screenshot_hash = get_screenshot_hash(png, self.options.hash_method)
+
+        if screenshot_hash == self.last_hash:
+            return None
+
+        self.last_hash = screenshot_hash
+
+        return encode_screenshot(png, self.options.image_format, self.options.quality, self.options.max_width)
+
+    def reset(self):
+        """Publish the next screenshot even if it didn't change."""
+        self.last_hash = None
@@ -0,0 +1,237 @@
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+from lxml import etree
+
+from docrawl.elements import compile_xpath
+
+# Spans bigger than this are considered broken markup (e.g. rowspan="1000000")
+MAX_SPAN = 1000
+
+# Rows of the table itself, without rows of nested tables
+TABLE_ROWS_XPATH = './tr | ./thead/tr | ./tbody/tr | ./tfoot/tr'
+
+
+def clean_cell_text(cell) -> str:
+    """
+    Text of table cell, text nodes are stripped and joined with new lines.
+
+    Cells often contain several tags with text (e.g. <td><a>Text 1</a><a>Text 2</a></td>), they should still be in
+    one cell, so the texts are joined instead of being separate values.
+        :param cell: lxml element (td, th or any element selected as a column)
+    """
+    texts = [text.strip().replace('\\', '') for text in cell.xpath('.//text()')]
+
+    return '\n'.join(texts).strip()
+
+
+def clean_header_text(cell) -> str:
+    return ''.join(cell.xpath('.//text()')).replace('\n', '').replace('\t', '')
+
+
+def _get_span(cell, attribute: str) -> int:
+    try:
+        span = int(cell.get(attribute, 1))
+    except (TypeError, ValueError):
+        return 1
+
+    return min(max(span, 1), MAX_SPAN)
+
+
+def _make_unique(names: List[str]) -> List[str]:
+    """Deduplicate column names the same way as pandas does when reading files (Name, Name.1, ...)."""
+    counts = {}
+    unique_names = []
+
+    for name in names:
+        if name in counts:
+            counts[name] += 1
+            unique_names.append(f'{name}.{counts[name]}')
+        else:
+            counts[name] = 0
+            unique_names.append(name)
+
+    return unique_names
+
+
+@dataclass
+class ExtractedTable:
+    """Table stored by columns, values are strings or None (missing cells)."""
+    columns: List[str]
+    data: Dict[str, list]
+    index: List[int] = field(default_factory=list)  # Number of each row within the source rows
+
+    @property
+    def number_of_rows(self) -> int:
+        return len(self.index)
+
+    def rows(self) -> Iterable[list]:
+        return zip(*(self.data[column] for column in self.columns))
+
+    def to_pandas(self) -> pd.DataFrame:
+        return pd.DataFrame(self.data, columns=self.columns, index=self.index)
+
+    def to_arrow(self):
+        """Convert to pyarrow.Table, requires pyarrow."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError('pyarrow is required for Arrow output: pip install pyarrow') from e
+
+        return pa.table({column: pa.array(self.data[column], type=pa.string()) for column in self.columns})
+
+    def to_json(self) -> str:
+        """Serialize in the same format as DataFrame.to_json() ({column: {index: value}})."""
+        index = [str(i) for i in self.index]
+
+        return json.dumps({column: dict(zip(index, self.data[column])) for column in self.columns})
+
+
+class TableBuilder:
+    """
+    Builds columnar table from rows of cells (lxml elements) in one pass.
+
+    Cells with rowspan / colspan are copied to all grid positions they cover, so the values stay in correct columns.
+    Rows without any cell are skipped.
+    """
+
+    def __init__(self):
+        self._columns = []  # list of column lists
+        self._index = []
+        self._spans = {}  # column -> (number of remaining rows, value) of cells spanning from previous rows
+        self._row_number = 0
+
+    def _read_row(self, cells: Iterable, get_text) -> List[Optional[str]]:
+        row = {}
+        spans = {}
+        column = 0
+
+        for cell in cells:
+            # Skip positions covered by cells from previous rows
+            while column in self._spans:
+                column += 1
+
+            text = get_text(cell)
+            rowspan, colspan = _get_span(cell, 'rowspan'), _get_span(cell, 'colspan')
+
+            for i in range(column, column + colspan):
+                row[i] = text
+                if rowspan > 1:
+                    spans[i] = (rowspan - 1, text)
+
+            column += colspan
+
+        for i, (remaining, text) in self._spans.items():
+            row[i] = text
+            if remaining > 1:
+                spans[i] = (remaining - 1, text)
+
+        self._spans = spans
+
+        return [row.get(i) for i in range(max(row) + 1)] if row else []
+
+    def read_header(self, cells: Iterable, get_text=clean_header_text) -> List[str]:
+        """Read row of header cells, the row is not added to the data."""
+        self._row_number += 1
+
+        return self._read_row(cells, get_text)
+
+    def add_row(self, cells: Iterable):
+        row = self._read_row(cells, clean_cell_text)
+        row_number = self._row_number
+        self._row_number += 1
+
+        if not row:
+            return
+
+        number_of_rows = len(self._index)
+
+        # New columns are filled with None for previous rows
+        while len(self._columns) < len(row):
+            self._columns.append([None] * number_of_rows)
+
+        for i, column in enumerate(self._columns):
+            column.append(row[i] if i < len(row) else None)
+
+        self._index.append(row_number)
+
+    def build(self, header: Optional[List[str]] = None) -> ExtractedTable:
+        """
+        Build table, columns are named by the header if its length matches number of columns, by their positions
+        otherwise.
+        """
+        if header and len(header) == len(self._columns):
+            columns = _make_unique([str(x) if x is not None else '' for x in header])
+        else:
+            columns = [str(i) for i in range(len(self._columns))]
+
+        return ExtractedTable(columns=columns, data=dict(zip(columns, self._columns)), index=self._index)
+
+
+def extract_table(table, first_row_header: bool = True) -> ExtractedTable:
+    """
+    Extract <table> element into columns.
+        :param table: lxml element of the table
+        :param first_row_header: bool, use first row as header (if the table has no <th> header row)
+    """
+    builder = TableBuilder()
+    rows = table.xpath(TABLE_ROWS_XPATH)
+    header = None
+
+    if rows:
+        first_row_cells = rows[0].xpath('./td | ./th')
+        is_header_row = bool(first_row_cells) and all(cell.tag == 'th' for cell in first_row_cells)
+
+        if is_header_row or first_row_header:
+            header = builder.read_header(first_row_cells, clean_header_text if is_header_row else clean_cell_text)
+            rows = rows[1:]
+
+    for row in rows:
+        builder.add_row(row.xpath('./td | ./th'))
+
+    return builder.build(header)
+
+
+def _compile_relative_xpath(xpath: Union[str, etree.XPath]) -> etree.XPath:
+    """Compile XPath evaluated relative to the context node, e.g. /td -> ./td, //td -> .//td."""
+    if isinstance(xpath, etree.XPath):
+        return xpath
+
+    xpath = xpath.strip()
+    if xpath.startswith('/'):
+        xpath = '.' + xpath
+
+    return compile_xpath(xpath)
+
+
+def extract_table_by_xpaths(root, row_xpath: Union[str, etree.XPath], column_xpath: Union[str, etree.XPath],
+                            first_row_header: bool = False) -> ExtractedTable:
+    """
+    Extract table from rows and columns selected by XPaths, e.g. rows //div[@class="item"] and columns /span.
+    Columns are searched within each row, so the cost is linear in the number of rows.
+        :param root: lxml element / tree of the page
+        :param row_xpath: str or compiled XPath, selects rows in the page
+        :param column_xpath: str or compiled XPath, selects cells relative to the row (leading / or // is relative)
+        :param first_row_header: bool, use first row as header if the rows have no <th> cells
+    """
+    rows = (compile_xpath(row_xpath) if isinstance(row_xpath, str) else row_xpath)(root)
+    column_xpath = _compile_relative_xpath(column_xpath)
+    header_xpath = compile_xpath('.//th')
+
+    # Try to find headers within <th> tags
+    header = [clean_header_text(th) for row in rows for th in header_xpath(row)]
+
+    builder = TableBuilder()
+
+    for row in rows:
+        cells = column_xpath(row)
+
+        # If first row should be headers and headers were not defined before
+        if first_row_header and not header:
+            header = builder.read_header(cells, clean_cell_text)
+        else:
+            builder.add_row(cells)
+
+    return builder.build(header)
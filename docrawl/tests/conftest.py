@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def tmp_cwd(tmp_path, monkeypatch):
+    # KeepVariableDummyRedisServer stores data in working directory
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from docrawl.batch import async_create_clients, async_extract_urls, create_clients, extract_urls
+from docrawl.docrawl_client import AsyncDocrawlClient, DocrawlClient
+
+URLS = ['https://example.com/1', 'https://example.com/broken', 'https://example.com/3', 'https://example.com/4']
+
+
+def run_fake_spider(docrawl_client, stop_event, executed_commands=None):
+    """Loads pages and extracts their URL, loading of broken pages fails, loading of slow pages stalls."""
+    command_channel = docrawl_client.command_channel
+    current_url = None
+
+    while not stop_event.is_set():
+        command = command_channel.pop_command(timeout=0.1)
+        if command is None:
+            continue
+
+        if executed_commands is not None:
+            executed_commands.append((command['name'], (command['input'] or {}).get('url', current_url)))
+
+        error, result = None, None
+        if command['name'] == 'load_website':
+            current_url = command['input']['url']
+            error = 'Page not found' if 'broken' in current_url else None
+            if 'slow' in current_url:
+                time.sleep(0.7)
+        elif command['name'] == 'extract_multiple_xpaths':
+            result = [[current_url] for _ in command['input']['xpaths']]
+
+        command_channel.put_result(command['id'], {"name": command['name'], "error": error, "result": result})
+
+
+@pytest.fixture
+def start_spiders():
+    stop_event = threading.Event()
+
+    def start(clients):
+        for client in clients:
+            threading.Thread(target=run_fake_spider, args=(client, stop_event), daemon=True).start()
+
+    yield start
+    stop_event.set()
+
+
+def check_results(results):
+    assert sorted(x.url for x in results) == sorted(URLS)
+
+    for result in results:
+        if 'broken' in result.url:
+            assert result.data is None and result.error == 'Page not found'
+        else:
+            assert result.data == [[result.url]] and result.error is None
+
+
+def test_extract_urls(start_spiders):
+    clients = [DocrawlClient(redis_key_prefix=f'docrawl_batch:{i}') for i in range(3)]
+    start_spiders(clients)
+
+    results = list(extract_urls(clients, URLS, ['//h1'], concurrency=2, timeout=5))
+
+    check_results(results)
+    # Only 2 clients were used
+    assert {x.client for x in results} <= {'docrawl_batch:0', 'docrawl_batch:1'}
+
+
+def test_async_extract_urls(start_spiders):
+    clients = [AsyncDocrawlClient(redis_key_prefix=f'docrawl_batch:{i}') for i in range(2)]
+    start_spiders(clients)
+
+    async def collect():
+        return [result async for result in async_extract_urls(clients, URLS, ['//h1'], timeout=5)]
+
+    check_results(asyncio.run(collect()))
+
+
+def test_async_create_clients(monkeypatch, start_spiders):
+    started_clients = []
+
+    def run_spider(self, **kwargs):
+        self.is_spider_running = True
+        started_clients.append(self)
+        start_spiders([self])
+
+    monkeypatch.setattr(AsyncDocrawlClient, 'run_spider', run_spider)
+
+    clients = asyncio.run(async_create_clients(2, key_prefix='docrawl_batch_async'))
+
+    assert started_clients == clients
+    assert all(client.is_spider_running for client in clients)
+
+    with pytest.raises(TypeError):
+        create_clients(1, client_class=AsyncDocrawlClient)
+
+
+def test_extract_urls_after_timeout():
+    client = DocrawlClient(redis_key_prefix='docrawl_batch:slow')
+    stop_event = threading.Event()
+    executed_commands = []
+    threading.Thread(target=run_fake_spider, args=(client, stop_event, executed_commands), daemon=True).start()
+
+    urls = ['https://example.com/slow', 'https://example.com/2']
+    try:
+        results = list(extract_urls([client], urls, ['//h1'], timeout=0.5))
+    finally:
+        stop_event.set()
+
+    assert results[0].url == urls[0] and results[0].error == 'Timed out after 0.5 s'
+    # Extraction of the timed out page was cancelled, the next page didn't wait for it
+    assert results[1].data == [[urls[1]]] and results[1].error is None
+    assert ('extract_multiple_xpaths', urls[0]) not in executed_commands
+    assert not client.command_channel._results
@@ -0,0 +1,79 @@
+import os
+import time
+
+from docrawl.browser_pool import BrowserPool
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.current_url = 'about:blank'
+        self.is_closed = False
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        self.current_url = url
+
+    def quit(self):
+        self.is_closed = True
+
+
+def launch_fake_browser(driver_type, headless, proxy_info=None):
+    return FakeBrowser(), os.getpid()
+
+
+def wait_for_idle_browsers(pool, key, number_of_browsers, timeout=5):
+    timeout_end = time.time() + timeout
+    while len(pool._idle_browsers[key]) < number_of_browsers and time.time() < timeout_end:
+        time.sleep(0.01)
+
+
+def test_browser_pool_lease_and_release():
+    pool = BrowserPool(launch_fake_browser, max_uses=2)
+
+    pooled_browser = pool.lease('Firefox', headless=True)
+    pool.release(pooled_browser)
+
+    # Released browser is reused
+    assert pool.lease('Firefox', headless=True) is pooled_browser
+
+    # Browser is recycled after max_uses leases
+    pool.release(pooled_browser)
+    assert pooled_browser.browser.is_closed
+    assert pool.lease('Firefox', headless=True) is not pooled_browser
+
+    # Browsers are not shared between different configurations
+    assert pool.lease('Chrome', headless=True).key != pooled_browser.key
+
+
+def test_browser_pool_warm_up():
+    pool = BrowserPool(launch_fake_browser)
+    key = pool._get_key('Firefox', True, None)
+
+    pool.warm_up('Firefox', headless=True, number_of_browsers=2)
+    wait_for_idle_browsers(pool, key, 2)
+    standby_browsers = list(pool._idle_browsers[key])
+
+    # Standby browser is leased and a replacement is launched in background
+    leased_browser = pool.lease('Firefox', headless=True)
+    assert leased_browser in standby_browsers
+    wait_for_idle_browsers(pool, key, 2)
+    assert len(pool._idle_browsers[key]) == 2
+
+    # Only idle browsers are closed
+    idle_browsers = list(pool._idle_browsers[key])
+    pool.close()
+    assert all(x.browser.is_closed for x in idle_browsers)
+    assert not leased_browser.browser.is_closed
+
+
+def test_browser_pool_health_check():
+    pool = BrowserPool(launch_fake_browser)
+
+    pooled_browser = pool.lease('Firefox', headless=True)
+    pool.release(pooled_browser)
+    pooled_browser.pid = -1  # Crashed browser
+
+    assert pool.lease('Firefox', headless=True) is not pooled_browser
+    assert pooled_browser.browser.is_closed
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from docrawl.command_channel import LocalCommandChannel, RedisCommandChannel, create_command_channel
+
+
+def test_local_command_channel_commands():
+    channel = LocalCommandChannel()
+
+    assert channel.pop_command(timeout=0.01) is None
+
+    # Commands are returned in order of submission
+    channel.push_command({'id': '1', 'name': 'load_website', 'input': {'url': 'https://example.com'}})
+    channel.push_command({'id': '2', 'name': 'scan_web_page', 'input': None})
+    assert channel.pop_command(timeout=0.01)['id'] == '1'
+    assert channel.pop_command(timeout=0.01)['id'] == '2'
+    assert channel.pop_command(timeout=0.01) is None
+
+    # Waiting side is woken up immediately
+    timer = threading.Timer(0.05, channel.push_command, args=({'id': '3', 'name': 'click_xpath', 'input': None},))
+    timer.start()
+    start = time.time()
+    assert channel.pop_command(timeout=5)['id'] == '3'
+    assert time.time() - start < 1
+
+
+def test_local_command_channel_results():
+    channel = LocalCommandChannel()
+
+    assert channel.wait_result(['1'], timeout=0.01) is None
+
+    channel.put_result('2', {'name': 'scan_web_page', 'error': None})
+    channel.put_result('1', {'name': 'load_website', 'error': None})
+
+    # Any of the finished commands is returned, results are consumed
+    assert channel.wait_result(['3', '2'], timeout=0.01) == ('2', {'name': 'scan_web_page', 'error': None})
+    assert channel.wait_result(['3', '2'], timeout=0.01) is None
+    assert channel.wait_result(['1'], timeout=0.01)[0] == '1'
+
+
+def check_cancel_commands(channel):
+    for command_id in ['1', '2', '3']:
+        channel.push_command({'id': command_id, 'name': 'load_website', 'input': None})
+
+    # Command 1 is being executed when 1 and 2 are cancelled, command 2 is skipped
+    assert channel.pop_command(timeout=0.01)['id'] == '1'
+    channel.cancel_commands(['1', '2'])
+    channel.put_result('1', {'name': 'load_website', 'error': None})
+
+    assert channel.pop_command(timeout=0.01)['id'] == '3'
+    assert channel.wait_result(['1', '2'], timeout=0.01) is None
+
+    # Published result is removed
+    channel.put_result('3', {'name': 'load_website', 'error': None})
+    channel.cancel_commands(['3'])
+    assert channel.wait_result(['3'], timeout=0.01) is None
+
+
+def test_local_command_channel_cancel_commands():
+    channel = LocalCommandChannel()
+    check_cancel_commands(channel)
+
+    assert not channel._results and not channel._cancelled_command_ids
+
+
+def test_redis_command_channel_cancel_commands():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    check_cancel_commands(RedisCommandChannel(fakeredis.FakeRedis(), 'docrawl:1'))
+
+
+def test_create_command_channel():
+    class DummyRedisServer:
+        pass
+
+    class RedisServer:
+        redis = object()
+
+    assert isinstance(create_command_channel(DummyRedisServer()), LocalCommandChannel)
+    assert isinstance(create_command_channel(RedisServer(), 'prefix'), RedisCommandChannel)
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+
+import pytest
+
+from docrawl.docrawl_client import AsyncDocrawlClient, DocrawlClient
+from docrawl.docrawl_core import DocrawlSpider
+from docrawl.errors import SpiderFunctionError
+from docrawl.scan_cache import ScanCache
+
+
+class FakeSpider(threading.Thread):
+    """Executes commands from client's channel the same way as DocrawlSpider.parse, without browser."""
+
+    def __init__(self, docrawl_client, number_of_commands):
+        super().__init__(daemon=True)
+        self.docrawl_client = docrawl_client
+        self.number_of_commands = number_of_commands
+        self.executed_functions = []
+        self.inputs = []
+
+    def run(self):
+        command_channel = self.docrawl_client.command_channel
+
+        for _ in range(self.number_of_commands):
+            command = command_channel.pop_command(timeout=5)
+            self.executed_functions.append(command['name'])
+            self.inputs.append(command['input'])
+
+            error = 'Element not found' if command['name'] == 'click_xpath' else None
+            result = {'extract_xpath': ['Heading'], 'acquire_browser': 'browser1'}.get(command['name'])
+            command_channel.put_result(command['id'], {"name": command['name'], "error": error, "result": result})
+
+
+def test_docrawl_client_pipelined_functions():
+    client = DocrawlClient(redis_key_prefix='docrawl:1')
+    spider = FakeSpider(client, number_of_commands=4)
+    spider.start()
+
+    command_ids = [
+        client.submit_function('load_website', {'url': 'https://example.com'}),
+        client.submit_function('scan_web_page', {}),
+        client.submit_function('extract_xpath', {'xpath': '//h1'}),
+    ]
+    results = dict(client.collect_functions(command_ids, timeout=5))
+
+    assert set(results) == set(command_ids)
+    assert results[command_ids[2]]['result'] == ['Heading']
+    assert spider.executed_functions == ['load_website', 'scan_web_page', 'extract_xpath']
+
+    with pytest.raises(SpiderFunctionError):
+        client.click_xpath('//button', timeout=5)
+
+
+def test_async_docrawl_client():
+    client = AsyncDocrawlClient(redis_key_prefix='docrawl:2')
+    spider = FakeSpider(client, number_of_commands=4)
+    spider.start()
+
+    async def run_functions():
+        await client.load_website('example.com', timeout=5)
+        await client.refresh_page_source(timeout=5)
+        assert await client.extract_xpath('//h1', timeout=5) == ['Heading']
+
+        with pytest.raises(SpiderFunctionError):
+            await client.click_xpath('//button', timeout=5)
+
+    asyncio.run(run_functions())
+
+    assert spider.executed_functions == ['load_website', 'refresh_page_source', 'extract_xpath', 'click_xpath']
+
+
+def test_async_docrawl_client_timeout():
+    client = AsyncDocrawlClient(redis_key_prefix='docrawl:3')
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(client.scan_web_page(timeout=0.05))
+
+
+def test_acquire_browser_returns_leased_browser(monkeypatch):
+    client = DocrawlClient(redis_key_prefix='docrawl:4')
+    monkeypatch.setattr(client, 'run_spider', lambda **kwargs: setattr(client, 'is_spider_running', True))
+    spider = FakeSpider(client, number_of_commands=3)
+    spider.start()
+
+    # Spider started by the first acquisition keeps its browser
+    assert client.acquire_browser('Firefox', timeout=5) == 'browser1'
+    assert client.active_browser == 'browser1'
+
+    client.release_browser(timeout=5)
+    client.acquire_browser('Firefox', timeout=5)
+
+    assert spider.executed_functions == ['acquire_browser', 'release_browser', 'acquire_browser']
+    assert spider.inputs == [{'keep_current': True}, None, None]
+
+
+def test_async_acquire_browser():
+    client = AsyncDocrawlClient(redis_key_prefix='docrawl:5')
+    client.is_spider_running = True
+    spider = FakeSpider(client, number_of_commands=2)
+    spider.start()
+
+    async def run_functions():
+        assert await client.acquire_browser('Firefox', timeout=5) == 'browser1'
+        await client.release_browser(timeout=5)
+
+    asyncio.run(run_functions())
+
+    assert spider.executed_functions == ['acquire_browser', 'release_browser']
+    assert client.active_browser is None
+
+
+class ScanCacheSpider(FakeSpider):
+    """Executes commands by DocrawlSpider's functions, the spider has only the scan cache."""
+    _run_command = DocrawlSpider._run_command
+    _get_scan_cache_stats = DocrawlSpider._get_scan_cache_stats
+
+    def __init__(self, docrawl_client, number_of_commands):
+        super().__init__(docrawl_client, number_of_commands)
+        self.scan_cache = ScanCache()
+
+    def run(self):
+        command_channel = self.docrawl_client.command_channel
+
+        for _ in range(self.number_of_commands):
+            command = command_channel.pop_command(timeout=5)
+            result = self._run_command(command)
+            command_channel.put_result(command['id'], {"name": command['name'], "error": None, "result": result})
+
+
+def test_get_scan_cache_stats():
+    client = DocrawlClient(redis_key_prefix='docrawl:6')
+    spider = ScanCacheSpider(client, number_of_commands=1)
+    spider.scan_cache.set('https://example.com', {}, 'hash', [])
+    spider.scan_cache.get('https://example.com', {}, 'hash')
+    spider.scan_cache.get('https://example.com/other', {}, 'hash')
+    spider.start()
+
+    assert client.get_scan_cache_stats(timeout=5) == {'hits': 1, 'misses': 1, 'size': 1}
+
+
+def test_async_docrawl_client_context_manager():
+    client = AsyncDocrawlClient(redis_key_prefix='docrawl:7')
+    spider = FakeSpider(client, number_of_commands=2)
+    spider.start()
+
+    async def run_functions():
+        async with client as opened_client:
+            assert opened_client is client
+            await opened_client.load_website('example.com', timeout=5)
+
+    asyncio.run(run_functions())
+
+    # Browser is closed when the block is left
+    assert spider.executed_functions == ['load_website', 'close_browser']
@@ -0,0 +1,76 @@
+import pytest
+from scrapy.selector import Selector
+
+from docrawl.docrawl_core import DocrawlSpider
+from docrawl.errors import SpiderFunctionError
+from docrawl.writers import OutputWriterRegistry
+
+HTML = '<html><body><h1>Heading</h1></body></html>'
+
+
+class FakeSpider:
+    """Spider with the page loaded from HTML, without browser."""
+    _prepare_xpath_for_extraction = DocrawlSpider._prepare_xpath_for_extraction
+    _extract_xpath = DocrawlSpider._extract_xpath
+    _extract_multiple_xpaths = DocrawlSpider._extract_multiple_xpaths
+
+    def __init__(self, html=HTML):
+        self.page = Selector(text=html)
+        self.output_writers = OutputWriterRegistry()
+
+    def _get_page_url(self):
+        return 'https://example.com/'
+
+
+def test_extract_xpath_without_match(tmp_path):
+    spider = FakeSpider()
+    filename = tmp_path / 'extracted_data.txt'
+
+    assert spider._extract_xpath({'xpath': '//h1'}) == ['Heading']
+    assert spider._extract_xpath({'xpath': '//h2', 'filename': str(filename)}) == []
+
+    # Placeholder is written only to the file
+    assert filename.read_text(encoding='utf-8') == 'None\n'
+
+
+def test_extract_multiple_xpaths_without_match():
+    spider = FakeSpider()
+
+    assert spider._extract_multiple_xpaths({'xpaths': ['//h1', '//h2']}) == [['Heading'], []]
+
+
+class StaticPageSpider:
+    """Spider with the page loaded by static render mode, the browser still shows the previous page."""
+    _check_page_is_in_browser = DocrawlSpider._check_page_is_in_browser
+    _run_command = DocrawlSpider._run_command
+    _click_xpath = DocrawlSpider._click_xpath
+    _scroll_web_page = DocrawlSpider._scroll_web_page
+    _take_screenshot = DocrawlSpider._take_screenshot
+    _take_screenshot_tile = DocrawlSpider._take_screenshot_tile
+    _wait_until_element_is_located = DocrawlSpider._wait_until_element_is_located
+    send_text = DocrawlSpider.send_text
+
+    def __init__(self):
+        self.browser = None  # Any use of the browser fails
+        self.static_page_source = HTML
+        self.static_page_url = 'https://example.com/'
+
+
+@pytest.mark.parametrize('function, inp', [
+    (StaticPageSpider._click_xpath, {'xpath': '//button'}),
+    (StaticPageSpider._scroll_web_page, {'scroll_to': 'Down', 'scroll_by': 100, 'scroll_max': False}),
+    (StaticPageSpider._take_screenshot, {}),
+    (StaticPageSpider._take_screenshot_tile, {'index': 0}),
+    (StaticPageSpider._wait_until_element_is_located, {'xpath': '//button'}),
+    (StaticPageSpider.send_text, {'xpath': '//input', 'text': 'docrawl'}),
+])
+def test_browser_functions_fail_on_static_page(function, inp):
+    with pytest.raises(SpiderFunctionError, match='without browser'):
+        function(StaticPageSpider(), inp)
+
+
+def test_png_screenshot_fails_on_static_page():
+    command = {'id': '1', 'name': 'take_png_screenshot', 'input': {'filename': 'screenshot.png'}}
+
+    with pytest.raises(SpiderFunctionError):
+        StaticPageSpider()._run_command(command)
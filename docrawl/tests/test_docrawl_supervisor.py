@@ -0,0 +1,20 @@
+import pytest
+from keepvariable.keepvariable_core import KeepVariableDummyRedisServer, KeepVariableRedisServer
+
+from docrawl.docrawl_supervisor import DocrawlSupervisor
+
+
+def test_docrawl_supervisor_requires_redis():
+    with pytest.raises(ValueError):
+        DocrawlSupervisor(KeepVariableDummyRedisServer())
+
+
+def test_docrawl_supervisor_routing():
+    # Connection is lazy, no Redis server is needed for routing
+    supervisor = DocrawlSupervisor(KeepVariableRedisServer(), number_of_workers=4)
+
+    worker_indices = [supervisor.get_worker_index(f'docrawl:{i}') for i in range(100)]
+
+    assert all(0 <= x < 4 for x in worker_indices)
+    assert len(set(worker_indices)) == 4
+    assert worker_indices == [supervisor.get_worker_index(f'docrawl:{i}') for i in range(100)]
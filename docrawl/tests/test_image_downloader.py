@@ -0,0 +1,90 @@
+import http.server
+import os
+import threading
+
+import pytest
+
+from docrawl.image_downloader import ImageDownloader, get_image_extension
+
+IMAGE = b'\x89PNG' + b'0' * 200000
+
+
+class ImageHandler(http.server.BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        ImageHandler.requests.append((self.path, self.headers.get('Cookie'), self.headers.get('User-Agent')))
+
+        if self.path.startswith('/missing'):
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(IMAGE)))
+        self.end_headers()
+        self.wfile.write(IMAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    ImageHandler.requests = []
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_port}'
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_image_extension():
+    assert get_image_extension('https://example.com/a/image.webp?size=100') == 'webp'
+    assert get_image_extension('https://example.com/image', 'image/png; charset=binary') == 'png'
+    assert get_image_extension('https://example.com/image') == 'jpg'
+
+
+def test_download_many(server_url, tmp_path):
+    downloader = ImageDownloader(max_workers=4)
+    downloader.update_session(headers={'User-Agent': 'docrawl-test'},
+                              cookies=[{'name': 'session', 'value': '1', 'domain': '127.0.0.1', 'path': '/'}])
+
+    images = [(f'{server_url}/image_{i}', str(tmp_path / f'image_{i}')) for i in range(10)]
+    images.append((f'{server_url}/image_0', str(tmp_path / 'duplicate')))
+    images.append((f'{server_url}/missing.png', str(tmp_path / 'missing')))
+
+    results = downloader.download_many(images)
+
+    assert [result.status for result in results] == ['downloaded'] * 10 + ['skipped', 'failed']
+    assert results[0].filename == str(tmp_path / 'image_0.png')
+    assert results[10].filename == results[0].filename
+    assert results[11].status_code == 404
+    assert not os.path.exists(str(tmp_path / 'missing.png.part'))
+
+    with open(results[3].filename, 'rb') as f:
+        assert f.read() == IMAGE
+    assert results[3].size == len(IMAGE)
+
+    # Duplicate URL was requested only once, cookies and headers of the browser were sent
+    assert len(ImageHandler.requests) == 11
+    assert all(cookie == 'session=1' and user_agent == 'docrawl-test' for _, cookie, user_agent in
+               ImageHandler.requests)
+
+    downloader.close()
+
+
+def test_downloaded_urls_are_skipped(server_url, tmp_path):
+    downloader = ImageDownloader()
+    url = f'{server_url}/image.png'
+
+    assert downloader.download(url, str(tmp_path / 'image')).status == 'downloaded'
+    assert downloader.download(url, str(tmp_path / 'other')).status == 'skipped'
+
+    # File was removed, the image is downloaded again
+    os.remove(tmp_path / 'image.png')
+    assert downloader.download(url, str(tmp_path / 'image')).status == 'downloaded'
+    assert len(ImageHandler.requests) == 2
@@ -0,0 +1,40 @@
+import pytest
+
+from docrawl.meta_data_store import LocalBrowserMetaDataStore, RedisBrowserMetaDataStore
+
+BROWSER_META_DATA = {
+    "browser": {"driver": "Firefox", "headless": True, "proxy": None, "pid": None},
+    "function": {"name": "init_function", "input": None, "done": False, "error": None},
+    "request": {"url": None, "loaded": False}
+}
+
+
+def check_browser_meta_data_store(store):
+    assert store.get_all() is None
+    assert store.get_section('browser') == {}
+
+    store.replace(BROWSER_META_DATA)
+    assert store.get_all() == BROWSER_META_DATA
+
+    # Only updated fields are changed
+    store.update_section('browser', {'pid': 1234})
+    store.update_section('request', {'url': 'https://example.com', 'loaded': True})
+    assert store.get_section('browser') == {"driver": "Firefox", "headless": True, "proxy": None, "pid": 1234}
+    assert store.get_all()['request'] == {'url': 'https://example.com', 'loaded': True}
+    assert store.get_all()['function'] == BROWSER_META_DATA['function']
+
+    # Returned sections are copies
+    store.get_section('function')['done'] = True
+    assert store.get_section('function')['done'] is False
+
+
+def test_local_browser_meta_data_store():
+    check_browser_meta_data_store(LocalBrowserMetaDataStore())
+
+
+def test_redis_browser_meta_data_store():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    check_browser_meta_data_store(
+        RedisBrowserMetaDataStore(fakeredis.FakeRedis(decode_responses=True), 'docrawl:1:browser_meta_data')
+    )
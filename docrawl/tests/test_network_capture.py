@@ -0,0 +1,61 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+from docrawl.network_capture import CapturedExchange, NetworkCapturePolicy, capture_network
+
+
+def make_request(url, content_type=None, body=b'', headers=None, response=True):
+    response_headers = dict(headers or {})
+    if content_type:
+        response_headers['Content-Type'] = content_type
+
+    class Headers(dict):
+        # selenium-wire headers are case insensitive
+        def get(self, key, default=None):
+            return next((value for name, value in self.items() if name.lower() == key.lower()), default)
+
+    return SimpleNamespace(
+        url=url, headers={'User-Agent': 'docrawl-test'},
+        response=SimpleNamespace(status_code=200, headers=Headers(response_headers), body=body) if response else None
+    )
+
+
+def test_policy_matches_response_content_type():
+    policy = NetworkCapturePolicy()
+
+    assert policy.matches('https://example.com/api', 'application/json; charset=utf-8')
+    assert not policy.matches('https://example.com/app.js', 'text/javascript')
+    assert not policy.matches('https://example.com/api', None)
+
+    policy = NetworkCapturePolicy(url_patterns=[r'/api/'], content_types=None)
+    assert policy.matches('https://example.com/api/items', 'text/html')
+    assert not policy.matches('https://example.com/items', 'application/json')
+
+
+def test_capture_network_keeps_latest_matching_requests():
+    requests = [
+        make_request('https://example.com', 'text/html'),
+        make_request('https://example.com/pending', response=False),
+    ]
+    requests += [make_request(f'https://example.com/api/{i}', 'application/json', b'{}') for i in range(5)]
+
+    headers, exchanges = capture_network(requests, 'https://example.com', NetworkCapturePolicy(max_exchanges=3))
+
+    assert headers == {'User-Agent': 'docrawl-test'}
+    assert [exchange['url'] for exchange in exchanges] == [f'https://example.com/api/{i}' for i in (2, 3, 4)]
+
+
+def test_content_is_decoded_lazily():
+    pytest.importorskip('seleniumwire.utils')
+    body = gzip.compress(b'{"items": [1, 2]}')
+    exchange = CapturedExchange.from_request(make_request(
+        'https://example.com/api', 'application/json', body, headers={'Content-Encoding': 'gzip'}
+    ))
+
+    assert exchange._content is None
+    assert exchange['content'] == '{"items": [1, 2]}'
+    assert dict(exchange) == {'url': 'https://example.com/api', 'status_code': 200,
+                              'headers': {'Content-Encoding': 'gzip', 'Content-Type': 'application/json'},
+                              'content': '{"items": [1, 2]}'}
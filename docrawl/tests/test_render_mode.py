@@ -0,0 +1,101 @@
+import pytest
+from scrapy.http import HtmlResponse
+from scrapy.selector import Selector
+
+from docrawl.docrawl_core import DocrawlSpider
+from docrawl.render_mode import RenderMode, RenderModeCache, has_key_xpaths, render_mode_cache
+
+STATIC_HTML = '<html><body><div class="price">10</div></body></html>'
+JS_HTML = '<html><body><div id="app"></div><script>render()</script></body></html>'
+
+
+class FakeSpider:
+    """Spider with downloads and browser replaced, only the render mode decision is real."""
+    _load_website = DocrawlSpider._load_website
+
+    def __init__(self, html=None):
+        self.html = html
+        self.downloads = []
+        self.loaded = None
+
+    def _download_static_page(self, url, timeout=20):
+        self.downloads.append(url)
+        if self.html is None:
+            raise ValueError('Download failed')
+        return HtmlResponse(url=url, body=self.html.encode('utf8'), encoding='utf8')
+
+    def _set_static_page(self, url, response, page):
+        self.loaded = ('static', url)
+
+    def _load_website_in_browser(self, url, blocking_profile=None):
+        self.loaded = ('browser', url)
+
+
+@pytest.fixture(autouse=True)
+def clear_render_mode_cache():
+    render_mode_cache.clear()
+    yield
+    render_mode_cache.clear()
+
+
+def test_has_key_xpaths():
+    root = Selector(text=STATIC_HTML).root
+
+    assert has_key_xpaths(root, ['//div[@class="price"]'])
+    assert not has_key_xpaths(root, ['//div[@class="price"]', '//span'])
+    assert not has_key_xpaths(root, [])
+
+
+def test_render_mode_cache_is_per_domain():
+    cache = RenderModeCache()
+    cache.set('https://Example.com/a', 'static')
+
+    assert cache.get('https://example.com/b?page=2') == RenderMode.STATIC
+    assert cache.get('https://other.com/a') is None
+
+
+def test_browser_mode_does_not_download():
+    spider = FakeSpider(STATIC_HTML)
+
+    assert spider._load_website({'url': 'https://example.com'}) == 'browser'
+    assert spider.downloads == []
+    assert spider.loaded == ('browser', 'https://example.com')
+
+
+def test_static_mode_errors_are_raised():
+    with pytest.raises(ValueError):
+        FakeSpider(None)._load_website({'url': 'https://example.com', 'render_mode': 'static'})
+
+
+def test_auto_mode_uses_static_page_with_key_xpaths():
+    spider = FakeSpider(STATIC_HTML)
+    inp = {'url': 'https://example.com/1', 'render_mode': 'auto', 'key_xpaths': ['//div[@class="price"]']}
+
+    assert spider._load_website(inp) == 'static'
+    assert render_mode_cache.get('https://example.com/2') == RenderMode.STATIC
+
+
+def test_auto_mode_decision_is_cached_per_domain():
+    spider = FakeSpider(JS_HTML)
+    key_xpaths = ['//div[@class="price"]']
+
+    assert spider._load_website({'url': 'https://example.com/1', 'render_mode': 'auto', 'key_xpaths': key_xpaths}) \
+        == 'browser'
+    assert spider._load_website({'url': 'https://example.com/2', 'render_mode': 'auto', 'key_xpaths': key_xpaths}) \
+        == 'browser'
+
+    # Domain needing JavaScript isn't downloaded statically again
+    assert spider.downloads == ['https://example.com/1']
+    assert spider.loaded == ('browser', 'https://example.com/2')
+
+
+def test_auto_mode_falls_back_to_browser():
+    spider = FakeSpider(None)
+    inp = {'url': 'https://example.com', 'render_mode': 'auto', 'key_xpaths': ['//div']}
+
+    assert spider._load_website(inp) == 'browser'
+
+    # Without key XPaths the page can't be checked
+    spider = FakeSpider(STATIC_HTML)
+    assert spider._load_website({'url': 'https://other.com', 'render_mode': 'auto'}) == 'browser'
+    assert spider.downloads == []
@@ -0,0 +1,159 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from selenium.common.exceptions import InvalidArgumentException
+
+from docrawl.resource_blocking import (
+    BlockingProfile, BlockingStats, apply_blocking_profile, record_chrome_blocked_requests, record_loaded_resources
+)
+
+
+class FakeRequest:
+    def __init__(self, url, accept=None):
+        self.url = url
+        self.headers = {'Accept': accept} if accept else {}
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+class FakeWireBrowser:
+    """selenium-wire browser, requests are passed to the request interceptor."""
+    request_interceptor = None
+
+    def load(self, requests):
+        for request in requests:
+            self.request_interceptor(request)
+
+
+def get_log_entry(method, **params):
+    return {'level': 'INFO', 'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+class FakeChrome:
+    """Chrome blocking requests via CDP, Network events are written to the performance log."""
+
+    def __init__(self, performance_log=None, resources=None):
+        self.cdp_commands = []
+        self.performance_log = performance_log
+        self.resources = resources or []
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp_commands.append((command, params))
+
+    def get_log(self, log_type):
+        if self.performance_log is None:
+            raise InvalidArgumentException('invalid argument: log type performance not found')
+
+        entries, self.performance_log = self.performance_log, []
+        return entries
+
+    def execute_script(self, script):
+        return self.resources
+
+
+def test_block_reasons():
+    profile = BlockingProfile(blocked_domains=['tracker.com'])
+
+    assert profile.get_block_reason('https://example.com/logo.PNG?v=1') == ('type', 'image')
+    assert profile.get_block_reason('https://example.com/image', accept='image/avif,image/webp') == ('type', 'image')
+    assert profile.get_block_reason('https://cdn.tracker.com/t.js') == ('domain', 'tracker.com')
+    assert profile.get_block_reason('https://nottracker.com/app.js') is None
+    assert profile.get_block_reason('https://example.com/style.css') is None
+
+    with pytest.raises(ValueError):
+        BlockingProfile(resource_types=['video'])
+
+
+def test_interceptor_aborts_and_counts_requests():
+    browser, stats = FakeWireBrowser(), BlockingStats()
+    assert apply_blocking_profile(browser, BlockingProfile(blocked_domains=['tracker.com']), stats, use_cdp=False)
+
+    requests = [FakeRequest('https://example.com/'), FakeRequest('https://example.com/a.jpg'),
+                FakeRequest('https://example.com/font.woff2'), FakeRequest('https://tracker.com/pixel')]
+    browser.load(requests)
+
+    assert [request.aborted for request in requests] == [False, True, True, True]
+    assert stats.to_dict()['requests_blocked'] == 3
+    assert stats.to_dict()['blocked_by_type'] == {'image': 1, 'font': 1}
+    assert stats.to_dict()['blocked_by_domain'] == {'tracker.com': 1}
+
+
+def test_cdp_blocked_urls():
+    browser = FakeChrome()
+    profile = BlockingProfile(resource_types=['font'], blocked_domains=['tracker.com'])
+
+    apply_blocking_profile(browser, profile, BlockingStats(), use_cdp=True)
+    apply_blocking_profile(browser, None, BlockingStats(), use_cdp=True)
+
+    patterns = browser.cdp_commands[1][1]['urls']
+    assert '*.woff2' in patterns and '*://*.tracker.com/*' in patterns and '*.png' not in patterns
+    assert browser.cdp_commands[-1] == ('Network.setBlockedURLs', {'urls': []})
+
+
+def test_browser_without_selenium_wire():
+    assert not apply_blocking_profile(SimpleNamespace(), BlockingProfile(), BlockingStats(), use_cdp=False)
+
+
+def test_chrome_blocked_requests_are_counted():
+    profile = BlockingProfile(blocked_domains=['tracker.com'])
+    stats = BlockingStats()
+    browser = FakeChrome(performance_log=[
+        get_log_entry('Network.requestWillBeSent', requestId='1', request={'url': 'https://example.com/a.jpg'}),
+        get_log_entry('Network.requestWillBeSent', requestId='2', request={'url': 'https://tracker.com/t.js'}),
+        get_log_entry('Network.requestWillBeSent', requestId='3', request={'url': 'https://example.com/app.js'}),
+        get_log_entry('Network.requestWillBeSent', requestId='4', request={'url': 'https://example.com/font'}),
+        get_log_entry('Network.loadingFailed', requestId='1', type='Image', blockedReason='inspector'),
+        get_log_entry('Network.loadingFailed', requestId='2', type='Script', blockedReason='inspector'),
+        # Failed, but not blocked by the profile
+        get_log_entry('Network.loadingFailed', requestId='3', type='Script', errorText='net::ERR_FAILED'),
+        # Blocked by type of the request, the URL has no extension
+        get_log_entry('Network.loadingFailed', requestId='4', type='Font', blockedReason='inspector'),
+    ])
+
+    apply_blocking_profile(browser, profile, stats, use_cdp=True)
+    record_chrome_blocked_requests(browser, profile, stats)
+
+    assert stats.to_dict()['requests_blocked'] == 3
+    assert stats.to_dict()['blocked_by_type'] == {'image': 1, 'font': 1}
+    assert stats.to_dict()['blocked_by_domain'] == {'tracker.com': 1}
+
+    # Log was emptied, blocked requests are not counted twice
+    record_chrome_blocked_requests(browser, profile, stats)
+    assert stats.to_dict()['requests_blocked'] == 3
+
+
+def test_chrome_without_performance_log():
+    stats = BlockingStats()
+
+    # Nothing was blocked, zero is correct
+    record_chrome_blocked_requests(FakeChrome(), None, stats)
+    assert stats.to_dict()['requests_blocked'] == 0
+
+    record_chrome_blocked_requests(FakeChrome(), BlockingProfile(), stats)
+    assert stats.to_dict()['requests_blocked'] is None
+    assert stats.to_dict()['estimated_bytes_saved'] is None
+
+
+def test_estimated_bytes_saved():
+    stats = BlockingStats()
+    assert stats.to_dict()['estimated_bytes_saved'] == 0
+
+    stats.record_blocked(('type', 'image'))
+    stats.record_blocked(('type', 'image'))
+    stats.record_blocked(('domain', 'tracker.com'))
+    # No image was loaded yet, size of blocked images is unknown
+    assert stats.to_dict()['estimated_bytes_saved'] is None
+
+    browser = FakeChrome(resources=[
+        ['https://example.com/', 5000, 20000],
+        ['https://example.com/a.png', 1000, 1000],
+        ['https://example.com/b.png', 0, 3000],  # Cached
+        ['https://cdn.example.net/c.png', 0, 0],  # Cross-origin, size unknown
+    ])
+    record_loaded_resources(browser, stats)
+
+    assert stats.to_dict()['estimated_bytes_saved'] == 4000
+    assert (stats.requests_loaded, stats.bytes_loaded) == (4, 6000)
@@ -0,0 +1,51 @@
+import pytest
+
+from docrawl.scan_cache import ScanCache
+
+PARAMS = {'incl_texts': True, 'incl_links': False}
+ELEMENTS = [{'name': 'text_0', 'type': 'text', 'rect': None, 'xpath': '/html/body/p', 'data': {}}]
+
+
+def check_scan_cache(cache):
+    content_hash = ScanCache.get_content_hash('<html>1</html>')
+
+    assert cache.get('https://example.com', PARAMS, content_hash) is None
+    cache.set('https://example.com', PARAMS, content_hash, ELEMENTS)
+
+    assert cache.get('https://example.com', PARAMS, content_hash) == ELEMENTS
+    # Different parameters, URL or page content
+    assert cache.get('https://example.com', dict(PARAMS, incl_links=True), content_hash) is None
+    assert cache.get('https://example.com/other', PARAMS, content_hash) is None
+    assert cache.get('https://example.com', PARAMS, ScanCache.get_content_hash('<html>2</html>')) is None
+
+    # Changed page invalidated the entry
+    assert cache.get('https://example.com', PARAMS, content_hash) is None
+
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+def test_scan_cache():
+    check_scan_cache(ScanCache())
+
+
+def test_scan_cache_lru():
+    cache = ScanCache(max_size=2)
+
+    for url in ['a', 'b', 'c']:
+        cache.set(url, PARAMS, 'hash', ELEMENTS)
+
+    assert cache.get('a', PARAMS, 'hash') is None
+    assert cache.get('c', PARAMS, 'hash') == ELEMENTS
+    assert cache.get_stats() == {'hits': 1, 'misses': 1, 'size': 2}
+
+
+def test_redis_scan_cache():
+    fakeredis = pytest.importorskip('fakeredis')
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+
+    check_scan_cache(ScanCache(redis_client=redis_client))
+
+    # Entries are shared through Redis
+    cache = ScanCache(redis_client=redis_client)
+    cache.set('https://example.com', PARAMS, 'hash', ELEMENTS)
+    assert ScanCache(redis_client=redis_client).get('https://example.com', PARAMS, 'hash') == ELEMENTS
@@ -0,0 +1,175 @@
+import lxml.html
+from scrapy.selector import Selector
+
+from docrawl.elements import ElementType, element_xpath_registry
+from docrawl.scanning import (
+    BrowserPageScanner, HtmlPageScanner, ScanState, WebPageScanner, diff_elements, get_scan_params, scan_html, scan_html_file
+)
+
+HTML = """
+<html><body>
+    <p>First paragraph</p>
+    <p> </p>
+    <a href="/about">About us</a>
+    <table><tr><th>Name</th></tr><tr><td>Value</td></tr></table>
+</body></html>
+"""
+
+SCAN_INPUT = {
+    'incl_tables': True, 'incl_bullets': False, 'incl_texts': True, 'incl_headlines': False, 'incl_links': True,
+    'incl_images': False, 'incl_buttons': False, 'incl_input': False, 'by_xpath': None, 'context_xpath': None,
+    'cookies_xpath': None,
+}
+
+
+def snapshot(tag, xpath, text, attributes=None, width=10, row_count=None):
+    rect = {'x': 0, 'y': 0, 'width': width, 'height': 10}
+    return {'tag': tag, 'xpath': xpath, 'rect': rect, 'isVisible': width > 0, 'attributes': attributes or {},
+            'text': text, 'rowCount': row_count}
+
+
+class FakeScanner(WebPageScanner):
+    def __init__(self, snapshots):
+        super().__init__(page=Selector(text=HTML), current_url='https://example.com/')
+        self.snapshots = snapshots
+        self.queries = None
+
+    def snapshot_nodes(self, queries):
+        self.queries = queries
+        return [{'nodes': self.snapshots.get(query, []), 'error': None} for query in queries]
+
+
+def test_scan_builds_elements_from_one_snapshot():
+    scanner = FakeScanner({
+        element_xpath_registry.get_query(ElementType.TABLE): [snapshot('table', '/html/body/table', 'NameValue', row_count=2)],
+        element_xpath_registry.get_query(ElementType.TEXT): [
+            snapshot('p', '/html/body/p[1]', 'First paragraph'),
+            snapshot('p', '/html/body/p[2]', ' '),
+            snapshot('p', '/html/body/p[1]', 'First paragraph'),
+        ],
+        element_xpath_registry.get_query(ElementType.LINK): [snapshot('a', '/html/body/a', ' About us ', {'href': '/about'}), snapshot('a', '/x', '', width=0)],
+    })
+
+    elements = scanner.scan(SCAN_INPUT)
+
+    # All queries are evaluated at once, one union query per element type
+    element_types = [ElementType.TABLE, ElementType.TEXT, ElementType.LINK]
+    assert scanner.queries == [element_xpath_registry.get_query(x) for x in element_types]
+    assert [(x['type'], x['xpath']) for x in elements] == [
+        (ElementType.TABLE, '/html/body/table'),
+        (ElementType.TEXT, '/html/body/p[1]'),
+        (ElementType.LINK, '/html/body/a'),
+    ]
+    assert elements[1]['data']['textContent'] == 'First paragraph'
+    assert elements[2]['data'] == {
+        'tagName': 'a', 'textContent': 'About us', 'attributes': {'href': 'https://example.com/about'}
+    }
+
+
+def test_scan_html_without_browser(tmp_path):
+    filename = tmp_path / 'page.html'
+    filename.write_text(HTML, encoding='utf-8')
+
+    elements = scan_html_file(str(filename), SCAN_INPUT, current_url='https://example.com/')
+
+    assert [(x['type'], x['xpath'], x['rect']) for x in elements] == [
+        (ElementType.TABLE, '/html/body/table', None),
+        (ElementType.TEXT, '/html/body/p[1]', None),
+        (ElementType.LINK, '/html/body/a', None),
+    ]
+    assert elements[2]['data']['attributes'] == {'href': 'https://example.com/about'}
+
+    # Same result as the scan of page opened in browser
+    assert elements[0]['data']['textContent'] == FakeScanner({}).process_table('/html/body/table')
+
+
+def test_scan_html_invalid_context_xpath_is_ignored():
+    inp = dict(SCAN_INPUT, incl_texts=False, incl_links=False, incl_tables=False, context_xpath='//p[')
+
+    assert scan_html(HTML, inp) == []
+
+
+def test_registry_labels_union_matches():
+    html = '<html><body><h1>Title</h1><p>Text</p><a href="/x" class="btn">Link</a></body></html>'
+    tree = lxml.html.document_fromstring(html)
+
+    found = element_xpath_registry.find(tree, [ElementType.TEXT, ElementType.HEADLINE, ElementType.LINK,
+                                               ElementType.BUTTON])
+
+    # Document order, <a> is both link and button
+    assert [(element_type, node.tag) for element_type, node in found] == [
+        (ElementType.HEADLINE, 'h1'),
+        (ElementType.TEXT, 'p'),
+        (ElementType.LINK, 'a'),
+        (ElementType.BUTTON, 'a'),
+    ]
+
+
+class FakeBrowser:
+    current_url = 'https://example.com/'
+    page_source = HTML
+
+    def __init__(self, snapshots):
+        self.snapshots = snapshots  # Returned results of consecutive scans
+        self.calls = []
+
+    def execute_script(self, script, queries, incremental):
+        self.calls.append(incremental)
+        return self.snapshots.pop(0)
+
+
+def test_incremental_scan_reuses_unchanged_elements():
+    inp = dict(SCAN_INPUT, incl_tables=False, incl_links=False)
+
+    def browser_snapshot(nodes, mutated):
+        return {'results': [{'nodes': nodes, 'error': None}], 'mutated': mutated}
+
+    first = snapshot('p', '/html/body/p[1]', 'First paragraph')
+    browser = FakeBrowser([
+        browser_snapshot([dict(first, id=1, dirty=True)], mutated=False),
+        # Node 1 is unchanged (its cached payload is sent again), node 2 was added
+        browser_snapshot([dict(first, id=1, dirty=False), dict(snapshot('p', '/html/body/p[2]', 'New'), id=2,
+                                                                dirty=True)], mutated=True),
+    ])
+
+    scanner = BrowserPageScanner(browser, Selector(text=HTML))
+    elements = scanner.scan(inp)
+    scan_state = ScanState(params=get_scan_params(inp), elements=elements, element_data=scanner.element_data)
+
+    scanner = BrowserPageScanner(browser, Selector(text=HTML), scan_state)
+    extracted = []
+    original_extract = scanner.extract_element_data
+    scanner.extract_element_data = lambda **kw: extracted.append(kw['xpath']) or original_extract(**kw)
+    new_elements = scanner.scan(inp)
+
+    assert browser.calls == [False, True]
+    assert extracted == ['/html/body/p[2]']
+
+    diff = diff_elements(elements, new_elements)
+    assert [x['xpath'] for x in diff['added']] == ['/html/body/p[2]']
+    assert diff['changed'] == [] and diff['removed'] == []
+
+
+def test_diff_elements():
+    previous = [
+        {'type': 'text', 'xpath': '/a', 'rect': None, 'data': {'textContent': 'A'}},
+        {'type': 'text', 'xpath': '/b', 'rect': None, 'data': {'textContent': 'B'}},
+    ]
+    current = [
+        {'type': 'text', 'xpath': '/a', 'rect': None, 'data': {'textContent': 'A2'}},
+        {'type': 'text', 'xpath': '/c', 'rect': None, 'data': {'textContent': 'C'}},
+    ]
+
+    diff = diff_elements(previous, current)
+
+    assert diff == {'added': [current[1]], 'removed': [previous[1]], 'changed': [current[0]]}
+
+
+def test_iter_scan_yields_batch_per_section():
+    batches = list(HtmlPageScanner(HTML).iter_scan(SCAN_INPUT))
+
+    assert [(x.element_type, len(x.elements), x.sections_done, x.sections_total) for x in batches] == [
+        (ElementType.TABLE, 1, 1, 3),
+        (ElementType.TEXT, 1, 2, 3),
+        (ElementType.LINK, 1, 3, 3),
+    ]
@@ -0,0 +1,35 @@
+import pytest
+
+from docrawl.screencast import ChromeScreencast, LocalFrameRing, RedisFrameRing, create_frame_ring
+
+
+def test_local_frame_ring_keeps_latest_frames():
+    ring = LocalFrameRing()
+
+    for i in range(5):
+        ring.push({'data': str(i), 'timestamp': i}, max_frames=3)
+
+    assert [frame['data'] for frame in ring.get_frames()] == ['2', '3', '4']
+
+    ring.clear()
+    assert ring.get_frames() == []
+
+
+def test_redis_frame_ring_keeps_latest_frames():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    class KeepVariableRedis:
+        redis = fakeredis.FakeStrictRedis()
+
+    ring = create_frame_ring(KeepVariableRedis(), 'test:screencast_frames')
+    assert isinstance(ring, RedisFrameRing)
+
+    for i in range(5):
+        ring.push({'data': str(i), 'timestamp': i}, max_frames=2)
+
+    assert ring.get_frames() == [{'data': '3', 'timestamp': 3}, {'data': '4', 'timestamp': 4}]
+
+
+def test_screencast_formats():
+    with pytest.raises(ValueError):
+        ChromeScreencast(browser=None, on_frame=print, image_format='webp')
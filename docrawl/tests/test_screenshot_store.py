@@ -0,0 +1,73 @@
+import base64
+import time
+
+import pytest
+
+from docrawl.docrawl_client import DocrawlClient
+from docrawl.screenshot_store import LocalScreenshotStore, RedisScreenshotStore, create_screenshot_store
+from docrawl.screenshots import compress_screenshot
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+
+
+def test_local_screenshot_store_expiration():
+    store = LocalScreenshotStore()
+    store.set('screenshot', PNG, ttl=0.05)
+    store.set('other', PNG)
+
+    assert store.get('screenshot') == PNG
+    time.sleep(0.1)
+    assert store.get('screenshot') is None
+    assert store.get('other') == PNG
+
+
+def test_redis_screenshot_store_returns_bytes():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    class KeepVariableRedis:
+        redis = fakeredis.FakeRedis(decode_responses=True)
+
+    store = create_screenshot_store(KeepVariableRedis())
+    assert isinstance(store, RedisScreenshotStore)
+
+    store.set('docrawl:1:screenshot', PNG, ttl=60)
+    assert store.get('docrawl:1:screenshot') == PNG
+    assert KeepVariableRedis.redis.ttl('docrawl:1:screenshot') > 0
+
+
+def test_client_screenshot_outputs():
+    client = DocrawlClient(redis_key_prefix='docrawl:1')
+    assert client.get_browser_screenshot() is None
+
+    client.set_browser_screenshot(PNG)
+
+    assert client.get_browser_screenshot(output='bytes') == PNG
+    assert bytes(client.get_browser_screenshot(output='memoryview')) == PNG
+    assert client.get_browser_screenshot() == base64.b64encode(PNG).decode('ascii')
+
+    # Base64 strings (e.g. frames of screencast) are stored as bytes too
+    client.set_browser_screenshot(base64.b64encode(PNG).decode('ascii'))
+    assert client.get_browser_screenshot(output='bytes') == PNG
+
+    with pytest.raises(ValueError):
+        client.get_browser_screenshot(output='list')
+
+
+def test_zstd_compressed_screenshot():
+    try:
+        compressed = compress_screenshot(PNG, 'zstd')
+    except ImportError:
+        pytest.skip('zstd is not installed')
+
+    assert len(compressed) < len(PNG)
+
+    client = DocrawlClient(redis_key_prefix='docrawl:1')
+    client.set_browser_screenshot(compressed)
+
+    assert client.get_browser_screenshot(output='bytes') == PNG
+    assert client.get_browser_screenshot(output='bytes', decompress=False) == compressed
+
+
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        compress_screenshot(PNG, 'gzip')
@@ -0,0 +1,75 @@
+import pytest
+
+from docrawl.docrawl_client import DocrawlClient
+from docrawl.docrawl_core import DocrawlSpider
+from docrawl.screenshot_tiles import ScreenshotTileCache, get_tile_layout
+
+
+class FakeBrowser:
+    """Browser without CDP, tiles are captured by scrolling the viewport."""
+
+    def __init__(self, page_height=2500, viewport_height=1000):
+        self.page_height = page_height
+        self.viewport_height = viewport_height
+        self.dom_version = 0
+        self.scroll_y = 0
+        self.screenshots = 0
+
+    def execute_script(self, script, *args):
+        if 'domHash' in script:
+            return {'domHash': f'document:{self.dom_version}', 'pageWidth': 1200, 'pageHeight': self.page_height,
+                    'viewportWidth': 1200, 'viewportHeight': self.viewport_height, 'scrollX': 0,
+                    'scrollY': self.scroll_y}
+
+        if 'return window.scrollY' in script:
+            self.scroll_y = min(args[0], self.page_height - self.viewport_height)
+            return self.scroll_y
+
+        self.scroll_y = args[1]
+
+    def get_screenshot_as_png(self):
+        self.screenshots += 1
+        return f'png {self.scroll_y}'.encode()
+
+
+class FakeSpider:
+    _take_screenshot_tile = DocrawlSpider._take_screenshot_tile
+    _check_page_is_in_browser = DocrawlSpider._check_page_is_in_browser
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.static_page_source = None
+        self.docrawl_client = DocrawlClient(redis_key_prefix='docrawl:1')
+        self.screenshot_tiles = ScreenshotTileCache()
+
+
+def test_tile_layout():
+    assert get_tile_layout(4500, 0, 2000) == (0, 2000, 3)
+    assert get_tile_layout(4500, 2, 2000) == (4000, 500, 3)
+    assert get_tile_layout(0, 0, 2000) == (0, 1, 1)
+
+    with pytest.raises(IndexError):
+        get_tile_layout(4500, 3, 2000)
+
+
+def test_tiles_are_captured_on_demand_and_cached():
+    browser = FakeBrowser()
+    spider = FakeSpider(browser)
+    client = spider.docrawl_client
+
+    tile = spider._take_screenshot_tile({'index': 1})
+    assert (tile['y'], tile['height'], tile['number_of_tiles'], tile['cached']) == (1000, 1000, 3, False)
+    assert client.get_browser_screenshot_tile(1, output='bytes') == b'png 1000'
+    assert client.get_browser_screenshot_tile(0) is None
+
+    # Last tile overlaps with the previous one, viewport can't be scrolled further
+    assert spider._take_screenshot_tile({'index': 2})['y'] == 1500
+    assert browser.scroll_y == 0  # Scroll position is restored
+
+    assert spider._take_screenshot_tile({'index': 1})['cached']
+    assert browser.screenshots == 2
+
+    # DOM changed, the tile is captured again
+    browser.dom_version += 1
+    assert not spider._take_screenshot_tile({'index': 1})['cached']
+    assert browser.screenshots == 3
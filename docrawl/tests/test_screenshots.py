@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from docrawl.docrawl_core import ScreenshotThread
+from docrawl.screenshots import LivePreview, LivePreviewOptions, encode_screenshot, get_screenshot_hash
+
+PNG_1 = b'\x89PNG\r\n\x1a\nfirst'
+PNG_2 = b'\x89PNG\r\n\x1a\nsecond'
+
+
+class FakeBrowser:
+    def __init__(self, screenshots):
+        self.screenshots = list(screenshots)
+
+    def get_screenshot_as_png(self):
+        return self.screenshots.pop(0)
+
+
+def test_screenshot_hash():
+    assert get_screenshot_hash(PNG_1) == get_screenshot_hash(PNG_1)
+    assert get_screenshot_hash(PNG_1) != get_screenshot_hash(PNG_2)
+
+    with pytest.raises(ValueError):
+        get_screenshot_hash(PNG_1, 'unknown')
+
+
+def test_png_is_not_reencoded():
+    assert encode_screenshot(PNG_1, 'png', max_width=None) == PNG_1
+
+    with pytest.raises(ValueError):
+        encode_screenshot(PNG_1, 'gif')
+
+
+def test_unchanged_screenshots_are_skipped():
+    preview = LivePreview(LivePreviewOptions(image_format='png', max_width=None))
+    browser = FakeBrowser([PNG_1, PNG_1, PNG_2, PNG_2, PNG_2])
+
+    assert preview.capture(browser) == PNG_1
+    assert preview.capture(browser) is None
+    assert preview.capture(browser) == PNG_2
+    assert preview.capture(browser) is None
+
+    preview.reset()
+    assert preview.capture(browser) == PNG_2
+
+
+def test_preview_filename():
+    preview = LivePreview(LivePreviewOptions(image_format='png', max_width=None))
+
+    assert preview.get_filename('tmp/screenshots/website.png') == 'tmp/screenshots/website.png'
+
+
+def test_compressed_preview():
+    Image = pytest.importorskip('PIL.Image')
+
+    png = io.BytesIO()
+    Image.new('RGBA', (2000, 1000), (255, 0, 0, 255)).save(png, format='PNG')
+
+    preview = LivePreview(LivePreviewOptions(image_format='jpeg', quality=50, max_width=1000))
+    jpeg = preview.capture(FakeBrowser([png.getvalue()]))
+
+    image = Image.open(io.BytesIO(jpeg))
+    assert image.format == 'JPEG'
+    assert image.size == (1000, 500)
+    assert preview.get_filename('website.png') == 'website.jpg'
+
+
+def test_live_preview_is_kept_without_pillow(monkeypatch):
+    monkeypatch.setattr('docrawl.screenshots.is_pillow_available', lambda: False)
+    thread = ScreenshotThread(docrawl_spider=None, screenshot_filename='website.png',
+                              live_preview_options=LivePreviewOptions(image_format='jpeg'))
+    preview = thread.live_preview
+
+    assert preview.options.image_format == 'png'
+
+    # Same options are requested again, the preview (and hash of the last screenshot) is kept
+    thread.set_live_preview_options(LivePreviewOptions(image_format='jpeg'))
+    assert thread.live_preview is preview
+
+    thread.set_live_preview_options(LivePreviewOptions(image_format='webp'))
+    assert thread.live_preview is not preview
@@ -0,0 +1,60 @@
+import json
+
+import lxml.html
+from lxml import etree
+
+from docrawl.tables import extract_table, extract_table_by_xpaths
+
+TABLE = """
+<table>
+    <thead><tr><th>Name</th><th>Group</th><th>Score</th></tr></thead>
+    <tbody>
+        <tr><td>Alice</td><td rowspan="2">A</td><td>1</td></tr>
+        <tr><td>Bob</td><td>2</td></tr>
+        <tr><td colspan="2">Total</td><td> <b>3</b> </td></tr>
+        <tr></tr>
+    </tbody>
+</table>
+"""
+
+
+def test_extract_table_with_spans():
+    table = extract_table(lxml.html.fragment_fromstring(TABLE))
+
+    assert table.columns == ['Name', 'Group', 'Score']
+    assert table.data == {
+        'Name': ['Alice', 'Bob', 'Total'],
+        'Group': ['A', 'A', 'Total'],
+        'Score': ['1', '2', '3'],
+    }
+    # Rows are numbered within the table, header is the row 0, empty row is skipped
+    assert table.index == [1, 2, 3]
+
+
+def test_extract_table_json_is_compatible_with_pandas():
+    html = '<table><tr><td>Name</td><td>Name</td></tr><tr><td>a</td><td>b</td></tr><tr><td>c</td></tr></table>'
+    table = extract_table(lxml.html.fragment_fromstring(html))
+
+    assert table.columns == ['Name', 'Name.1']
+    assert json.loads(table.to_json()) == json.loads(table.to_pandas().to_json())
+    assert json.loads(table.to_json()) == {'Name': {'1': 'a', '2': 'c'}, 'Name.1': {'1': 'b', '2': None}}
+
+
+def test_extract_table_by_xpaths_evaluates_columns_per_row():
+    html = """
+    <html><body>
+        <div class="item"><span>Name</span><span>Price</span></div>
+        <div class="item"><span>Apple</span><span>1</span></div>
+        <div class="item"><span>Pear</span></div>
+        <p><span>Not a row</span></p>
+    </body></html>
+    """
+    root = lxml.html.document_fromstring(html)
+
+    table = extract_table_by_xpaths(root, '//div[@class="item"]', '/span', first_row_header=True)
+    assert table.columns == ['Name', 'Price']
+    assert table.data == {'Name': ['Apple', 'Pear'], 'Price': ['1', None]}
+
+    # Precompiled XPaths
+    table = extract_table_by_xpaths(root, etree.XPath('//div[@class="item"]'), etree.XPath('./span[1]'))
+    assert table.data == {'0': ['Name', 'Apple', 'Pear']}
@@ -1,6 +1,6 @@
 import pytest
 
-from docrawl.utils import build_abs_url
+from docrawl.utils import build_abs_url, get_redis_client, is_redis_backed
 
 
 def test_build_abs_url():
@@ -27,3 +27,13 @@ def test_build_abs_url():
         build_abs_url('test/qwaf/werq')
     with pytest.raises(ValueError):
         build_abs_url('../../..', 'https://example.com/aaa/bbb')
+
+
+def test_is_redis_backed():
+    redis_client = object()
+
+    class RedisServer:
+        redis = redis_client
+
+    assert is_redis_backed(RedisServer()) and get_redis_client(RedisServer()) is redis_client
+    assert not is_redis_backed(object()) and get_redis_client(object()) is None
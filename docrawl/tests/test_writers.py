@@ -0,0 +1,63 @@
+import csv
+import json
+
+import pytest
+
+from docrawl.writers import OutputWriterRegistry, infer_output_format
+
+COLUMNS = ['name', 'price']
+
+
+def test_infer_output_format():
+    assert infer_output_format('data.csv') == 'csv'
+    assert infer_output_format('data.ndjson') == 'jsonl'
+    assert infer_output_format('data.txt', output_format='parquet') == 'parquet'
+    assert infer_output_format('data.pickle') == 'csv'
+
+    with pytest.raises(ValueError):
+        infer_output_format('data.csv', output_format='pickle')
+
+
+def test_append_csv_and_jsonl(tmp_path):
+    output_writers = OutputWriterRegistry()
+
+    for extension in ['csv', 'jsonl']:
+        filename = str(tmp_path / f'data.{extension}')
+
+        output_writers.write(filename, COLUMNS, [['apple', '1']], append=True)
+        output_writers.write(filename, COLUMNS, [['pear', None]], append=True)
+
+    output_writers.close()
+
+    with open(tmp_path / 'data.csv', newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f)) == [COLUMNS, ['apple', '1'], ['pear', '']]
+
+    with open(tmp_path / 'data.jsonl', encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [{'name': 'apple', 'price': '1'}, {'name': 'pear', 'price': None}]
+
+
+def test_write_replaces_file(tmp_path):
+    filename = str(tmp_path / 'data.txt')
+    output_writers = OutputWriterRegistry()
+
+    output_writers.write(filename, COLUMNS, [['apple', '1'], ['pear', '2']])
+    output_writers.write(filename, COLUMNS, [['plum', '3']])
+
+    # Values are written by columns
+    with open(filename, encoding='utf-8') as f:
+        assert f.read() == 'plum\n3'
+
+
+def test_append_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    filename = str(tmp_path / 'data.parquet')
+    output_writers = OutputWriterRegistry()
+
+    output_writers.write(filename, COLUMNS, [['apple', '1']], append=True)
+    output_writers.write(filename, COLUMNS, [['pear', '2']], append=True)
+    output_writers.close()
+    # Appending to already closed file
+    output_writers.write(filename, COLUMNS, [['plum', '3']], append=True)
+    output_writers.close()
+
+    assert pq.read_table(filename).to_pydict() == {'name': ['apple', 'pear', 'plum'], 'price': ['1', '2', '3']}
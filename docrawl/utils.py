@@ -37,3 +37,12 @@ def build_abs_url(scraped_url: str, domain_url: Optional[str] = None) -> str:
         for segment in scraped_segments:
             path_segment_list = _compute_next_path_segment(segment, path_segment_list)
         return f"{domain_url.scheme}://{domain_url.netloc}/{'/'.join(path_segment_list)}"
+
+
+def get_redis_client(kv_redis):
+    """Redis client of KeepVariableRedisServer (its `redis`), None for in-process KeepVariableDummyRedisServer."""
+    return getattr(kv_redis, 'redis', None)
+
+
+def is_redis_backed(kv_redis) -> bool:
+    return get_redis_client(kv_redis) is not None
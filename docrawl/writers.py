@@ -0,0 +1,245 @@
+import csv
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+# File extension -> output format
+OUTPUT_FORMATS = {
+    'csv': 'csv',
+    'jsonl': 'jsonl',
+    'ndjson': 'jsonl',
+    'parquet': 'parquet',
+    'xlsx': 'xlsx',
+    'txt': 'txt',
+}
+
+
+def infer_output_format(filename: str, output_format: Optional[str] = None, default: str = 'csv') -> str:
+    """
+    Return output format, explicitly passed format has priority over extension of the file.
+        :param filename: str, name of output file
+        :param output_format: str, optional, one of csv, jsonl, parquet, xlsx, txt
+        :param default: str, format used if the extension is not known
+    """
+    if output_format:
+        output_format = output_format.lower().lstrip('.')
+        if output_format not in OUTPUT_FORMATS:
+            supported_formats = sorted(set(OUTPUT_FORMATS.values()))
+            raise ValueError(f'Unknown output format {output_format}, use one of {supported_formats}')
+        return OUTPUT_FORMATS[output_format]
+
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+
+    return OUTPUT_FORMATS.get(extension, default)
+
+
+class OutputWriter(ABC):
+    """
+    Writes rows of extracted data to a file. Rows are written (and flushed) as they come, so data from many pages
+    can be appended to one file without building a DataFrame.
+    """
+
+    def __init__(self, filename: str, append: bool = False):
+        """
+        :param filename: str, name of output file
+        :param append: bool, append to existing file instead of replacing it
+        """
+        self.filename = filename
+        self.append = append
+
+    @abstractmethod
+    def write_rows(self, columns: List[str], rows: Iterable[list]):
+        """Write rows, values are in the same order as columns."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CsvOutputWriter(OutputWriter):
+    def __init__(self, filename: str, append: bool = False):
+        super().__init__(filename, append)
+        self._file = open(filename, 'a' if append else 'w', newline='', encoding='utf-8')
+        self._csv_writer = csv.writer(self._file)
+
+    def write_rows(self, columns: List[str], rows: Iterable[list]):
+        # Header is written only at the beginning of the file
+        if self._file.tell() == 0:
+            self._csv_writer.writerow(columns)
+
+        self._csv_writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonLinesOutputWriter(OutputWriter):
+    def __init__(self, filename: str, append: bool = False):
+        super().__init__(filename, append)
+        self._file = open(filename, 'a' if append else 'w', encoding='utf-8')
+
+    def write_rows(self, columns: List[str], rows: Iterable[list]):
+        for row in rows:
+            self._file.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n')
+
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutputWriter(OutputWriter):
+    """
+    Each write is stored as a row group. Parquet file is readable only after the writer is closed, appending to
+    a closed file rewrites its rows into the new file first. Requires pyarrow.
+    """
+
+    def __init__(self, filename: str, append: bool = False):
+        super().__init__(filename, append)
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError('pyarrow is required for Parquet output: pip install pyarrow') from e
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._parquet_writer = None
+        self._existing_table = self._pq.read_table(filename) if append and os.path.isfile(filename) else None
+
+    def write_rows(self, columns: List[str], rows: Iterable[list]):
+        rows = list(rows)
+        data = {column: [row[i] if i < len(row) else None for row in rows] for i, column in enumerate(columns)}
+        table = self._pa.table({column: self._pa.array(values, type=self._pa.string())
+                                for column, values in data.items()})
+
+        if self._parquet_writer is None:
+            schema = self._existing_table.schema if self._existing_table is not None else table.schema
+            self._parquet_writer = self._pq.ParquetWriter(self.filename, schema)
+
+            if self._existing_table is not None:
+                self._parquet_writer.write_table(self._existing_table)
+                self._existing_table = None
+
+        self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+
+class ExcelOutputWriter(OutputWriter):
+    """Excel workbook is written at once when the writer is closed, appending is not supported."""
+
+    def __init__(self, filename: str, append: bool = False):
+        if append:
+            raise ValueError('Appending to Excel files is not supported, use csv, jsonl or parquet output format')
+
+        super().__init__(filename, append)
+        self._columns = None
+        self._rows = []
+
+    def write_rows(self, columns: List[str], rows: Iterable[list]):
+        self._columns = self._columns or columns
+        self._rows.extend(rows)
+
+    def close(self):
+        if self._columns is not None:
+            pd.DataFrame(self._rows, columns=self._columns).to_excel(self.filename)
+            self._columns = None
+            self._rows = []
+
+
+class TextOutputWriter(OutputWriter):
+    """Plain text, values are written column by column, one value per line."""
+
+    def __init__(self, filename: str, append: bool = False):
+        super().__init__(filename, append)
+        self._file = open(filename, 'a' if append else 'w', encoding='utf-8')
+
+    def write_rows(self, columns: List[str], rows: Iterable[list]):
+        values_by_column = zip(*rows)
+        lines = [value for values in values_by_column for value in values if value is not None]
+
+        if lines:
+            if self._file.tell() > 0:
+                self._file.write('\n')
+            self._file.write('\n'.join(lines))
+
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+OUTPUT_WRITERS = {
+    'csv': CsvOutputWriter,
+    'jsonl': JsonLinesOutputWriter,
+    'parquet': ParquetOutputWriter,
+    'xlsx': ExcelOutputWriter,
+    'txt': TextOutputWriter,
+}
+
+
+def create_output_writer(filename: str, output_format: Optional[str] = None, append: bool = False) -> OutputWriter:
+    return OUTPUT_WRITERS[infer_output_format(filename, output_format)](filename, append)
+
+
+class OutputWriterRegistry:
+    """
+    Writers opened by a spider. Appending writers stay open between calls (Parquet file can't be appended to after
+    it's closed), other writes replace the file and close the writer right away.
+    """
+
+    def __init__(self):
+        self._writers = {}
+        self._lock = threading.Lock()
+
+    def write(self, filename: str, columns: List[str], rows: Iterable[list], output_format: Optional[str] = None,
+              append: bool = False):
+        """
+        Write rows to a file.
+            :param filename: str, name of output file
+            :param columns: list of column names
+            :param rows: rows with values in the same order as columns
+            :param output_format: str, optional, inferred from the extension of the file by default
+            :param append: bool, append rows to the file
+        """
+        with self._lock:
+            writer = self._writers.pop(filename, None)
+
+            if writer is not None and not append:
+                writer.close()
+                writer = None
+
+            if writer is None:
+                writer = create_output_writer(filename, output_format, append)
+
+            try:
+                writer.write_rows(columns, rows)
+            finally:
+                if append:
+                    self._writers[filename] = writer
+                else:
+                    writer.close()
+
+    def close(self, filename: Optional[str] = None):
+        """Close writer of the file, all writers if filename is not passed."""
+        with self._lock:
+            filenames = [filename] if filename else list(self._writers)
+            writers = [self._writers.pop(x) for x in filenames if x in self._writers]
+
+        for writer in writers:
+            writer.close()